@@ -1,6 +1,7 @@
 from tqdm import tqdm
 from DataFrame.dataFrame import myDataFrame
-from Setup.Maze import Maze
+from Setup.Maze import Maze, MazeGeometry
+from PhysicsEngine.Contact import contact_points
 import numpy as np
 from trajectory_inheritance.trajectory import get
 import pandas as pd
@@ -89,10 +90,10 @@ class Contact(pd.Series):
         """
         x = get(self.filename)
         torque = 0
+        v0 = self.pre_velocity()
 
         for contact_point in self.contact_points:
             rho = x.position[self.impact_frame] - contact_point
-            v0 = self.pre_velocity()
             torque += np.cross(np.hstack([rho, 0]), np.hstack([v0, 0]))[2]
 
         # I want to flip the ones contacting the top corner...
@@ -173,11 +174,12 @@ class Contact_analyzer(pd.DataFrame):
         print('Finding contacts for ' + self.address())
         for filename in tqdm(self['filename']):
             x = get(filename)
-            contact_points = x.find_contact()
-            wall_contacts = np.where([len(contact) > 0 and contact[0][0] > Maze(x).slits[0] - 1
-                                      #  and (abs(con[0][1] - maze.arena_height / 2 - maze.exit_size / 2) < 2
-                                      #       or abs(con[0][1] - maze.arena_height / 2 + maze.exit_size / 2) < 2)
-                                      for contact in contact_points])[0]
+            contacts, maze_points = x.find_contact()
+            in_contact = np.where(np.diff(contacts.indptr) > 0)[0]
+            first_contact = maze_points[contacts.indices[contacts.indptr[in_contact]]]
+            wall_contacts = in_contact[first_contact[:, 0] > MazeGeometry(x).slits[0] - 1]
+            #  and (abs(con[0][1] - maze.arena_height / 2 - maze.exit_size / 2) < 2
+            #       or abs(con[0][1] - maze.arena_height / 2 + maze.exit_size / 2) < 2)
 
             # only if its not a to short contact!
             # wall_contacts = [c for i, c in enumerate(contact_frames) if abs(c - contact_frames[i - 1]) < 2
@@ -185,7 +187,8 @@ class Contact_analyzer(pd.DataFrame):
                                                         if c - wall_contacts[i - 1] > int(x.fps * 2)]
 
             for impact_frame in impact_frames:
-                con = Contact(filename=filename, impact_frame=impact_frame, contact_points=contact_points[impact_frame])
+                con = Contact(filename=filename, impact_frame=impact_frame,
+                              contact_points=contact_points(contacts, maze_points, impact_frame).tolist())
                 self.contacts = pd.concat([self.contacts, con], axis=1)
         return self.contacts.transpose().reset_index(drop=True)
 
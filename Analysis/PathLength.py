@@ -6,7 +6,7 @@ from Analysis.resolution import resolution
 from copy import copy
 from trajectory_inheritance.trajectory import get
 from matplotlib import pyplot as plt
-from Setup.Maze import Maze
+from Setup.Maze import MazeGeometry
 from PS_Search_Algorithms.Path_planning_full_knowledge import minimal_filename
 
 # --- from experimental data--- #
@@ -86,7 +86,7 @@ class PathLength:
         return translation + archlength
 
     def average_radius(self):
-        return Maze(self.x).average_radius()
+        return MazeGeometry(self.x).average_radius()
 
     def calculate_path_length(self, rot: bool = True, frames: list = None):
         """
@@ -138,7 +138,7 @@ class PathLength:
             ideal_filename = minimal_filename(self.x.size, self.x.shape, self.x.geometry(), self.x.initial_cond())
             ideal = get(ideal_filename)
             return PathLength(ideal).per_experiment() * \
-                   Maze(self.x).exit_size/Maze(ideal, geometry=self.x.geometry).exit_size
+                   MazeGeometry(self.x).exit_size / MazeGeometry(ideal).exit_size
         else:
             return np.nan
 
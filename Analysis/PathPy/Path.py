@@ -46,8 +46,9 @@ class Path:
         self.state_series = self.calculate_state_series()
 
     def get_time_series(self, conf_space_labeled, x):
-        indices = [conf_space_labeled.coords_to_indices(*coords) for coords in x.iterate_coords(step=self.frame_step)]
-        labels = [conf_space_labeled.space_labeled[index] for index in indices]
+        coords = np.column_stack([x.position[::self.frame_step, :2], np.ravel(x.angle)[::self.frame_step]])
+        indices = conf_space_labeled.coords_to_indices_array(coords)
+        labels = conf_space_labeled.labels_at(tuple(indices.T)).tolist()
         labels = self.interpolate_zeros(labels)
         labels = self.add_missing_transitions(labels)
         return labels
@@ -20,7 +20,7 @@ def get_trajectories(solver='human', size='Large', shape='SPT',
     :param solver: str
     :param size: str
     :param shape: str
-    :return: list of objects, that are of the class or subclass Trajectory
+    :return: list of objects, that are of the class or subclass Trajectory (LazyTrajectory, if possible)
     """
     if size == 'Small':
         sizes = ['Small Far', 'Small Near']
@@ -36,7 +36,7 @@ def get_trajectories(solver='human', size='Large', shape='SPT',
 
     filenames = df['filename'][:number]
     # filenames = ['XL_SPT_dil9_sensing' + str(ii) for ii in [5, 6, 7, 8, 9]]
-    return [get(filename) for filename in filenames]
+    return [get(filename, lazy=True) for filename in filenames]
 
 
 class Paths(pp.Paths):
@@ -0,0 +1,175 @@
+import json
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+
+class ChunkedArray(object):
+    """
+    Read-only array, that is saved on disk in fixed-size, zlib compressed chunks.
+    Only the chunks that an index touches are read and decompressed. The last used chunks are kept in memory.
+    Indexing with integers and slices (e.g. space[node.ind()], space[:, 3, :]) and with arrays of integer indices
+    (e.g. space[tuple(indices.T)]) works chunk by chunk, Ellipsis and negative indices work like in numpy, and indices
+    out of bounds raise an IndexError. All other indexing loads the full array.
+    """
+
+    def __init__(self, filename: str, max_chunks_in_memory: int = 64):
+        """
+        :param filename: file written by ChunkedArray.write
+        :param max_chunks_in_memory: how many decompressed chunks are kept in memory
+        """
+        with open(filename + '.json', 'r') as json_file:
+            index = json.load(json_file)
+        self.filename = filename
+        self.shape = tuple(index['shape'])
+        self.dtype = np.dtype(index['dtype'])
+        self.chunk_shape = tuple(index['chunk_shape'])
+        self.offsets = {tuple(int(i) for i in key.split('_')): tuple(value) for key, value in index['chunks'].items()}
+        self.max_chunks_in_memory = max_chunks_in_memory
+        self.chunks = OrderedDict()
+
+    @staticmethod
+    def write(array: np.array, filename: str, chunk_shape: tuple = (64, 64, 64), level: int = 6) -> None:
+        """
+        Write array in compressed chunks to filename, and the index of the chunks to filename + '.json'.
+        :param array: array (or np.memmap) to write
+        :param filename: where to save
+        :param chunk_shape: shape of a single chunk
+        :param level: zlib compression level
+        """
+        number_of_chunks = [int(np.ceil(s / c)) for s, c in zip(array.shape, chunk_shape)]
+        chunks = {}
+        with open(filename, 'wb') as file:
+            for chunk_index in np.ndindex(*number_of_chunks):
+                block = array[tuple(slice(i * c, (i + 1) * c) for i, c in zip(chunk_index, chunk_shape))]
+                data = zlib.compress(np.ascontiguousarray(block).tobytes(), level)
+                chunks['_'.join(str(i) for i in chunk_index)] = [file.tell(), len(data)]
+                file.write(data)
+
+        with open(filename + '.json', 'w') as json_file:
+            json.dump({'shape': list(array.shape),
+                       'dtype': np.dtype(array.dtype).str,
+                       'chunk_shape': list(chunk_shape),
+                       'chunks': chunks}, json_file)
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def chunk(self, chunk_index: tuple) -> np.array:
+        """
+        :param chunk_index: index of the chunk (not of the node)
+        :return: decompressed chunk
+        """
+        if chunk_index in self.chunks:
+            self.chunks.move_to_end(chunk_index)
+            return self.chunks[chunk_index]
+
+        offset, length = self.offsets[chunk_index]
+        with open(self.filename, 'rb') as file:
+            file.seek(offset)
+            data = file.read(length)
+        shape = tuple(min(c, s - i * c) for i, c, s in zip(chunk_index, self.chunk_shape, self.shape))
+        block = np.frombuffer(zlib.decompress(data), dtype=self.dtype).reshape(shape)
+
+        self.chunks[chunk_index] = block
+        if len(self.chunks) > self.max_chunks_in_memory:
+            self.chunks.popitem(last=False)
+        return block
+
+    def normalize(self, index, axis: int):
+        """
+        Check integer indices along an axis, and turn negative ones into positive ones (like numpy).
+        :param index: int or np.array of ints
+        :param axis: axis that is indexed
+        :return: index with all values in range(self.shape[axis])
+        """
+        size = self.shape[axis]
+        index = np.asarray(index)
+        if np.any((index < -size) | (index >= size)):
+            out_of_bounds = index[(index < -size) | (index >= size)].reshape(-1)[0]
+            raise IndexError('index ' + str(out_of_bounds) + ' is out of bounds for axis ' + str(axis) +
+                             ' with size ' + str(size))
+        return np.where(index < 0, index + size, index)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(k is None for k in key):
+            return np.asarray(self)[key]
+        ellipses = [i for i, k in enumerate(key) if k is Ellipsis]
+        if len(ellipses) > 1:
+            raise IndexError("an index can only have a single ellipsis ('...')")
+        if len(ellipses) == 1:
+            i = ellipses[0]
+            key = key[:i] + (slice(None),) * (self.ndim - len(key) + 1) + key[i + 1:]
+        if len(key) > self.ndim:
+            raise IndexError('too many indices for array: array is ' + str(self.ndim) + '-dimensional, but ' +
+                             str(len(key)) + ' were indexed')
+        key = key + (slice(None),) * (self.ndim - len(key))
+
+        if all(isinstance(k, (int, np.integer)) for k in key):
+            key = [int(self.normalize(k, axis)) for axis, k in enumerate(key)]
+            return self.chunk(tuple(k // c for k, c in zip(key, self.chunk_shape)))[
+                tuple(k % c for k, c in zip(key, self.chunk_shape))]
+
+        if all(isinstance(k, (int, np.integer, slice)) for k in key):
+            return self._basic_indexing(key)
+
+        if all(not isinstance(k, slice) and np.asarray(k).dtype.kind in 'iu' for k in key):
+            return self._point_indexing(key)
+
+        return np.asarray(self)[key]
+
+    def _basic_indexing(self, key: tuple) -> np.array:
+        """
+        Indexing with integers and slices.
+        """
+        indices = [np.atleast_1d(np.arange(s)[k]) for k, s in zip(key, self.shape)]
+        result = np.empty([len(index) for index in indices], dtype=self.dtype)
+
+        chunk_ids = [np.unique(index // c) for index, c in zip(indices, self.chunk_shape)]
+        for chunk_index in np.array(np.meshgrid(*chunk_ids, indexing='ij')).reshape((self.ndim, -1)).T:
+            positions = [np.where(index // c == i)[0] for index, c, i in zip(indices, self.chunk_shape, chunk_index)]
+            local = [index[position] % c for index, position, c in zip(indices, positions, self.chunk_shape)]
+            result[np.ix_(*positions)] = self.chunk(tuple(int(i) for i in chunk_index))[np.ix_(*local)]
+
+        return result[tuple(0 if isinstance(k, (int, np.integer)) else slice(None) for k in key)]
+
+    def _point_indexing(self, key: tuple) -> np.array:
+        """
+        Indexing with arrays of integers (one array per axis).
+        """
+        indices = [self.normalize(index, axis) for axis, index in enumerate(np.broadcast_arrays(*key))]
+        shape = indices[0].shape
+        indices = np.stack([index.reshape(-1) for index in indices], axis=1)
+
+        chunk_ids, inverse = np.unique(indices // np.array(self.chunk_shape), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        result = np.empty(indices.shape[0], dtype=self.dtype)
+        for i, chunk_index in enumerate(chunk_ids):
+            in_chunk = inverse == i
+            local = indices[in_chunk] % np.array(self.chunk_shape)
+            result[in_chunk] = self.chunk(tuple(int(c) for c in chunk_index))[tuple(local.T)]
+        return result.reshape(shape)
+
+    def __setitem__(self, key, value):
+        raise TypeError('ChunkedArray is read-only.')
+
+    def __array__(self, dtype=None, copy=None) -> np.array:
+        """
+        :return: the full array, read from all chunks (always a new, writable array)
+        """
+        if copy is False:
+            raise ValueError('ChunkedArray cannot be converted to an array without a copy.')
+        array = self[tuple(slice(None) for _ in self.shape)]
+        if dtype is not None:
+            return array.astype(dtype, copy=False)
+        return array
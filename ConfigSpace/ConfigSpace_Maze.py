@@ -1,12 +1,21 @@
 import numpy as np
 import pickle
-from PhysicsEngine.Contact import possible_configuration
+import json
+import hashlib
+from PhysicsEngine.Contact import CollisionChecker, transform_corners, points_in_polygons
 import os
+import shutil
 import itertools
-from Setup.Maze import Maze
+from Setup.Maze import MazeGeometry, LoadGeometry
 from Directories import PhaseSpaceDirectory
 from Analysis.resolution import resolution
+from ConfigSpace.ChunkedArray import ChunkedArray
+from ConfigSpace.SpaceCache import SpaceCache
+from ConfigSpace.Morphology import periodic_binary_dilation, periodic_binary_erosion, wrap_pad
 from scipy import ndimage
+from scipy.signal import fftconvolve
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import dijkstra
 from datetime import datetime
 import string
 from skfmm import distance
@@ -15,6 +24,7 @@ from Analysis.PathPy.Path import forbidden_transition_attempts, allowed_transiti
 import networkx as nx
 from matplotlib import pyplot as plt
 from copy import copy
+from joblib import Parallel, delayed, effective_n_jobs
 
 try:
     from mayavi import mlab
@@ -39,6 +49,8 @@ class ConfigSpace(object):
         self.space = space  # True, if configuration is possible; False, if there is a collision with the wall
         self.name = name
         self.dual_space = None
+        self.pyramid = {}  # spaces with reduced resolution, keys are the reduction factors (see self.level)
+        self.pyramid_of = None  # space that the pyramid was calculated from
 
     @staticmethod
     def reduced_resolution(space: np.array, reduction: int) -> np.array:
@@ -69,12 +81,50 @@ class ConfigSpace(object):
         # return np.array(summer(reshape(space))/(reduction**space.ndim)>0.5, dtype=bool)
         return summer(reshape(space)) / (reduction ** space.ndim)
 
+    def level(self, reduction: int) -> np.array:
+        """
+        Space with resolution reduced by a factor reduction along every axis. Every node carries the fraction of allowed
+        nodes in its bin (see reduced_resolution). Levels are calculated only once (from the finest level in the
+        pyramid that fits), and kept in self.pyramid. The returned array is a read-only view of the level in the
+        pyramid, copy it before changing it. The pyramid is calculated again, when a new space is assigned. After
+        changing self.space in place, call invalidate_pyramid().
+        :param reduction: By what factor the space is reduced.
+        :return: np.array
+        """
+        if self.pyramid_of is not self.space:
+            self.pyramid, self.pyramid_of = {}, self.space
+        if reduction == 1:
+            return self.space
+
+        if reduction not in self.pyramid:
+            finer = [r for r in self.pyramid if reduction % r == 0]
+            if len(finer) > 0:
+                source, factor = self.pyramid[max(finer)], reduction // max(finer)
+            else:
+                source, factor = np.asarray(self.space), reduction
+            self.pyramid[reduction] = np.array(self.reduced_resolution(source, factor), dtype=np.float32)
+        return read_only(self.pyramid[reduction])
+
+    def invalidate_pyramid(self) -> None:
+        """
+        Forget the levels of the resolution pyramid. Has to be called, whenever self.space is changed in place.
+        """
+        self.pyramid, self.pyramid_of = {}, None
+
+    def build_pyramid(self, reductions: tuple = (2, 4, 8)) -> None:
+        """
+        Calculate the levels of the resolution pyramid.
+        :param reductions: reduction factors
+        """
+        [self.level(reduction) for reduction in sorted(reductions)]
+
     def overlapping(self, ps_area):
         return np.any(self.space[ps_area.space])
 
     def draw_dual_space(self):  # the function which draws a lattice defined as networkx grid
 
-        lattice = self.dual_space
+        lattice = nx.from_scipy_sparse_array(self.dual_space)
+        lattice = nx.relabel_nodes(lattice, {n: np.unravel_index(n, self.space.shape) for n in lattice.nodes()})
 
         plt.figure(figsize=(6, 6))
         pos = {(x, y): (y, -x) for x, y in lattice.nodes()}
@@ -103,22 +153,84 @@ class ConfigSpace(object):
         b = [tu for i, tu in enumerate(a1) if i not in out_of_boundary]
         return b
 
-    def calc_dual_space(self, periodic=False) -> nx.grid_graph:
-        dual_space = nx.grid_graph(dim=self.space.shape[::-1], periodic=periodic)
+    def calc_dual_space(self, periodic=False) -> csr_matrix:
+        """
+        Weighted adjacency matrix of the nodes in the space. Nodes are numbered by np.ravel_multi_index, and every node is
+        connected to its (3 ** ndim - 1) neighbours. The edge between two nodes n1 and n2 has the weight
+        1 - space[n1] * space[n2] (weights of 0 are stored explicitly). There are no edges to nodes with space == 0.
+        :param periodic: bool, or for every axis, whether the axis is periodic
+        :return: scipy.sparse.csr_matrix of shape (space.size, space.size)
+        """
+        space = np.asarray(self.space, dtype=float)
+        if isinstance(periodic, bool):
+            periodic = [periodic] * space.ndim
+        numbers = np.arange(space.size).reshape(space.shape)
 
-        nodes = list(copy(dual_space.nodes))
+        rows, columns, weights = [], [], []
+        for offset in itertools.product((-1, 0, 1), repeat=space.ndim):
+            # on short periodic axes, different offsets reach the same neighbour (or the node itself)
+            if not any(offset) or any(per and ((o == -1 and length <= 2) or (o == 1 and length == 1))
+                                      for o, per, length in zip(offset, periodic, space.shape)):
+                continue
 
-        for node in nodes:
-            for neighbor in self.neighbors(node):
-                dual_space.add_edge(node, neighbor)
+            sources, targets = [], []
+            for o, per, length in zip(offset, periodic, space.shape):
+                source = np.arange(length)
+                target = source + o
+                if per:
+                    target = target % length
+                else:
+                    inside = np.logical_and(target >= 0, target < length)
+                    source, target = source[inside], target[inside]
+                sources.append(source)
+                targets.append(target)
 
-        for edge in list(dual_space.edges):
-            m = self.space[edge[0]] * self.space[edge[1]]
-            if m == 0:
-                dual_space.remove_edge(edge[0], edge[1])
-            else:
-                nx.set_edge_attributes(dual_space, {edge: {"weight": 1 - m}})
-        return dual_space
+            m = space[np.ix_(*sources)] * space[np.ix_(*targets)]
+            connected = m != 0
+            rows.append(numbers[np.ix_(*sources)][connected])
+            columns.append(numbers[np.ix_(*targets)][connected])
+            weights.append(1 - m[connected])
+
+        return coo_matrix((np.concatenate(weights), (np.concatenate(rows), np.concatenate(columns))),
+                          shape=(space.size, space.size)).tocsr()
+
+    def node_number(self, indices: tuple) -> int:
+        """
+        :param indices: indices of a node in the space
+        :return: number of the node in self.dual_space
+        """
+        return int(np.ravel_multi_index(tuple(indices), self.space.shape))
+
+    def scale_edge(self, start_number: int, end_number: int, factor: float) -> None:
+        """
+        Multiply the weight of an existing edge of self.dual_space. Missing edges are not created, because csgraph
+        would treat a stored 0 as an edge of weight 0.
+        :param start_number: node number (see node_number) of the start of the edge
+        :param end_number: node number of the end of the edge
+        :param factor: the weight is multiplied by factor
+        """
+        row = slice(self.dual_space.indptr[start_number], self.dual_space.indptr[start_number + 1])
+        position = np.where(self.dual_space.indices[row] == end_number)[0]
+        if position.size == 0:
+            raise KeyError('No edge between nodes ' + str(start_number) + ' and ' + str(end_number))
+        self.dual_space.data[row.start + position] *= factor
+
+    def shortest_path(self, start: tuple, end: tuple) -> list:
+        """
+        Dijkstra on the weighted self.dual_space.
+        :param start: indices of first node
+        :param end: indices of last node
+        :return: list of indices of the nodes, that connect start and end (including both)
+        """
+        start_number, end_number = self.node_number(start), self.node_number(end)
+        _, predecessors = dijkstra(self.dual_space, indices=start_number, return_predecessors=True)
+        if start_number != end_number and predecessors[end_number] < 0:
+            raise ValueError('No path between ' + str(start) + ' and ' + str(end))
+
+        path = [end_number]
+        while path[-1] != start_number:
+            path.append(predecessors[path[-1]])
+        return [tuple(int(i) for i in np.unravel_index(number, self.space.shape)) for number in path[::-1]]
 
 
 class ConfigSpace_Maze(ConfigSpace):
@@ -132,7 +244,7 @@ class ConfigSpace_Maze(ConfigSpace):
         :param name: name of the PhaseSpace.
         """
         super().__init__(space)
-        maze = Maze(size=size, shape=shape, solver=solver, geometry=geometry)
+        maze = MazeGeometry(size=size, shape=shape, solver=solver, geometry=geometry)
 
         if len(name) == 0:
             name = size + '_' + shape
@@ -143,7 +255,11 @@ class ConfigSpace_Maze(ConfigSpace):
         self.size = size
         self.geometry = geometry
 
-        x_range = (0, maze.slits[-1] + max(maze.getLoadDim()) + 1)
+        # parsed dimensions of maze and load, which define the space (see cache_key)
+        self.dimensions = {'maze_corners': maze.corners().tolist(),
+                           'load': [float(d) for d in maze.getLoadDim()]}
+
+        x_range = (0, maze.slits[-1] + max(self.dimensions['load']) + 1)
         y_range = (0, maze.arena_height)
 
         self.extent = {'x': x_range,
@@ -213,41 +329,244 @@ class ConfigSpace_Maze(ConfigSpace):
         self.space[-1, :, :] = False
         self.space[:, 0, :] = False
         self.space[:, -1, :] = False
+        self.invalidate_pyramid()
 
-    def calculate_space(self, point_particle=False, mask=None) -> None:
+    def ensure_maze_edges(self) -> None:
+        """
+        Make sure, that the x&y edges of self.space are 0 (see initialize_maze_edges). A space, that has them already,
+        is not changed, and keeps its pyramid. Otherwise the space is copied before the edges are set, so that arrays
+        shared with others (or read-only ones) are not changed.
         """
-        This module calculated a space.
+        space = self.space
+        if space is None:
+            return
+        if np.any(space[0]) or np.any(space[-1]) or np.any(space[:, 0]) or np.any(space[:, -1]):
+            self.space = np.array(space, dtype=bool)
+            self.initialize_maze_edges()
+
+    def calculate_space(self, point_particle=False, mask=None, chunk_size: int = 4096, n_jobs: int = 1,
+                        slab_size: int = None, method: str = 'segments') -> None:
+        """
+        This module calculated a space. All (x, y) configurations of one theta slice are checked at once.
         :param point_particle:
         :param mask: If a mask is given only the unmasked area is calcuted. This is used to finetune maze dimensions.
+        :param chunk_size: how many configurations are checked for collisions at the same time
+        :param n_jobs: number of processes. If n_jobs != 1, the x axis is split into slabs, which are calculated in
+        parallel and saved in self.checkpoint_directory(), so that an interrupted calculation can be resumed.
+        :param slab_size: number of x indices per slab (only used if n_jobs != 1)
+        :param method: 'segments' checks intersections of load and maze edges, 'raster' uses rasterized images of load
+        and maze (see raster_space).
         :return:
         """
-        maze = Maze(size=self.size, shape=self.shape, solver=self.solver, geometry=self.geometry)
-        load = maze.bodies[-1]
-
-        maze_bb = Maze(size=self.size, shape=self.shape, solver=self.solver, geometry=self.geometry, bb=True)
-        load_bb = maze_bb.bodies[-1]
+        print("PhaseSpace: Calculating space " + self.name)
+        if method == 'raster':
+            self.space = self.raster_space()
+            if mask is not None:
+                self.space = np.logical_and(self.space, mask)
+            return
+
+        if n_jobs != 1:
+            self.space = None
+            self.space = self.calculate_in_slabs('space', n_jobs=n_jobs, slab_size=slab_size, mask=mask,
+                                                 chunk_size=chunk_size)
+            return
 
         # initialize 3d map for the phase_space
-        self.space = self.empty_space()
-        print("PhaseSpace: Calculating space " + self.name)
+        self.space = self.calculate_space_slab(0, self.space_shape()[0], mask=mask, chunk_size=chunk_size)
+
+    def collision_corners(self) -> tuple:
+        """
+        Corners needed to check for collisions.
+        :return: corners of the load and of its bounding box in the load frame, corners of the maze. All of them are
+        np.arrays of shape (number of rectangles, 4, 2)
+        """
+        maze = MazeGeometry(size=self.size, shape=self.shape, solver=self.solver, geometry=self.geometry)
+        return LoadGeometry(maze).corners, LoadGeometry(maze, bb=True).corners, maze.wall_corners()
+
+    def calculate_space_slab(self, ix_start: int, ix_stop: int, mask=None, chunk_size: int = 4096) -> np.array:
+        """
+        Calculate the part of the space with x indices between ix_start and ix_stop.
+        :param ix_start: first index in axis 0 direction
+        :param ix_stop: last index in axis 0 direction (not included)
+        :param mask: If a mask is given only the unmasked area is calculated. Has the shape of the slab.
+        :param chunk_size: how many configurations are checked for collisions at the same time
+        :return: boolean np.array of shape (ix_stop - ix_start, ny, ntheta)
+        """
+        load_corners, load_bb_corners, maze_corners = self.collision_corners()
+        checker = CollisionChecker(load_corners, maze_corners)
+        bb_checker = CollisionChecker(load_bb_corners, maze_corners)
+        nx, ny, ntheta = self.space_shape()
 
-        maze_corners = np.array_split(maze.corners(), int(maze.corners().shape[0] / 4))
-        former_found = (0, 0)
-        for x, y, theta in self.iterate_coordinates(mask=mask):
-            indices = self.coords_to_indices(x, y, theta)
+        slab = np.zeros((ix_stop - ix_start, ny, ntheta), dtype=bool)
+        for itheta in tqdm(range(ntheta)):
+            mask_slice = np.zeros((nx, ny), dtype=bool)
+            if mask is None:
+                mask_slice[ix_start:ix_stop] = True
+            else:
+                mask_slice[ix_start:ix_stop] = mask[:, :, itheta]
+                if not np.any(mask_slice):
+                    continue
+            slab[:, :, itheta] = self.calculate_theta_slice(itheta, checker, bb_checker,
+                                                            mask=mask_slice, chunk_size=chunk_size)[ix_start:ix_stop]
+        return slab
+
+    def calculate_theta_slice(self, itheta: int, checker: CollisionChecker, bb_checker: CollisionChecker,
+                              mask: np.array = None, chunk_size: int = 4096) -> np.array:
+        """
+        Calculate the x-y slice of the space at a given theta index.
+        :param itheta: index in axis 2 direction
+        :param checker: CollisionChecker of the load and the maze
+        :param bb_checker: CollisionChecker of the bounding box of the load and the maze
+        :param mask: 2 dimensional mask. If given, only the unmasked area is calculated.
+        :param chunk_size: how many configurations are checked for collisions at the same time
+        :return: boolean np.array of shape (nx, ny)
+        """
+        slice_shape = self.space_shape()[:2]
+        if mask is None:
+            mask = np.ones(slice_shape, dtype=bool)
+        ix, iy = np.where(mask)
+        x, y, theta = self.indices_to_coords(ix, iy, itheta)
+        positions = np.stack([x, y], axis=1)
+
+        possible = np.zeros(ix.shape[0], dtype=bool)
+        for start in range(0, ix.shape[0], chunk_size):
+            chunk = slice(start, start + chunk_size)
+            angles = np.full(positions[chunk].shape[0], theta)
 
             # first check the bounding box
-            maze_bb.set_configuration([x, y], float(theta))
-            if possible_configuration(load_bb, maze_corners, former_found)[0]:
-                self.space[indices], former_found = True, (0, 0)
+            possible_chunk = bb_checker.possible_configurations(positions[chunk], angles)
+            to_check = ~possible_chunk
+            if np.any(to_check):
+                possible_chunk[to_check] = checker.possible_configurations(positions[chunk][to_check],
+                                                                           angles[to_check])
+            possible[chunk] = possible_chunk
+
+        space_slice = np.zeros(slice_shape, dtype=bool)
+        space_slice[ix, iy] = possible
+        return space_slice
+
+    def raster_space(self, reduction: int = 1) -> np.array:
+        """
+        Build the space from rasterized images: The maze walls are rasterized once, the load is rasterized for every
+        theta, and the forbidden (x, y) positions of a theta slice are found by correlating the two images (Minkowski
+        sum of walls and load). Pixels touched by walls or load count as occupied, so the result errs on the side of
+        collisions.
+        :param reduction: only every reduction-th index along every axis is calculated (fast, coarse preview)
+        :return: boolean np.array, True if configuration is possible
+        """
+        load_corners, _, maze_corners = self.collision_corners()
+        res = self.pos_resolution * reduction
+        nx, ny, ntheta = [int(np.ceil(n / reduction)) for n in self.space_shape()]
+
+        # the load reaches up to r pixels away from its center
+        r = int(np.ceil(np.max(np.linalg.norm(load_corners, axis=-1)) / res)) + 1
+
+        # walls on a grid that is padded by r pixels. Everything outside of the arena counts as wall.
+        x = self.extent['x'][0] + np.arange(-r, nx + r) * res
+        y = self.extent['y'][0] + np.arange(-r, ny + r) * res
+        points = np.stack(np.meshgrid(x, y, indexing='ij'), axis=-1)
+        arena, slits = maze_corners[:1], maze_corners[1:]
+        walls = np.logical_or(~points_in_polygons(points, arena, tolerance=-res / 2),
+                              points_in_polygons(points, slits, tolerance=res / 2))
+
+        offsets = np.arange(-r, r + 1) * res
+        offsets = np.stack(np.meshgrid(offsets, offsets, indexing='ij'), axis=-1)
+
+        space = np.zeros((nx, ny, ntheta), dtype=bool)
+        print('Rasterizing space ' + self.name)
+        for itheta in tqdm(range(ntheta)):
+            theta = self.extent['theta'][0] + itheta * reduction * self.theta_resolution
+            rotated_load = transform_corners(load_corners, np.zeros((1, 2)), np.array([theta]))[0]
+            footprint = points_in_polygons(offsets, rotated_load, tolerance=res / 2)
+
+            # correlation of walls and load: how many wall pixels the load covers at every position
+            overlap = fftconvolve(walls.astype(float), footprint[::-1, ::-1].astype(float), mode='valid')
+            space[:, :, itheta] = overlap < 0.5
+        return space
+
+    def checkpoint_directory(self, name: str) -> str:
+        """
+        Where the slabs of a parallel calculation are saved, until the calculation is finished.
+        :param name: what is calculated ('space' or 'boundary')
+        :return: string with the name of the directory
+        """
+        return self.directory()[:-4] + '_' + name + '_slabs'
+
+    def slabs(self, slab_size: int = None, n_jobs: int = 1) -> list:
+        """
+        Split the x axis into slabs.
+        :param slab_size: number of x indices per slab. If None, every process gets about four slabs.
+        :param n_jobs: number of processes, as in joblib (-1 for all cores, -2 for all but one, ...)
+        :return: list of (ix_start, ix_stop)
+        """
+        nx = self.space_shape()[0]
+        if slab_size is None:
+            n_processes = effective_n_jobs(n_jobs)
+            slab_size = max(1, int(np.ceil(nx / (4 * n_processes))))
+        return [(ix_start, min(ix_start + slab_size, nx)) for ix_start in range(0, nx, slab_size)]
+
+    def calculate_in_slabs(self, name: str, n_jobs: int = -1, slab_size: int = None, mask=None,
+                           chunk_size: int = 4096) -> np.array:
+        """
+        Calculate space or boundary in slabs along the x axis on a pool of processes. Every finished slab is saved
+        in self.checkpoint_directory(name). Slabs that are found there are not calculated again, so a killed
+        calculation continues where it stopped. The checkpoints are deleted, once all slabs are stitched together.
+        The checkpoint directory carries a header.json with cache_key(), name and a hash of the input (mask for
+        'space', space for 'boundary'). Checkpoints with a different header are discarded.
+        :param name: 'space' or 'boundary'
+        :param n_jobs: number of processes (-1 for all cores)
+        :param slab_size: number of x indices per slab
+        :param mask: only for 'space': If a mask is given only the unmasked area is calculated.
+        :param chunk_size: only for 'space': how many configurations are checked for collisions at the same time
+        :return: np.array with the full space or boundary
+        """
+        checkpoint_directory = self.checkpoint_directory(name)
+        header = {'key': self.cache_key(), 'name': name,
+                  'input': array_hash(mask if name == 'space' else self.space)}
+        header_filename = os.path.join(checkpoint_directory, 'header.json')
+        if os.path.exists(checkpoint_directory):
+            try:
+                with open(header_filename, 'r') as json_file:
+                    valid = json.load(json_file) == header
+            except (OSError, ValueError):
+                valid = False
+            if not valid:
+                print('Discarding checkpoints in ' + checkpoint_directory + ', they belong to a different calculation')
+                shutil.rmtree(checkpoint_directory)
+        if not os.path.exists(checkpoint_directory):
+            os.makedirs(checkpoint_directory)
+            with open(header_filename, 'w') as json_file:
+                json.dump(header, json_file, indent=4)
+
+        slabs = self.slabs(slab_size=slab_size, n_jobs=n_jobs)
+        filenames = [os.path.join(checkpoint_directory, str(ix_start) + '_' + str(ix_stop) + '.npy')
+                     for ix_start, ix_stop in slabs]
+        to_calculate = [(slab, filename) for slab, filename in zip(slabs, filenames) if not os.path.exists(filename)]
+        print('Calculating ' + str(len(to_calculate)) + ' of ' + str(len(slabs)) + ' slabs of ' + name + ' ' +
+              self.name + ', the rest was found in ' + checkpoint_directory)
+
+        worker = copy(self)
+        worker.space, worker.space_boundary, worker.fig = None, None, None
+        jobs = []
+        for (ix_start, ix_stop), filename in to_calculate:
+            if name == 'space':
+                slab_mask = None if mask is None else mask[ix_start:ix_stop]
+                jobs.append(delayed(_calculate_slab)(worker.calculate_space_slab, filename, ix_start, ix_stop,
+                                                     mask=slab_mask, chunk_size=chunk_size))
+            elif name == 'boundary':
+                # every slab needs its neighbouring x indices to find the boundary
+                lower, upper = max(ix_start - 1, 0), min(ix_stop + 1, self.space.shape[0])
+                slab_worker = copy(worker)
+                slab_worker.space = self.space[lower:upper]
+                jobs.append(delayed(_calculate_slab)(slab_worker.calculate_boundary_slab, filename,
+                                                     ix_start - lower, ix_stop - lower))
             else:
-                maze.set_configuration([x, y], float(theta))
-                self.space[indices], former_found = possible_configuration(load, maze_corners, former_found)
-            # load.position, load.angle = [x, y], float(theta)
-            # from PhysicsEngine.Display import Display
-            # display = Display('', maze)
-            # maze.draw(display)
-            # display.display()
+                raise ValueError('Unknown name ' + name)
+        Parallel(n_jobs=n_jobs)(jobs)
+
+        result = np.concatenate([np.load(filename) for filename in filenames], axis=0)
+        shutil.rmtree(checkpoint_directory)
+        return result
 
     def new_fig(self):
         """
@@ -280,12 +599,11 @@ class ConfigSpace_Maze(ConfigSpace):
             self.load_space()
 
         if space is None:
-            space = np.array(self.space, dtype=int)
+            space = self.level(reduction) if reduction > 1 else np.array(self.space, dtype=int)
         else:
             space = np.array(space, dtype=int)
-
-        if reduction > 1:
-            space = self.reduced_resolution(space, reduction)
+            if reduction > 1:
+                space = self.reduced_resolution(space, reduction)
 
         def prune(array1, array2):
             """
@@ -359,17 +677,16 @@ class ConfigSpace_Maze(ConfigSpace):
 
     def iterate_neighbours(self, ix, iy, itheta) -> iter:
         """
-        Iterate over all the neighboring pixels of a given pixel
+        Iterate over all the neighboring pixels of a given pixel (periodic in theta)
         :param ix: index in 0 axis direction
         :param iy: index in 1 axis direction
         :param itheta: index in 2 axis direction
         :return: iterator over the neighbors
         """
         for dx, dy, dtheta in itertools.product([-1, 0, 1], repeat=3):
-            _ix, _iy, _itheta = ix + dx, iy + dx, itheta + dtheta
+            _ix, _iy, _itheta = ix + dx, iy + dy, (itheta + dtheta) % self.space.shape[2]
             if ((_ix >= self.space.shape[0]) or (_ix < 0)
                     or (_iy >= self.space.shape[1]) or (_iy < 0)
-                    or (_itheta >= self.space.shape[2]) or (_itheta < 0)
                     or ((dx, dy, dtheta) == (0, 0, 0))):
                 continue
             yield _ix, _iy, _itheta
@@ -382,45 +699,183 @@ class ConfigSpace_Maze(ConfigSpace):
     #                 color=color, tube_radius=0.045, colormap='Spectral')
     #     mlab.points3d([traj[0, 0]], [traj[1, 0]], [traj[2, 0]])
 
-    def save_space(self, directory: str = None) -> None:
+    def save_space(self, directory: str = None, packed: bool = False, chunk_shape: tuple = None,
+                   point_particle: bool = False) -> None:
         """
-        Pickle the numpy array in given path, or in default path. If default directory exists, add a string for time, in
-        order not to overwrite the old .pkl file.
-        :param directory: Where you would like to save.
+        Save space and boundary as .npy files with a .json header (see write_space), in given path, or in default path.
+        If default directory exists, add a string for time, in order not to overwrite the old files. A given directory
+        is overwritten.
+        :param directory: Where you would like to save (.pkl path, as returned by self.directory()).
+        :param packed: Save the arrays bit-packed (8 times smaller, but cannot be memory-mapped when loading).
+        :param chunk_shape: Save the arrays in compressed chunks of this shape (see ChunkedArray).
+        :param point_particle: whether the space was calculated for a point particle
         """
         if not hasattr(self, 'space') and self.space is not None:
             self.calculate_space()
         if not hasattr(self, 'space_boundary') and self.space_boundary is not None:
             self.calculate_boundary()
         if directory is None:
-            if os.path.exists(self.directory()):
+            directory = self.directory(point_particle=point_particle)
+            if os.path.exists(directory) or os.path.exists(self.header_directory(directory)):
                 now = datetime.now()
                 date_string = '_' + now.strftime("%Y") + '_' + now.strftime("%m") + '_' + now.strftime("%d")
-                directory = self.directory(addition=date_string)
+                directory = self.directory(point_particle=point_particle, addition=date_string)
+        print('Saving ' + self.name + ' in path: ' + self.header_directory(directory))
+        # the pyramid has to be built from the final space
+        self.ensure_maze_edges()
+        self.build_pyramid()
+        self.write_space(directory, packed=packed, chunk_shape=chunk_shape, point_particle=point_particle)
+
+    @staticmethod
+    def header_directory(directory: str) -> str:
+        """
+        :param directory: .pkl path of a space (as returned by self.directory())
+        :return: path of the .json header of the space
+        """
+        return directory[:-4] + '.json'
+
+    def write_space(self, directory: str, packed: bool = False, chunk_shape: tuple = None,
+                    point_particle: bool = False) -> None:
+        """
+        Write space and boundary as .npy files next to a small .json header, which carries extent, resolution, shape
+        and the cache key. The maze edges of the space are set first (see ensure_maze_edges), so that the space and
+        its pyramid are saved the way they are used.
+        :param directory: .pkl path of the space (as returned by self.directory())
+        :param packed: Save the arrays bit-packed with np.packbits
+        :param chunk_shape: Save the arrays in compressed chunks of this shape (see ChunkedArray) instead of .npy
+        :param point_particle: whether the space was calculated for a point particle (part of the cache key)
+        """
+        reductions = sorted(self.pyramid) if self.pyramid_of is self.space else []
+        self.ensure_maze_edges()
+        # levels, that were dropped because the maze edges changed the space, are calculated from the final space
+        self.build_pyramid(reductions)
+        header = {'extent': {axis: list(extent) for axis, extent in self.extent.items()},
+                  'pos_resolution': self.pos_resolution,
+                  'theta_resolution': self.theta_resolution,
+                  'shape': list(self.space.shape),
+                  'packed': packed,
+                  'chunk_shape': None if chunk_shape is None else list(chunk_shape),
+                  'key': self.cache_key(point_particle=point_particle),
+                  'maze_edges': True,
+                  'arrays': {},
+                  'pyramid': {}}
+
+        def replace(filename: str) -> str:
+            # files can be hard linked into the SpaceCache, so they are replaced instead of overwritten
+            for f in [filename, filename + '.json']:
+                if os.path.exists(f):
+                    os.remove(f)
+            return filename
+
+        for name, array in [('space', self.space), ('boundary', self.space_boundary)]:
+            if array is None:
+                continue
+            array = np.array(array, dtype=bool)
+            if chunk_shape is not None:
+                filename = directory[:-4] + '_' + name + '.chunks'
+                ChunkedArray.write(array, replace(filename), chunk_shape=chunk_shape)
             else:
-                directory = self.directory()
-        print('Saving ' + self.name + ' in path: ' + directory)
-        pickle.dump((np.array(self.space, dtype=bool),
-                     np.array(self.space_boundary, dtype=bool),
-                     self.extent),
-                    open(directory, 'wb'))
+                if packed:
+                    array = np.packbits(array, axis=None)
+                filename = directory[:-4] + '_' + name + '.npy'
+                np.save(replace(filename), array)
+            header['arrays'][name] = os.path.basename(filename)
+
+        if self.pyramid_of is self.space:
+            for reduction, level in sorted(self.pyramid.items()):
+                filename = directory[:-4] + '_pyramid_' + str(reduction) + '.npy'
+                np.save(replace(filename), level)
+                header['pyramid'][str(reduction)] = os.path.basename(filename)
+
+        with open(self.header_directory(directory), 'w') as json_file:
+            json.dump(header, json_file, indent=4)
+
+    def read_space(self, directory: str, mmap_mode: str = 'c') -> None:
+        """
+        Read space and boundary written by write_space.
+        :param directory: .pkl path of the space (as returned by self.directory())
+        :param mmap_mode: mode for np.load. With 'c' (copy-on-write) only the pages which are indexed are read from
+        disk, and changes to the space stay in memory. Packed arrays are always read completely. Chunked arrays are
+        read chunk by chunk. Spaces written before the maze edges were set at write time get them now.
+        """
+        with open(self.header_directory(directory), 'r') as json_file:
+            header = json.load(json_file)
+        self.extent = {axis: tuple(extent) for axis, extent in header['extent'].items()}
+        self.pos_resolution, self.theta_resolution = header['pos_resolution'], header['theta_resolution']
+        shape = tuple(header['shape'])
+
+        arrays = {'space': None, 'boundary': None}
+        for name, filename in header['arrays'].items():
+            filename = os.path.join(os.path.dirname(directory), filename)
+            if header.get('chunk_shape') is not None:
+                arrays[name] = ChunkedArray(filename)
+            elif header['packed']:
+                arrays[name] = np.unpackbits(np.load(filename), count=int(np.prod(shape))).reshape(shape).astype(bool)
+            else:
+                arrays[name] = np.load(filename, mmap_mode=mmap_mode)
+        self.space, self.space_boundary = arrays['space'], arrays['boundary']
 
-    def load_space(self, point_particle: bool = False) -> None:
+        self.pyramid, self.pyramid_of = {}, self.space
+        for reduction, filename in header.get('pyramid', {}).items():
+            self.pyramid[int(reduction)] = np.load(os.path.join(os.path.dirname(directory), filename),
+                                                   mmap_mode=mmap_mode)
+        if not header.get('maze_edges', False):
+            self.ensure_maze_edges()
+
+    def cache_key(self, point_particle: bool = False) -> str:
         """
-        Load Phase Space pickle.
+        Key of the space in the SpaceCache. It changes, whenever the dimensions of maze or load, the resolution or the
+        solver change, independent of the names of the dimension spreadsheets.
+        :param point_particle: point_particles=True means that the load had no fixtures when ps was calculated.
+        :return: hash (hex string)
+        """
+        description = {'solver': self.solver, 'shape': self.shape,
+                       'dimensions': self.dimensions,
+                       'extent': {axis: list(extent) for axis, extent in self.extent.items()},
+                       'pos_resolution': self.pos_resolution, 'theta_resolution': self.theta_resolution,
+                       'point_particle': point_particle}
+        return hashlib.sha1(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def load_space(self, point_particle: bool = False, mmap_mode: str = 'c', use_cache: bool = True) -> None:
+        """
+        Load Phase Space. Spaces are looked up in the SpaceCache first. Spaces saved with a .json header are
+        memory-mapped, older spaces are unpickled. Spaces whose header shows, that they were calculated for different
+        dimensions, are calculated again.
         :param point_particle: point_particles=True means that the load had no fixtures when ps was calculated.
+        :param mmap_mode: see read_space
+        :param use_cache: look up and store the space in the SpaceCache
         """
         directory = self.directory(point_particle=point_particle)
-        if os.path.exists(directory):
+        key = self.cache_key(point_particle=point_particle)
+        cached = SpaceCache().get(key) if use_cache else None
+
+        if cached is not None:
+            self.read_space(cached, mmap_mode=mmap_mode)
+        elif os.path.exists(self.header_directory(directory)) and self.saved_key(directory) in [None, key]:
+            self.read_space(directory, mmap_mode=mmap_mode)
+        elif os.path.exists(directory) and not os.path.exists(self.header_directory(directory)):
             (self.space, self.space_boundary, self.extent) = pickle.load(open(directory, 'rb'))
             self.initialize_maze_edges()
             if self.extent['theta'] != (0, 2 * np.pi):
                 print('need to correct' + self.name)
         else:
+            if os.path.exists(self.header_directory(directory)):
+                print(directory + ' was calculated for different dimensions. Calculating ' + self.name + ' again.')
             self.calculate_boundary(point_particle=point_particle)
-            self.save_space()
+            # a space calculated for different dimensions is replaced
+            self.save_space(directory=directory, point_particle=point_particle)
+            if use_cache:
+                SpaceCache().put(self, key, directory=directory)
         return
 
+    def saved_key(self, directory: str):
+        """
+        :param directory: .pkl path of a space saved with write_space
+        :return: cache key, which was saved in the header of the space (None for spaces saved before keys existed)
+        """
+        with open(self.header_directory(directory), 'r') as json_file:
+            return json.load(json_file).get('key')
+
     def _is_boundary_cell(self, x, y, theta) -> bool:
         if not self.space[x, y, theta]:
             return False
@@ -450,9 +905,8 @@ class ConfigSpace_Maze(ConfigSpace):
         """
         if value is None:
             return None
-        resolut = {0: self.pos_resolution, 1: self.pos_resolution, 2: self.theta_resolution}[axis]
-        value_i = min(int(np.round((value - list(self.extent.values())[axis][0]) / resolut)),
-                      self.space.shape[axis] - 1)
+        origin, resolution = self.grid()
+        value_i = min(int(np.round((value - origin[axis]) / resolution[axis])), self.space.shape[axis] - 1)
 
         if value_i >= self.space.shape[axis] or value_i <= -1:
             print('check', list(self.extent.keys())[axis])
@@ -469,27 +923,92 @@ class ConfigSpace_Maze(ConfigSpace):
         return self.coords_to_index(0, x), self.coords_to_index(1, y), \
                self.coords_to_index(2, theta % (2 * np.pi))
 
+    def grid(self) -> (np.array, np.array):
+        """
+        :return: coordinates of the node with index (0, 0, 0), and resolution along the three axes
+        """
+        return np.array([self.extent['x'][0], self.extent['y'][0], self.extent['theta'][0]]), \
+               np.array([self.pos_resolution, self.pos_resolution, self.theta_resolution])
+
+    def coords_to_indices_array(self, coords: np.array) -> np.array:
+        """
+        Vectorized version of coords_to_indices: same rounding, clipping and wrapping of theta.
+        :param coords: np.array of shape (N, 3) with x, y position of CM in cm and orientation in radian
+        :return: np.array of shape (N, 3) with (xi, yi, thetai)
+        """
+        coords = np.array(coords, dtype=float).reshape((-1, 3))
+        coords[:, 2] = coords[:, 2] % (2 * np.pi)
+        origin, resolution = self.grid()
+        indices = np.round((coords - origin) / resolution).astype(int)
+        np.minimum(indices, np.array(self.space.shape) - 1, out=indices)
+
+        if np.any(indices <= -1):
+            print('check', [axis for axis, below in zip(self.extent.keys(), np.any(indices <= -1, axis=0)) if below])
+        return indices
+
+    def indices_to_coords_array(self, indices: np.array) -> np.array:
+        """
+        Vectorized version of indices_to_coords.
+        :param indices: np.array of shape (N, 3) with (xi, yi, thetai)
+        :return: np.array of shape (N, 3) with (x, y, theta)
+        """
+        origin, resolution = self.grid()
+        return origin + np.asarray(indices).reshape((-1, 3)) * resolution
+
+    def space_shape(self) -> tuple:
+        """
+        :return: shape of the space, given self.extent and the resolution
+        """
+        return (int(np.ceil((self.extent['x'][1] - self.extent['x'][0]) / float(self.pos_resolution))),
+                int(np.ceil((self.extent['y'][1] - self.extent['y'][0]) / float(self.pos_resolution))),
+                int(np.ceil((self.extent['theta'][1] - self.extent['theta'][0]) / float(self.theta_resolution))))
+
     def empty_space(self) -> np.array:
-        return np.zeros((int(np.ceil((self.extent['x'][1] - self.extent['x'][0]) / float(self.pos_resolution))),
-                         int(np.ceil((self.extent['y'][1] - self.extent['y'][0]) / float(self.pos_resolution))),
-                         int(np.ceil(
-                             (self.extent['theta'][1] - self.extent['theta'][0]) / float(self.theta_resolution)))),
-                        dtype=bool)
+        return np.zeros(self.space_shape(), dtype=bool)
 
-    def calculate_boundary(self, point_particle=False, mask=None) -> None:
+    def calculate_boundary(self, point_particle=False, mask=None, n_jobs: int = 1, slab_size: int = None) -> None:
         """
         Calculate the boundary of a given PhaseSpace.
         :param point_particle:
         :param mask: Where to calculate space (usefull just for testing)
+        :param n_jobs: number of processes. If n_jobs != 1, space and boundary are calculated in slabs along the x
+        axis in parallel (see calculate_in_slabs).
+        :param slab_size: number of x indices per slab (only used if n_jobs != 1)
         :return:
         """
         if self.space is None:
-            self.calculate_space(point_particle=point_particle, mask=mask)
-        self.space_boundary = self.empty_space()
+            self.calculate_space(point_particle=point_particle, mask=mask, n_jobs=n_jobs, slab_size=slab_size)
         print("PhaseSpace: Calculating boundaries " + self.name)
-        for ix, iy, itheta in self.iterate_space_index(mask=mask):
-            if self._is_boundary_cell(ix, iy, itheta):
-                self.space_boundary[ix, iy, itheta] = 1
+        if n_jobs != 1:
+            self.space_boundary = None
+            self.space_boundary = self.calculate_in_slabs('boundary', n_jobs=n_jobs, slab_size=slab_size)
+        else:
+            self.space_boundary = self.boundary(self.space)
+        if mask is not None:
+            self.space_boundary = np.logical_and(self.space_boundary, mask)
+
+    def calculate_boundary_slab(self, ix_start: int, ix_stop: int) -> np.array:
+        """
+        Calculate the boundary of self.space with x indices between ix_start and ix_stop.
+        :param ix_start: first index in axis 0 direction
+        :param ix_stop: last index in axis 0 direction (not included)
+        :return: boolean np.array of shape (ix_stop - ix_start, ny, ntheta)
+        """
+        return self.boundary(self.space)[ix_start:ix_stop]
+
+    @staticmethod
+    def boundary(space: np.array) -> np.array:
+        """
+        Boundary of a space: allowed nodes with at least one forbidden node among their 26 neighbours
+        (space AND NOT eroded(space)). Theta is periodic, neighbours outside of x and y range are ignored, just like in
+        _is_boundary_cell.
+        :param space: boolean np.array
+        :return: boolean np.array of the same shape
+        """
+        space = np.asarray(space, dtype=bool)
+        padded = wrap_pad(space, 1)
+        eroded = ndimage.binary_erosion(padded, structure=np.ones((3, 3, 3), dtype=bool), border_value=1)[:, :, 1:-1]
+        return np.logical_and(space, ~eroded)
 
     def draw(self, positions, angles, scale_factor: float = 0.5, color=(1, 0, 0)) -> None:
         """
@@ -539,42 +1058,94 @@ class ConfigSpace_Maze(ConfigSpace):
         """
         print('Dilating space...')
         struct = np.ones([radius for _ in range(space.ndim)], dtype=bool)
-        return np.array(ndimage.binary_dilation(space, structure=struct), dtype=bool)
+        return periodic_binary_dilation(space, struct)
 
     @staticmethod
-    def erode(space, radius: int) -> np.array:
+    def erode(space, radius: int, distance: np.array = None) -> np.array:
         """
-        Erode phase space.
-        We erode twice
+        Erode phase space with a cube of side length radius. Theta is periodic, nodes beyond the borders of x and y
+        count as not in space.
         :param space: Actual space you want to erode
         :param radius: radius of erosion
+        :param distance: erosion_distance of space with the parity of radius, if it was already calculated
         """
         print('Eroding space...')
+        if distance is None:
+            distance = ConfigSpace_Maze.erosion_distance(space, even=radius % 2 == 0, max_radius=radius)
+        return distance >= ConfigSpace_Maze.erosion_threshold(radius)
 
-        def erode_space(space, struct):
-            return ndimage.binary_erosion(space, structure=struct)
-            # return np.array(~ndimage.binary_erosion(~np.array(space, dtype=bool), structure=struct), dtype=bool)
-
-        struct = np.ones([radius for _ in range(space.ndim)], dtype=bool)
-        space1 = erode_space(space, struct)
+    @staticmethod
+    def erosion_threshold(radius: int) -> int:
+        """
+        :return: smallest erosion_distance of the nodes that survive erosion with radius
+        """
+        return int(np.ceil(radius / 2))
 
-        slice = int(space.shape[-1] / 2)
-        space2 = erode_space(np.concatenate([space[:, :, slice:], space[:, :, :slice]], axis=2), struct)
-        space2 = np.concatenate([space2[:, :, slice:], space2[:, :, :slice]], axis=2)
+    @staticmethod
+    def erosion_distance(space: np.array, even: bool = False, max_radius: int = None) -> np.array:
+        """
+        Chessboard distance of every node in space to the closest node, that is not in space. Nodes beyond the borders of
+        x and y count as not in space, theta is periodic. Erosion with a radius is a threshold of this distance (see
+        erode). For even radii, the cube is not centered on the node, so the distance is measured in the space eroded
+        with a 2x2x2 cube first (even=True).
+        :param space: boolean space
+        :param even: distance for erosion with even radii
+        :param max_radius: largest radius, that the distance is used for (larger distances are not exact)
+        :return: np.array with distances
+        """
+        space = np.asarray(space, dtype=bool)
+        if even:
+            space = periodic_binary_erosion(space, np.ones((2, 2, 2), dtype=bool))
+
+        wrap = space.shape[2]
+        if max_radius is not None:
+            wrap = min(wrap, ConfigSpace_Maze.erosion_threshold(max_radius))
+        padded = np.zeros((space.shape[0] + 2, space.shape[1] + 2, space.shape[2] + 2 * wrap), dtype=bool)
+        wrap_pad(space, wrap, out=padded[1:-1, 1:-1])
+        distance = ndimage.distance_transform_cdt(padded, metric='chessboard')
+        return distance[1:-1, 1:-1, wrap:wrap + space.shape[2]]
+
+    def erosion_sweep(self, radii: list, space: np.array = None) -> dict:
+        """
+        Erode the space with many radii, and find the connected components of every eroded space (theta is periodic).
+        The distance transform is calculated only once for odd and once for even radii.
+        :param radii: radii of erosion
+        :param space: space to erode (by default self.space)
+        :return: dictionary with the sizes of the connected components (largest first) for every radius
+        """
+        if space is None:
+            space = self.space
+        distances = {}
+        sizes = {}
+        for radius in tqdm(sorted(radii)):
+            even = radius % 2 == 0
+            if even not in distances:
+                distances[even] = self.erosion_distance(space, even=even, max_radius=max(radii))
+            sizes[radius] = self.periodic_component_sizes(distances[even] >= self.erosion_threshold(radius))
+        return sizes
 
-        return np.logical_or(space1, space2)  # have to check, if its really a logical or...
+    @staticmethod
+    def periodic_component_sizes(space: np.array) -> np.array:
+        """
+        :param space: boolean space
+        :return: number of nodes in every connected component of space (largest first). Components that touch each
+        other across theta = 0/2pi are counted as one.
+        """
+        labels, number_cc = cc3d.connected_components(space, connectivity=6, return_N=True)
+        roots = ConfigSpace_Maze.seam_roots(labels, range(1, number_cc + 1))
+        voxel_counts = np.bincount([roots[label] for label in range(1, number_cc + 1)],
+                                   weights=cc3d.statistics(labels)['voxel_counts'][1:number_cc + 1])
+        return np.sort(voxel_counts[voxel_counts > 0].astype(int))[::-1]
 
     def split_connected_components(self, space: np.array) -> (list, list):
         """
         from self find connected components
-        Take into account periodicity
-        :param cc_to_keep: how many connected components to keep (10 for SPT)
+        Take into account periodicity: components that touch each other across theta = 0/2pi are merged into one state.
+        Every state is saved only in the bounding box of its component (see PS_Area).
         :param space: which space should be split
-        :return: list of ps spaces, that have only single connected components
+        :return: list of ps spaces, that have only single connected components, and their centroids
         """
-        ps_states = []
         letters = list(string.ascii_lowercase)
-        centroids = np.empty((0, 3))
         labels, number_cc = cc3d.connected_components(space, connectivity=6, return_N=True)
         stats = cc3d.statistics(labels)
         voxel_counts = [stats['voxel_counts'][label] for label in range(stats['voxel_counts'].shape[0])]
@@ -585,50 +1156,268 @@ class ConfigSpace_Maze(ConfigSpace):
         chosen_cc = np.where((max_cc_size > stats['voxel_counts']) & (stats['voxel_counts'] > min_cc_size))[0]
         assert chosen_cc.shape[0] == 10, 'something is off'
 
-        for label in chosen_cc:
-            ps = PS_Area(self, np.bool_(labels == label), letters.pop(0))
+        # every chosen component uses up a letter, also if it is merged into a state with a smaller label
+        names = {int(label): letters.pop(0) for label in chosen_cc}
+        roots = self.seam_roots(labels, names.keys())
+        groups = {}
+        for label in names.keys():
+            groups.setdefault(roots[label], []).append(label)
+
+        boxes = ndimage.find_objects(labels)
+        ps_states, centroids = [], np.empty((0, 3))
+        for root, group in groups.items():
+            mask, box_start = self.component_box(labels, group, boxes)
+            ps_states.append(PS_Area(self, mask, box_start, names[root], full_shape=space.shape))
+
+            centroid = np.array(self.indices_to_coords(*np.floor(stats['centroids'][root])))
+            if len(group) > 1:
+                centroid[-1] = 0
+            centroids = np.vstack([centroids, centroid])
+        return ps_states, centroids
 
-            # if this is part of a another ps that is split by 0 or 2pi
-            centroid = np.array(self.indices_to_coords(*np.floor(stats['centroids'][label])))
+    @staticmethod
+    def seam_roots(labels: np.array, chosen) -> dict:
+        """
+        Union-find of the components, that are connected across the seam at theta = 0/2pi.
+        :param labels: labeled space (labels of components, as if theta was not periodic)
+        :param chosen: labels of the components to consider
+        :return: dictionary with the smallest label of the connected components for every label in chosen
+        """
+        parent = {label: label for label in chosen}
 
-            border_bottom = np.any(ps.space[:, :, 0])
-            border_top = np.any(ps.space[:, :, -1])
+        def find(label):
+            while parent[label] != label:
+                parent[label] = parent[parent[label]]
+                label = parent[label]
+            return label
 
-            if (border_bottom and not border_top) or (border_top and not border_bottom):
-                index = np.where(np.abs(centroid[0] - centroids[:, 0]) < 0.1)[0]
-                if len(index) > 0:
-                    ps_states[index[0]].space = np.logical_or(ps_states[index[0]].space, ps.space)
-                    centroids[index[0]][-1] = 0
+        seam = np.unique(np.stack([labels[:, :, 0].ravel(), labels[:, :, -1].ravel()], axis=1), axis=0)
+        for label1, label2 in seam.tolist():
+            if label1 in parent and label2 in parent:
+                root1, root2 = find(label1), find(label2)
+                parent[max(root1, root2)] = min(root1, root2)
+        return {label: find(label) for label in chosen}
 
-                else:
-                    ps_states.append(ps)
-                    centroids = np.vstack([centroids, centroid])
-            else:
-                ps_states.append(ps)
-                centroids = np.vstack([centroids, centroid])
-        return ps_states, centroids
+    @staticmethod
+    def periodic_interval(occupied: np.array) -> (int, int):
+        """
+        Shortest interval on a periodic axis, that contains all occupied indices.
+        :param occupied: boolean np.array along the periodic axis
+        :return: start and length of the interval (start + length can be larger than the axis)
+        """
+        if np.all(occupied) or not np.any(occupied):
+            return 0, int(np.sum(occupied))
+        indices = np.where(occupied)[0]
+        gaps = np.diff(np.append(indices, indices[0] + occupied.size))
+        largest = int(np.argmax(gaps))
+        return int(indices[(largest + 1) % indices.size]), int(occupied.size - gaps[largest] + 1)
+
+    @staticmethod
+    def component_box(labels: np.array, group: list, boxes: list) -> (np.array, tuple):
+        """
+        Cut out components from labeled space.
+        :param labels: labeled space
+        :param group: labels of the components, that form a single state
+        :param boxes: bounding boxes of all labels (see scipy.ndimage.find_objects)
+        :return: boolean mask of the components in their bounding box, and index of the first node of the bounding box.
+        The bounding box can reach over the seam at theta = 0/2pi.
+        """
+        slices = [boxes[label - 1] for label in group]
+        x = slice(min(box[0].start for box in slices), max(box[0].stop for box in slices))
+        y = slice(min(box[1].start for box in slices), max(box[1].stop for box in slices))
+
+        occupied = np.zeros(labels.shape[2], dtype=bool)
+        for box in slices:
+            occupied[box[2]] = True
+        theta_start, theta_length = ConfigSpace_Maze.periodic_interval(occupied)
+        thetas = (theta_start + np.arange(theta_length)) % labels.shape[2]
+
+        mask = np.isin(labels[x, y].take(thetas, axis=2), group)
+        return mask, (x.start, y.start, theta_start)
+
+
+def read_only(array: np.array) -> np.array:
+    """
+    :return: read-only view of array
+    """
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+def array_hash(array) -> str:
+    """
+    Hash of the content of a boolean array, used to recognize checkpoints of the same calculation.
+    :param array: boolean np.array or None
+    :return: hash (hex string), or None if array is None
+    """
+    if array is None:
+        return None
+    array = np.asarray(array, dtype=bool)
+    return hashlib.sha1(str(array.shape).encode() + np.packbits(array).tobytes()).hexdigest()
+
+
+def _calculate_slab(function, filename: str, *args, **kwargs) -> None:
+    """
+    Calculate a single slab and save it. The file is only written once the slab is complete, so that an interrupted
+    calculation never leaves a broken checkpoint behind.
+    :param function: function that returns the slab
+    :param filename: where to save the slab (.npy)
+    """
+    slab = function(*args, **kwargs)
+    np.save(filename[:-4] + '_tmp.npy', slab)
+    os.replace(filename[:-4] + '_tmp.npy', filename)
 
 
 class PS_Area(ConfigSpace_Maze):
-    def __init__(self, ps: ConfigSpace_Maze, space: np.array, name: str):
-        super().__init__(solver=ps.solver, size=ps.size, shape=ps.shape, geometry=ps.geometry)
-        self.space: np.array = space
-        self.fig = ps.fig
+    """
+    Part of the space of ps (e.g. a single state). Only the bounding box of the area is kept in memory: mask is the
+    space inside the box, which starts at box_start. The box is periodic in theta, so it can reach over the seam at
+    theta = 0/2pi. The full sized space is only created, when self.space is accessed. It is created again on every
+    access and is read-only: change the area by assigning a new space, or use mask and slab().
+    """
+
+    def __init__(self, ps: ConfigSpace_Maze, mask: np.array, box_start: tuple, name: str, full_shape: tuple = None):
+        """
+        :param ps: space that the area is part of
+        :param mask: boolean np.array, nodes inside the bounding box that belong to the area
+        :param box_start: indices of the first node of the bounding box in the space of ps
+        :param name: name of the area
+        :param full_shape: shape of the full space (by default ps.space.shape)
+        """
+        ConfigSpace.__init__(self, space=None, name=name)
+        # geometry is taken from ps, so that the maze does not have to be built again
+        for attribute in ['solver', 'shape', 'size', 'geometry', 'dimensions', 'average_radius', 'pos_resolution',
+                          'theta_resolution', 'fig']:
+            setattr(self, attribute, getattr(ps, attribute))
+        self.extent = copy(ps.extent)
+        self.space_boundary = None
+        self.full_shape = tuple(full_shape if full_shape is not None else ps.space.shape)
+        self.mask = mask
+        self.box_start = tuple(int(i) for i in box_start)
         self.name: str = name
         self.distance: np.array = None
 
-    def calculate_distance(self, mask: np.array) -> np.array:
+    def __setstate__(self, state: dict) -> None:
+        # areas pickled before bounding boxes were introduced carry the full sized space
+        space = state.pop('space', None)
+        self.__dict__.update(state)
+        if 'mask' not in state:
+            self.full_shape = space.shape
+            self.space = space
+
+    def box(self) -> tuple:
+        """
+        :return: index arrays of the bounding box in the full space (to be used as full_space[self.box()])
+        """
+        return np.ix_(*[(start + np.arange(length)) % full_length
+                        for start, length, full_length in zip(self.box_start, self.mask.shape, self.full_shape)])
+
+    @property
+    def space(self) -> np.array:
+        if self.mask is None:
+            return None
+        space = np.zeros(self.full_shape, dtype=bool)
+        space[self.box()] = self.mask
+        space.flags.writeable = False
+        return space
+
+    @space.setter
+    def space(self, space: np.array) -> None:
+        if space is None:
+            self.mask, self.box_start = None, None
+            return
+        space = np.array(space, dtype=bool)
+        self.full_shape = space.shape
+        x, y = [np.where(np.any(space, axis=axes))[0] for axes in [(1, 2), (0, 2)]]
+        if x.size == 0:
+            self.mask, self.box_start = np.zeros((0, 0, 0), dtype=bool), (0, 0, 0)
+            return
+        theta_start, theta_length = self.periodic_interval(np.any(space, axis=(0, 1)))
+        self.box_start = (int(x[0]), int(y[0]), theta_start)
+        self.mask = space[x[0]:x[-1] + 1, y[0]:y[-1] + 1].take(
+            (theta_start + np.arange(theta_length)) % space.shape[2], axis=2)
+
+    def level(self, reduction: int) -> np.array:
+        """
+        Like ConfigSpace.level, but calculated from the nodes in the bounding box, without creating the full sized
+        space. Levels are kept in self.pyramid until a new mask is assigned.
+        :param reduction: By what factor the space is reduced.
+        :return: np.array
+        """
+        if self.pyramid_of is not self.mask:
+            self.pyramid, self.pyramid_of = {}, self.mask
+        if reduction == 1:
+            return self.space
+
+        if reduction not in self.pyramid:
+            shape = tuple(length // reduction for length in self.full_shape)
+            bins = [((start + np.arange(length)) % full_length) // reduction
+                    for start, length, full_length in zip(self.box_start, self.mask.shape, self.full_shape)]
+            nodes = [axis_bins[indices] for axis_bins, indices in zip(bins, np.nonzero(self.mask))]
+            # nodes in the remainder of an axis, which does not fill a whole bin, are dropped (see reduced_resolution)
+            inside = np.all([axis_nodes < length for axis_nodes, length in zip(nodes, shape)], axis=0)
+            counts = np.zeros(shape, dtype=np.float32)
+            np.add.at(counts, tuple(axis_nodes[inside] for axis_nodes in nodes), 1)
+            self.pyramid[reduction] = counts / (reduction ** len(shape))
+        return read_only(self.pyramid[reduction])
+
+    def slab(self, ix_start: int, ix_stop: int) -> np.array:
+        """
+        :return: self.space[ix_start:ix_stop], without creating the full sized space
+        """
+        ix_stop = min(ix_stop, self.full_shape[0])
+        slab = np.zeros((ix_stop - ix_start,) + tuple(self.full_shape[1:]), dtype=bool)
+        start, stop = max(ix_start, self.box_start[0]), min(ix_stop, self.box_start[0] + self.mask.shape[0])
+        if start < stop:
+            _, y, theta = self.box()
+            slab[np.ix_(np.arange(start - ix_start, stop - ix_start), y.ravel(), theta.ravel())] = \
+                self.mask[start - self.box_start[0]:stop - self.box_start[0]]
+        return slab
+
+    def roi(self, margin: int) -> tuple:
+        """
+        Region of interest: the bounding box grown by margin nodes along every axis. Along theta the region wraps
+        around the seam, and covers the whole axis, if the grown box would overlap itself.
+        :param margin: number of nodes, by which the bounding box is grown
+        :return: indices of the region for every axis (to be used as full_space[np.ix_(*self.roi(margin))]), and whether
+        the region is periodic along every axis
+        """
+        axes = []
+        for axis, (start, length, full_length) in enumerate(zip(self.box_start, self.mask.shape, self.full_shape)):
+            if axis == 2 and length + 2 * margin < full_length:
+                axes.append((start - margin + np.arange(length + 2 * margin)) % full_length)
+            elif axis == 2:
+                axes.append(np.arange(full_length))
+            else:
+                axes.append(np.arange(max(0, start - margin), min(full_length, start + length + margin)))
+        return tuple(axes), (0, 0, int(axes[2].size == self.full_shape[2]))
+
+    def calculate_distance(self, mask: np.array, margin: int = None) -> (np.array, tuple):
         """
         Calculate the distance to every other node in the array.
         :param mask: Distances have to be calculated according to the available nodes.
         The available nodes are saved in 'mask'
-        :return: np.array with distances from each node
+        :param margin: Calculate distances only in the bounding box grown by margin (see self.roi). Distances up to
+        margin are the same as in the full space.
+        :return: np.array with distances from each node (np.inf where not reachable), and indices of the region
         """
+        if margin is None:
+            axes, periodic = tuple(np.arange(length) for length in self.full_shape), (0, 0, 1)
+        else:
+            axes, periodic = self.roi(margin)
 
-        # self.distance = distance(np.array((~np.array(self.space, dtype=bool)), dtype=int), periodic=(0, 0, 1))
-        phi = np.array(~self.space, dtype=int)
-        masked_phi = np.ma.MaskedArray(phi, mask=mask)
-        self.distance = distance(masked_phi, periodic=(0, 0, 1))
+        # position of the bounding box inside the region
+        positions = []
+        for axis, start, length, full_length in zip(axes, self.box_start, self.mask.shape, self.full_shape):
+            inverse = np.full(full_length, -1)
+            inverse[axis] = np.arange(axis.size)
+            positions.append(inverse[(start + np.arange(length)) % full_length])
+
+        phi = np.ones([axis.size for axis in axes], dtype=int)
+        phi[np.ix_(*positions)] = np.array(~self.mask, dtype=int)
+        masked_phi = np.ma.MaskedArray(phi, mask=np.asarray(mask)[np.ix_(*axes)])
+        self.distance = np.ma.filled(distance(masked_phi, periodic=periodic), np.inf).astype(np.float32)
 
         # node at (105, 36, 102)
 
@@ -637,6 +1426,7 @@ class PS_Area(ConfigSpace_Maze):
         # plt.imshow(distance(masked_phi, periodic=(0, 0, 1))[point[0], :, :])
         # plt.imshow(distance(masked_phi, periodic=(0, 0, 1))[:, point[1], :])
         # plt.imshow(distance(masked_phi, periodic=(0, 0, 1))[:, :, point[2]])
+        return self.distance, axes
 
 
 class PS_Mask(ConfigSpace):
@@ -680,6 +1470,7 @@ class PS_Mask(ConfigSpace):
         loc = (-radius + indices[0], -radius + indices[1], 0)
         self.paste(self.space, circ_mask(), loc)
         self.space = np.roll(self.space, -radius + indices[2], axis=2)
+        self.invalidate_pyramid()
 
 
 class Node:
@@ -752,7 +1543,51 @@ class ConfigSpace_Labeled(ConfigSpace_Maze):
         self.eroded_space = None
         self.erosion_radius = self.erosion_radius_default()
         self.ps_states = self.centroids = None
-        self.space_labeled = None
+        self.space_labeled_codes = None  # np.uint8 array, label of every node is self.label_names[code]
+        self.label_names = None
+
+    @property
+    def space_labeled(self) -> np.array:
+        """
+        Labels of all nodes as strings. This decodes the whole space, for single nodes rather use labels_at.
+        """
+        if self.space_labeled_codes is None:
+            return None
+        return self.label_names[self.space_labeled_codes]
+
+    @space_labeled.setter
+    def space_labeled(self, space_labeled: np.array) -> None:
+        if space_labeled is None:
+            self.space_labeled_codes = self.label_names = None
+            return
+        self.label_names, codes = np.unique(space_labeled, return_inverse=True)
+        self.space_labeled_codes = np.array(codes, dtype=np.uint8).reshape(np.shape(space_labeled))
+
+    def labels_at(self, indices: tuple) -> np.array:
+        """
+        Labels of the nodes at indices.
+        :param indices: tuple of indices (or arrays of indices) of nodes in configuration space
+        :return: label (or np.array of labels)
+        """
+        return self.label_names[self.space_labeled_codes[indices]]
+
+    def set_labels(self, labels) -> None:
+        """
+        Set labels from what is saved in a pickle.
+        :param labels: tuple of (codes, label_names), or np.array of strings (older files)
+        """
+        if isinstance(labels, tuple):
+            self.space_labeled_codes, self.label_names = labels
+        else:
+            self.space_labeled = labels
+
+    def possible_labels(self) -> np.array:
+        """
+        :return: sorted np.array of all labels that label_space can assign
+        """
+        names = [ps_state.name for ps_state in self.ps_states]
+        labels = ['0'] + names + [name1 + name2 for name1, name2 in itertools.permutations(names, 2)]
+        return np.unique(np.array(labels, dtype=np.dtype('U2')))
 
     def load_eroded_labeled_space(self, point_particle: bool = False) -> None:
         """
@@ -763,7 +1598,8 @@ class ConfigSpace_Labeled(ConfigSpace_Maze):
 
         if os.path.exists(directory):
             print('Loading labeled from ', directory, '...')
-            self.eroded_space, self.ps_states, self.centroids, self.space_labeled = pickle.load(open(directory, 'rb'))
+            self.eroded_space, self.ps_states, self.centroids, labels = pickle.load(open(directory, 'rb'))
+            self.set_labels(labels)
         else:
             self.eroded_space = self.erode(self.space, radius=self.erosion_radius)
             self.ps_states, self.centroids = self.split_connected_components(self.eroded_space)
@@ -781,8 +1617,7 @@ class ConfigSpace_Labeled(ConfigSpace_Maze):
 
         if os.path.exists(directory):
             print('Loading labeled from ', directory, '.')
-            # self.space_labeled = pickle.load(open(path, 'rb'))
-            self.space_labeled = pickle.load(open(directory, 'rb'))
+            self.set_labels(pickle.load(open(directory, 'rb')))
         else:
             self.load_eroded_labeled_space()
 
@@ -791,7 +1626,7 @@ class ConfigSpace_Labeled(ConfigSpace_Maze):
         I want to check, whether there are labels, that I don't want to have.
         :return: list of all the labels that are not labels I wanted to have
         """
-        return [label for label in np.unique(self.space_labeled) if label not in
+        return [label for label in np.unique(self.label_names[np.unique(self.space_labeled_codes)]) if label not in
                 states + forbidden_transition_attempts + allowed_transition_attempts]
 
     # def label_space_slow(self) -> None:
@@ -869,14 +1704,15 @@ class ConfigSpace_Labeled(ConfigSpace_Maze):
         else:
             self.fig = fig
 
-        if self.space_labeled is None:
+        if self.space_labeled_codes is None:
             self.load_labeled_space()
 
         print('Draw transitions')
         scale = {'Large': 1, 'Medium': 0.5, 'Small Far': 0.2, 'Small Near': 0.2, 'Small': 0.2}[self.size]/reduction
-        transitions = [trans for trans in np.unique(self.space_labeled) if len(trans) > 1]
-        for label, colormap in tqdm(zip(transitions, itertools.cycle(['Reds', 'Purples', 'Greens']))):
-            space = np.array(self.space_labeled == label, dtype=bool)
+        transitions = [code for code in np.unique(self.space_labeled_codes) if len(self.label_names[code]) > 1]
+        for code, colormap in tqdm(zip(transitions, itertools.cycle(['Reds', 'Purples', 'Greens']))):
+            label = self.label_names[code]
+            space = np.array(self.space_labeled_codes == code, dtype=bool)
             centroid = self.indices_to_coords(*np.array(np.where(space))[:, 0])
             self.visualize_space(fig=self.fig, colormap=colormap, reduction=reduction, space=space)
             mlab.text3d(*(a * b for a, b in zip(centroid, [1, 1, self.average_radius])), label, scale=scale)
@@ -894,14 +1730,15 @@ class ConfigSpace_Labeled(ConfigSpace_Maze):
             directory = self.directory(point_particle=False, erosion_radius=self.erosion_radius, addition=date_string)
 
         print('Saving ' + self.name + ' in path: ' + directory)
-        pickle.dump((self.eroded_space, self.ps_states, self.centroids, self.space_labeled), open(directory, 'wb'))
+        labels = (self.space_labeled_codes, self.label_names)
+        pickle.dump((self.eroded_space, self.ps_states, self.centroids, labels), open(directory, 'wb'))
 
-        # Actually, I don't really need all this information.  self.space_labeled should be enough
+        # Actually, I don't really need all this information.  The labels should be enough
         directory = self.directory(point_particle=False,
                                    erosion_radius=self.erosion_radius, addition=date_string, small=True)
 
         print('Saving reduced in' + self.name + ' in path: ' + directory)
-        pickle.dump(self.space_labeled, open(directory, 'wb'))
+        pickle.dump(labels, open(directory, 'wb'))
         print('Finished saving')
 
     def erosion_radius_default(self) -> int:
@@ -920,62 +1757,174 @@ class ConfigSpace_Labeled(ConfigSpace_Maze):
         """
         :return: maximum distance so that it is noted as transition area
         """
-        maze = Maze(solver=self.solver, size=self.size, shape=self.shape, geometry=self.geometry)
+        maze = MazeGeometry(solver=self.solver, size=self.size, shape=self.shape, geometry=self.geometry)
         if self.shape == 'SPT':
             distance_cm = (maze.slits[1] - maze.slits[0]) / 3
         else:
             distance_cm = maze.exit_size / 2
         return self.coords_to_index(0, distance_cm) + self.erosion_radius * 2
 
-    def label_space(self) -> None:
+    def label_space(self, chunk_size: int = 10, n_jobs: int = 1) -> None:
         """
-        Calculate the labeled space.
+        Calculate the labeled space. Nodes are labeled in chunks along the x axis.
+        :param chunk_size: number of x indices labeled at once
+        :param n_jobs: number of processes, that calculate the distances to the states (see closest_states)
         :return:
         """
         if self.ps_states is None:
             self.eroded_space = self.erode(self.space, radius=self.erosion_radius)
             self.ps_states, self.centroids = self.split_connected_components(self.eroded_space)
         dilated_space = self.dilate(self.space, self.erosion_radius_default())
-        print('Calculating distances from every node for ', str(len(self.ps_states)), ' different states in', self.name)
-        [ps_state.calculate_distance(~dilated_space) for ps_state in tqdm(self.ps_states)]
-        distance_stack_original = np.stack([ps_state.distance for ps_state in self.ps_states], axis=3)
-
-        distance_stack = np.stack([ps_state.distance for ps_state in self.ps_states], axis=3)
-        far_away = distance_stack > self.max_distance_for_transition()
-        distance_stack[far_away] = np.inf
-
-        ps_name_dict = {i: ps_state.name for i, ps_state in enumerate(self.ps_states)}
-
-        def assign_label(ind: tuple):
-            """
-            Assign label to node in space.
-            :param ind: indices of node in configuration space
-            :return:
-            """
-            # everything not in self.space.
-            if not self.space[ind]:
-                self.space_labeled[ind] = '0'
-                return
-
-            # everything in self.ps_states.
-            for i, ps_state in enumerate(self.ps_states):
-                if ps_state.space[ind]:
-                    self.space_labeled[ind] = ps_state.name
-                    return
-
-            # in eroded space
-            # self.visualize_states()
-            # self.draw_ind(indices)
-            self.space_labeled[ind] = ''.join([ps_name_dict[ii] for ii in np.argsort(distance_stack[ind])[:2]
-                                               if distance_stack[ind].data[ii] < np.inf])
-            if len(self.space_labeled[ind]) == 0:
-                self.space_labeled[ind] = ''.join(
-                    [ps_name_dict[ii] for ii in np.argsort(distance_stack_original[ind])[:2]])
-
-        self.space_labeled = np.zeros_like(self.space, dtype=np.dtype('U2'))
-        print('Iterating over every node and assigning label')
-        [assign_label(indices) for indices in self.iterate_space_index()]
+        max_distance = self.max_distance_for_transition()
 
+        print('Calculating distances from every node for ', str(len(self.ps_states)), ' different states in', self.name)
+        closest_states = self.closest_states(~dilated_space, n_jobs=n_jobs, margin=int(np.ceil(max_distance)) + 1,
+                                             max_distance=max_distance)
+
+        self.label_names = self.possible_labels()
+        self.space_labeled_codes = np.zeros_like(self.space, dtype=np.uint8)
+        print('Assigning labels')
+        for ix in tqdm(range(0, self.space.shape[0], chunk_size)):
+            chunk = slice(ix, ix + chunk_size)
+            labels = self.label_chunk(self.space[chunk],
+                                      [ps_state.slab(ix, ix + chunk_size) for ps_state in self.ps_states],
+                                      *[array[chunk] for array in closest_states], max_distance=max_distance)
+            self.space_labeled_codes[chunk] = self.encode_labels(labels)
+
+    def encode_labels(self, labels: np.array) -> np.array:
+        """
+        Translate labels (strings) to codes.
+        :param labels: np.array of labels, all of them in self.label_names
+        :return: np.array of codes (np.uint8)
+        """
+        return np.array(np.searchsorted(self.label_names, labels), dtype=np.uint8)
+
+    def closest_states(self, mask: np.array, n_jobs: int = 1, margin: int = None, max_distance: float = None) \
+            -> tuple:
+        """
+        Find the closest and second closest state for every node. The distances are calculated for n_jobs states at a
+        time (in parallel), and only the two closest states are kept, so that the distances of all states are never
+        held in memory at once. Ties are resolved by the order of self.ps_states.
+        :param mask: Distances are calculated only through nodes that are not masked (see PS_Area.calculate_distance).
+        :param n_jobs: number of processes, that calculate distances
+        :param margin: Calculate the distances to every state only in its bounding box grown by margin. Farther nodes
+        have distance np.inf. If the grown boxes cannot contain the closest states of all nodes (see
+        margin_covers_space), the distances are calculated in the full space right away. If a node of self.space
+        turns out to be farther than margin from all states, all distances are calculated again in the full space,
+        because the closest states have to be known also for these nodes.
+        :param max_distance: maximal distance to a state to be noted as transition (see label_chunk). Nodes farther
+        than max_distance from all states are labeled by both closest states, so for these nodes also the second
+        closest state has to be closer than margin. Otherwise, all distances are calculated in the full space.
+        :return: indices of the closest states (uint8), their distances (float32), indices of the second closest states
+        (uint8), their distances (float32)
+        """
+        if margin is not None and not self.margin_covers_space(margin, max_distance=max_distance):
+            print('The bounding boxes of the states grown by', margin, 'do not cover the space. '
+                  'Calculating distances in the full space')
+            margin = None
+
+        closest, second = np.zeros(self.space.shape, dtype=np.uint8), np.zeros(self.space.shape, dtype=np.uint8)
+        closest_distance = np.full(self.space.shape, np.inf, dtype=np.float32)
+        second_distance = np.full(self.space.shape, np.inf, dtype=np.float32)
+
+        batch_size = effective_n_jobs(n_jobs)
+        with tqdm(total=len(self.ps_states)) as progress_bar:
+            for batch_start in range(0, len(self.ps_states), batch_size):
+                batch = self.ps_states[batch_start:batch_start + batch_size]
+                distances = Parallel(n_jobs=n_jobs)(delayed(ps_state.calculate_distance)(mask, margin)
+                                                    for ps_state in batch)
+
+                for i, (dist, axes) in enumerate(distances, start=batch_start):
+                    self.ps_states[i].distance = None
+                    region = np.ix_(*axes)
+                    c, c_d, s, s_d = closest[region], closest_distance[region], second[region], second_distance[region]
+
+                    new_closest = dist < c_d
+                    new_second = np.logical_and(~new_closest, dist < s_d)
+
+                    s[new_closest], s_d[new_closest] = c[new_closest], c_d[new_closest]
+                    c[new_closest], c_d[new_closest] = i, dist[new_closest]
+                    s[new_second], s_d[new_second] = i, dist[new_second]
+
+                    closest[region], closest_distance[region], second[region], second_distance[region] = c, c_d, s, s_d
+                    progress_bar.update(1)
+
+        if margin is not None:
+            # Distances up to margin are exact, so only states farther than margin can be missing.
+            incomplete = closest_distance > margin
+            if max_distance is not None and len(self.ps_states) > 1:
+                incomplete |= np.logical_and(closest_distance > max_distance, second_distance > margin)
+            if np.any(np.logical_and(np.asarray(self.space, dtype=bool), incomplete)):
+                print('The closest states of some nodes are farther than', margin,
+                      '. Calculating distances in the full space')
+                return self.closest_states(mask, n_jobs=n_jobs)
+
+        # where not even two states can be reached, the first states in self.ps_states follow (like in np.argsort)
+        no_second = second_distance == np.inf
+        second[no_second] = np.where(closest[no_second] == 0, 1, 0)
+        return closest, closest_distance, second, second_distance
+
+    def margin_covers_space(self, margin: int, max_distance: float = None) -> bool:
+        """
+        Check before calculating any distance, whether closest_states can work in the bounding boxes of the states
+        grown by margin (see PS_Area.roi): Every node of self.space has to lie in the region of a state. Nodes that lie
+        farther than max_distance from the bounding boxes of all states need their second closest state as well, so
+        they have to lie in the regions of two states.
+        :param margin: number of nodes, by which the bounding boxes are grown
+        :param max_distance: see closest_states
+        :return: False, if the distances have to be calculated in the full space anyway
+        """
+        space = np.asarray(self.space, dtype=bool)
+        covered = np.zeros(space.shape, dtype=np.uint8)
+        near = np.zeros(space.shape, dtype=bool)
+        for ps_state in self.ps_states:
+            covered[np.ix_(*ps_state.roi(margin)[0])] += 1
+            if max_distance is not None:
+                # distances are measured from the border of the state, so they can be half a node shorter
+                near[np.ix_(*ps_state.roi(int(np.ceil(max_distance)) + 1)[0])] = True
+        if np.any(space & (covered == 0)):
+            return False
+        if max_distance is not None and len(self.ps_states) > 1:
+            return not np.any(space & ~near & (covered < 2))
+        return True
+
+    def label_chunk(self, space: np.array, ps_state_spaces: list, closest: np.array, closest_distance: np.array,
+                    second: np.array, second_distance: np.array, max_distance: float) -> np.array:
+        """
+        Assign labels to all nodes of a chunk of the space:
+        - '0' for nodes that are not in space
+        - name of the state, for nodes in the (eroded) ps_states. If a node is in more than one state, the first one
+        counts.
+        - names of the two closest states (closest first), for all other nodes. States farther than max_distance are
+        ignored, unless all states are that far away.
+        :param space: chunk of self.space
+        :param ps_state_spaces: chunks of the spaces of self.ps_states
+        :param closest: chunk of the indices of the closest states (see closest_states)
+        :param closest_distance: chunk of the distances to the closest states
+        :param second: chunk of the indices of the second closest states
+        :param second_distance: chunk of the distances to the second closest states
+        :param max_distance: maximal distance to a state to be noted as transition
+        :return: np.array of shape space.shape with labels
+        """
+        ps_names = np.array([ps_state.name for ps_state in self.ps_states])
+
+        labels = np.char.add(np.where(closest_distance <= max_distance, ps_names[closest], ''),
+                             np.where(second_distance <= max_distance, ps_names[second], ''))
+
+        # all states are far away
+        nothing_close = ~(closest_distance <= max_distance)
+        labels[nothing_close] = np.char.add(ps_names[closest[nothing_close]], ps_names[second[nothing_close]])
+
+        # everything in self.ps_states.
+        in_state = np.zeros_like(space, dtype=bool)
+        for ps_state_space, ps_name in zip(ps_state_spaces, ps_names):
+            newly_in_state = np.logical_and(ps_state_space, ~in_state)
+            labels[newly_in_state] = ps_name
+            in_state = np.logical_or(in_state, newly_in_state)
+
+        # everything not in self.space.
+        labels[~np.array(space, dtype=bool)] = '0'
+        return labels.astype(np.dtype('U2'))
 
 if __name__ == '__main__':
     shape = 'SPT'
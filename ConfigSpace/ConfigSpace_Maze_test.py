@@ -0,0 +1,527 @@
+import os
+import tempfile
+import unittest
+from copy import copy
+
+import numpy as np
+from scipy import ndimage
+from ConfigSpace.ConfigSpace_Maze import ConfigSpace_Maze, ConfigSpace, PS_Area, ConfigSpace_Labeled
+from ConfigSpace.SpaceCache import SpaceCache
+from PhysicsEngine.Contact import load_corners_array, find_contacts, contact_points, possible_configurations, \
+    transform_corners, CollisionChecker, possible_configuration
+from Setup.Maze import Maze, MazeGeometry, LoadGeometry
+
+conf_space = ConfigSpace_Maze('human', 'Small Far', 'SPT', ('MazeDimensions_human.xlsx', 'LoadDimensions_human.xlsx'))
+conf_space.space = np.random.default_rng(0).random((12, 10, 8)) > 0.2
+
+
+class BoundaryTest(unittest.TestCase):
+    def test_boundary_like_single_cells(self):
+        boundary = np.zeros_like(conf_space.space)
+        for ix, iy, itheta in np.ndindex(*conf_space.space.shape):
+            boundary[ix, iy, itheta] = conf_space._is_boundary_cell(ix, iy, itheta)
+        self.assertListEqual(conf_space.boundary(conf_space.space).tolist(), boundary.tolist())
+
+    def test_slabs_cover_x_axis(self):
+        nx = conf_space.space_shape()[0]
+        for n_jobs in [1, 2, -1, -2]:
+            slabs = conf_space.slabs(n_jobs=n_jobs)
+            self.assertEqual(slabs[0][0], 0, msg=str(n_jobs))
+            self.assertEqual(slabs[-1][1], nx, msg=str(n_jobs))
+            for (_, ix_stop), (ix_start, _) in zip(slabs[:-1], slabs[1:]):
+                self.assertEqual(ix_stop, ix_start, msg=str(n_jobs))
+
+    def test_boundary_periodic_in_theta(self):
+        space = np.ones((5, 5, 6), dtype=bool)
+        space[2, 2, 0] = False
+        boundary = conf_space.boundary(space)
+        self.assertTrue(boundary[2, 2, -1])
+        self.assertTrue(boundary[2, 2, 1])
+        self.assertFalse(boundary[2, 2, 3])
+
+    def test_boundary_slab(self):
+        slab_space = conf_space.space[3:8]
+        self.assertListEqual(conf_space.boundary(slab_space)[1:-1].tolist(),
+                             conf_space.boundary(conf_space.space)[4:7].tolist())
+
+    def test_boundary_in_slabs_discards_foreign_checkpoints(self):
+        mask = np.random.default_rng(1).random(conf_space.space.shape) > 0.5
+        with tempfile.TemporaryDirectory() as tmp:
+            cs = copy(conf_space)
+            cs.checkpoint_directory = lambda name: os.path.join(tmp, name)
+            # checkpoint of another calculation, without header
+            os.makedirs(cs.checkpoint_directory('boundary'))
+            np.save(os.path.join(cs.checkpoint_directory('boundary'), '0_6.npy'),
+                    np.ones((6,) + conf_space.space.shape[1:], dtype=bool))
+            cs.calculate_boundary(mask=mask, n_jobs=2, slab_size=6)
+            self.assertListEqual(cs.space_boundary.tolist(),
+                                 (conf_space.boundary(conf_space.space) & mask).tolist())
+            self.assertFalse(os.path.exists(cs.checkpoint_directory('boundary')))
+
+
+
+class RasterSpaceTest(unittest.TestCase):
+    def test_raster_like_exact(self):
+        # Expected tolerance: walls and load are grown by half a voxel each, and overlaps are only found on the grid, so
+        # raster and exact space differ only within two voxels (in x and y) of the boundary of the exact space.
+        cs = copy(conf_space)
+        cs.pos_resolution = (cs.extent['y'][1] - cs.extent['y'][0]) / 30
+        cs.theta_resolution = 2 * np.pi / 24
+        cs.calculate_space(method='raster')
+        maze = MazeGeometry(size=cs.size, shape=cs.shape, solver=cs.solver, geometry=cs.geometry)
+        ix = cs.coords_to_index(0, maze.slits[0])
+        raster = cs.space[ix - 6:ix + 6]
+        exact = cs.calculate_space_slab(ix - 6, ix + 6)
+        self.assertTrue(np.any(exact) and not np.all(exact))
+
+        structure = np.ones((3, 3, 1), dtype=bool)  # within the same theta slice
+        near_boundary = ndimage.binary_dilation(exact, structure=structure, iterations=2) & \
+            ndimage.binary_dilation(~exact, structure=structure, iterations=2)
+        # the outer two x indices of the slab lack neighbours
+        differ = (raster != exact)[2:-2]
+        self.assertFalse(np.any(differ & ~near_boundary[2:-2]))
+
+
+class PyramidTest(unittest.TestCase):
+    def test_invalidate_pyramid(self):
+        cs = ConfigSpace(np.array(conf_space.space))
+        level = cs.level(2)
+        with self.assertRaises(ValueError):
+            level[0, 0, 0] = 0
+        cs.space[:2] = False
+        self.assertListEqual(cs.level(2).tolist(), level.tolist())  # changed in place: the pyramid is stale
+        cs.invalidate_pyramid()
+        self.assertListEqual(cs.level(2).tolist(), ConfigSpace.reduced_resolution(cs.space, 2).tolist())
+        self.assertTrue(np.all(cs.level(2)[0] == 0))
+
+
+class SaveSpaceTest(unittest.TestCase):
+    def test_saved_pyramid_of_final_space(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, 'space.pkl')
+            saved = copy(conf_space)
+            space = np.ones(conf_space.space.shape, dtype=bool)
+            saved.space = space
+            saved.save_space(directory=directory)
+            self.assertTrue(np.all(space))  # the maze edges are set on a copy
+
+            loaded = copy(conf_space)
+            loaded.read_space(directory, mmap_mode=None)
+            self.assertFalse(np.any(loaded.space[0]) or np.any(loaded.space[:, -1]))
+            self.assertGreater(len(loaded.pyramid), 0)
+            self.assertIs(loaded.pyramid_of, loaded.space)
+            for reduction, level in loaded.pyramid.items():
+                self.assertTrue(np.allclose(level, ConfigSpace.reduced_resolution(loaded.space, reduction)))
+                self.assertListEqual(loaded.level(reduction).tolist(), level.tolist())
+
+    def test_written_pyramid_like_level(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, 'space.pkl')
+            written = copy(conf_space)
+            written.space = np.ones(conf_space.space.shape, dtype=bool)
+            written.build_pyramid((2, 4))  # built before the maze edges are set
+            written.write_space(directory)
+
+            loaded = copy(conf_space)
+            loaded.read_space(directory, mmap_mode=None)
+            self.assertListEqual(sorted(loaded.pyramid), [2, 4])
+            fresh = ConfigSpace(np.array(loaded.space))
+            for reduction in [2, 4]:
+                self.assertListEqual(loaded.level(reduction).tolist(), fresh.level(reduction).tolist())
+
+    def test_packed_and_chunked_round_trip(self):
+        written = copy(conf_space)
+        written.space = np.random.default_rng(2).random(conf_space.space.shape) > 0.3
+        written.space_boundary = written.boundary(written.space)
+        with tempfile.TemporaryDirectory() as tmp:
+            dense = copy(written)
+            dense.write_space(os.path.join(tmp, 'dense.pkl'))
+            dense.read_space(os.path.join(tmp, 'dense.pkl'), mmap_mode=None)
+            for name, options in [('packed', {'packed': True}), ('chunked', {'chunk_shape': (5, 4, 3)})]:
+                directory = os.path.join(tmp, name + '.pkl')
+                written.write_space(directory, **options)
+                loaded = copy(conf_space)
+                loaded.read_space(directory)
+                for array, expected in [(loaded.space, dense.space), (loaded.space_boundary, dense.space_boundary)]:
+                    self.assertListEqual(np.asarray(array).tolist(), expected.tolist(), msg=name)
+                    points = (np.array([0, -1, 11]), np.array([9, 0, -10]), np.array([7, -8, 0]))
+                    for key in [(1, 2, 3), (-1, -2, -3), (slice(None), 3), (slice(2, 9, 2), -1, slice(1, None)),
+                                (Ellipsis, 0), (0, Ellipsis), (Ellipsis,), points]:
+                        self.assertEqual(np.asarray(array[key]).tolist(), expected[key].tolist(), msg=name + str(key))
+                    for key in [(12, 0, 0), (0, -11, 0), (np.array([0, 12]), np.array([0, 0]), np.array([0, 0])),
+                                (0, 0, 0, 0)]:
+                        with self.assertRaises(IndexError, msg=name + str(key)):
+                            array[key]
+
+    def test_point_particle_key_and_cache_link(self):
+        key = conf_space.cache_key(point_particle=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, 'space_pp.pkl')
+            conf_space.write_space(directory, point_particle=True)
+            self.assertEqual(conf_space.saved_key(directory), key)
+
+            cache = SpaceCache(directory=os.path.join(tmp, 'cache'))
+            cache.put(conf_space, key, directory=directory)
+            loaded = copy(conf_space)
+            loaded.read_space(cache.get(key))
+            self.assertListEqual(np.asarray(loaded.space).tolist(), np.asarray(conf_space.space).tolist())
+
+            # saving again replaces the files, and does not change the linked files in the cache
+            changed = copy(conf_space)
+            changed.space = ~np.asarray(conf_space.space)
+            changed.write_space(directory, point_particle=True)
+            loaded.read_space(cache.get(key), mmap_mode=None)
+            self.assertListEqual(loaded.space.tolist(), np.asarray(conf_space.space).tolist())
+
+
+class SpaceCacheTest(unittest.TestCase):
+    def test_least_recently_used_are_removed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = os.path.join(tmp, 'space.pkl')
+            conf_space.write_space(directory)
+            cache = SpaceCache(directory=os.path.join(tmp, 'cache'))
+            cache.put(conf_space, 'aa', directory=directory)
+            cache.budget = 2 * cache.size('aa')
+            cache.put(conf_space, 'bb', directory=directory)
+            os.utime(cache.header_path('aa'), (0, 0))
+            os.utime(cache.header_path('bb'), (1, 1))
+            self.assertEqual(cache.get('aa'), cache.path('aa'))  # aa is used again
+            cache.put(conf_space, 'cc', directory=directory)
+            self.assertSetEqual(set(cache.keys()), {'aa', 'cc'})
+            self.assertIsNone(cache.get('bb'))
+            self.assertListEqual(cache.files('bb'), [])
+            self.assertFalse(os.path.exists(os.path.join(tmp, 'cache', 'manifest.json')))
+
+
+class DualSpaceTest(unittest.TestCase):
+    def test_edges_like_neighbours(self):
+        cs = ConfigSpace(np.random.default_rng(1).random((4, 5, 6)) * (np.random.default_rng(2).random((4, 5, 6)) > 0.3))
+        dual_space = cs.calc_dual_space(periodic=[False, False, True])
+        for node in np.ndindex(*cs.space.shape):
+            edges = {tuple(np.unravel_index(n, cs.space.shape)): dual_space[cs.node_number(node), n]
+                     for n in dual_space[cs.node_number(node)].indices}
+            expected = {neighbour: 1 - cs.space[node] * cs.space[neighbour] for neighbour in cs.neighbors(node)
+                        if cs.space[node] * cs.space[neighbour] != 0}
+            self.assertSetEqual(set(edges), set(expected))
+            [self.assertAlmostEqual(edges[n], expected[n]) for n in expected]
+
+    def test_shortest_path(self):
+        space = np.ones((5, 5, 4))
+        space[2, :4, :] = 0
+        cs = ConfigSpace(space)
+        cs.dual_space = cs.calc_dual_space(periodic=[False, False, True])
+        path = cs.shortest_path((0, 0, 0), (4, 0, 3))
+        self.assertTupleEqual(path[0], (0, 0, 0))
+        self.assertTupleEqual(path[-1], (4, 0, 3))
+        self.assertTrue(all(space[node] for node in path))
+
+    def test_scale_edge(self):
+        space = np.ones((3, 3), dtype=bool)
+        space[1, 1] = False
+        cs = ConfigSpace(space)
+        cs.dual_space = cs.calc_dual_space()
+        cs.dual_space.data[:] = 1
+        cs.scale_edge(cs.node_number((0, 0)), cs.node_number((0, 1)), 2)
+        self.assertEqual(cs.dual_space[cs.node_number((0, 0)), cs.node_number((0, 1))], 2)
+        number_of_edges = cs.dual_space.nnz
+        with self.assertRaises(KeyError):
+            cs.scale_edge(cs.node_number((0, 0)), cs.node_number((1, 1)), 2)
+        self.assertEqual(cs.dual_space.nnz, number_of_edges)
+
+
+class PeriodicComponentsTest(unittest.TestCase):
+    def test_seam_roots(self):
+        labels = np.zeros((4, 4, 6), dtype=int)
+        labels[0, 0, :2], labels[0, 0, -2:] = 1, 3
+        labels[2, 2, 2:4] = 2
+        labels[3, 3, :2], labels[3, 3, -2:] = 4, 5
+        self.assertDictEqual(conf_space.seam_roots(labels, [1, 2, 3, 5]), {1: 1, 2: 2, 3: 1, 5: 5})
+
+    def test_periodic_interval(self):
+        self.assertTupleEqual(conf_space.periodic_interval(np.array([0, 0, 1, 1, 1, 0, 0], dtype=bool)), (2, 3))
+        self.assertTupleEqual(conf_space.periodic_interval(np.array([1, 1, 0, 0, 0, 0, 1], dtype=bool)), (6, 3))
+
+    def test_area_box(self):
+        space = np.zeros(conf_space.space.shape, dtype=bool)
+        space[3:5, 2:4, :2], space[4, 3, -1] = True, True
+        area = PS_Area(conf_space, None, (0, 0, 0), 'a', full_shape=space.shape)
+        area.space = space
+        self.assertTupleEqual(area.box_start, (3, 2, space.shape[2] - 1))
+        self.assertTupleEqual(area.mask.shape, (2, 2, 3))
+        self.assertListEqual(area.space.tolist(), space.tolist())
+        self.assertListEqual(area.slab(4, 8).tolist(), space[4:8].tolist())
+        with self.assertRaises(ValueError):
+            area.space[0, 0, 0] = True
+
+    def test_area_level(self):
+        space = np.zeros((13, 10, 8), dtype=bool)
+        space[3:8, 2:9, :3], space[4, 3, -2:] = True, True
+        area = PS_Area(conf_space, None, (0, 0, 0), 'a', full_shape=space.shape)
+        area.space = space
+        for reduction in [2, 3, 4]:
+            self.assertTrue(np.allclose(area.level(reduction), ConfigSpace.reduced_resolution(space, reduction)))
+        area.space = ~space
+        self.assertTrue(np.allclose(area.level(2), ConfigSpace.reduced_resolution(~space, 2)))
+
+
+class ClosestStatesTest(unittest.TestCase):
+    def test_second_state_beyond_margin(self):
+        labeled = ConfigSpace_Labeled('human', 'Small Far', 'SPT', conf_space.geometry, ps=conf_space)
+        labeled.space = np.ones((60, 3, 4), dtype=bool)
+        # the node at x = 30 is 9 away from state 2, but its second closest state (1) is 28 away
+        labeled.ps_states = [PS_Area(labeled, np.ones((2, 3, 4), dtype=bool), (x, 0, 0), name, full_shape=(60, 3, 4))
+                             for x, name in [(0, 'A'), (58, 'B'), (20, 'C')]]
+        mask = ~labeled.space
+        within_margin = labeled.closest_states(mask, margin=12, max_distance=5)
+        full_space = labeled.closest_states(mask)
+        for array, expected in zip(within_margin, full_space):
+            self.assertListEqual(array[30:40].tolist(), expected[30:40].tolist())
+        self.assertEqual(within_margin[2][30, 0, 0], 1)
+
+    @staticmethod
+    def count_margins(labeled: ConfigSpace_Labeled) -> list:
+        """
+        :return: list, that collects the margins of all distance calculations of the states of labeled
+        """
+        margins = []
+
+        def counting(calculate_distance):
+            def calculate(mask, margin=None):
+                margins.append(margin)
+                return calculate_distance(mask, margin)
+            return calculate
+
+        for ps_state in labeled.ps_states:
+            ps_state.calculate_distance = counting(ps_state.calculate_distance)
+        return margins
+
+    def test_full_space_right_away(self):
+        labeled = ConfigSpace_Labeled('human', 'Small Far', 'SPT', conf_space.geometry, ps=conf_space)
+        labeled.space = np.ones((60, 3, 4), dtype=bool)
+        labeled.ps_states = [PS_Area(labeled, np.ones((2, 3, 4), dtype=bool), (x, 0, 0), name, full_shape=(60, 3, 4))
+                             for x, name in [(0, 'A'), (58, 'B'), (20, 'C')]]
+        # x from 34 to 45 is farther than 12 from all bounding boxes
+        self.assertFalse(labeled.margin_covers_space(12))
+        self.assertTrue(labeled.margin_covers_space(25))
+        margins = self.count_margins(labeled)
+        labeled.closest_states(~labeled.space, margin=12)
+        self.assertListEqual(margins, [None, None, None])
+
+    def test_fallback_after_cropped_attempt(self):
+        labeled = ConfigSpace_Labeled('human', 'Small Far', 'SPT', conf_space.geometry, ps=conf_space)
+        labeled.space = np.ones((8, 8, 4), dtype=bool)
+        labeled.space[3, :7] = False  # wall with a gap at y = 7
+        labeled.ps_states = [PS_Area(labeled, np.ones((2, 2, 4), dtype=bool), (0, 0, 0), 'A', full_shape=(8, 8, 4))]
+        # the box grown by 6 covers the space, but behind the wall, the state is farther than 6 away
+        self.assertTrue(labeled.margin_covers_space(6))
+        full_space = labeled.closest_states(~labeled.space)
+        margins = self.count_margins(labeled)
+        within_margin = labeled.closest_states(~labeled.space, margin=6)
+        self.assertListEqual(margins, [6, None])
+        for array, expected in zip(within_margin, full_space):
+            self.assertListEqual(array.tolist(), expected.tolist())
+
+
+class LabelSpaceTest(unittest.TestCase):
+    @staticmethod
+    def labeled_space() -> ConfigSpace_Labeled:
+        labeled = ConfigSpace_Labeled('human', 'Small Far', 'SPT', conf_space.geometry, ps=conf_space)
+        shape = (30, 8, 6)
+        labeled.space = np.ones(shape, dtype=bool)
+        labeled.space[14:16, :5] = False  # wall with a gap at y >= 5
+        labeled.space[:, 0, 3] = False
+        labeled.ps_states = [PS_Area(labeled, np.ones(box, dtype=bool), start, name, full_shape=shape)
+                             for start, box, name in [((2, 2, 0), (3, 3, 6), 'a'), ((24, 2, 0), (3, 3, 6), 'b'),
+                                                      ((10, 6, 2), (2, 2, 2), 'c')]]
+        labeled.erosion_radius_default = lambda: 2
+        labeled.max_distance_for_transition = lambda: 4
+        return labeled
+
+    @staticmethod
+    def assign_labels(labeled: ConfigSpace_Labeled) -> np.array:
+        """
+        Labels like the per node assign_label of the former label_space.
+        """
+        dilated_space = labeled.dilate(labeled.space, labeled.erosion_radius_default())
+        distance_stack_original = np.stack([ps_state.calculate_distance(~dilated_space)[0]
+                                            for ps_state in labeled.ps_states], axis=3)
+        distance_stack = distance_stack_original.copy()
+        distance_stack[distance_stack > labeled.max_distance_for_transition()] = np.inf
+        names = [ps_state.name for ps_state in labeled.ps_states]
+
+        space_labeled = np.zeros_like(labeled.space, dtype=np.dtype('U2'))
+        for ind in np.ndindex(*labeled.space.shape):
+            if not labeled.space[ind]:
+                space_labeled[ind] = '0'
+                continue
+            in_state = [ps_state.name for ps_state in labeled.ps_states if ps_state.space[ind]]
+            if len(in_state) > 0:
+                space_labeled[ind] = in_state[0]
+                continue
+            space_labeled[ind] = ''.join([names[i] for i in np.argsort(distance_stack[ind], kind='stable')[:2]
+                                          if distance_stack[ind][i] < np.inf])
+            if len(space_labeled[ind]) == 0:
+                space_labeled[ind] = ''.join([names[i] for i in
+                                              np.argsort(distance_stack_original[ind], kind='stable')[:2]])
+        return space_labeled
+
+    def test_like_assign_label(self):
+        labeled = self.labeled_space()
+        expected = self.assign_labels(labeled)
+        for n_jobs, chunk_size in [(1, 4), (2, 30)]:
+            labeled.label_space(chunk_size=chunk_size, n_jobs=n_jobs)
+            self.assertListEqual(labeled.space_labeled.tolist(), expected.tolist())
+        # all kinds of labels appear
+        self.assertTrue({'0', 'a', 'b', 'c'} <= set(np.unique(expected)))
+        self.assertTrue(any(len(label) == 2 for label in np.unique(expected)))
+
+        indices = tuple(np.array([[0, 3, 0], [10, 4, 1], [29, 7, 5], [14, 6, 2]]).T)
+        self.assertListEqual(labeled.labels_at(indices).tolist(), expected[indices].tolist())
+        self.assertEqual(labeled.labels_at((10, 4, 1)), expected[10, 4, 1])
+
+    def test_encode_labels(self):
+        labeled = self.labeled_space()
+        labeled.label_names = labeled.possible_labels()
+        self.assertListEqual(labeled.encode_labels(labeled.label_names).tolist(), list(range(len(labeled.label_names))))
+        expected = self.assign_labels(labeled)
+        labeled.space_labeled_codes = labeled.encode_labels(expected)
+        self.assertEqual(labeled.space_labeled_codes.dtype, np.uint8)
+        self.assertListEqual(labeled.space_labeled.tolist(), expected.tolist())
+
+        # labels set from strings (older files) are encoded the same way
+        labeled.space_labeled = expected
+        self.assertListEqual(labeled.labels_at(np.nonzero(expected != '0')).tolist(),
+                             expected[expected != '0'].tolist())
+
+
+class ErosionTest(unittest.TestCase):
+    @staticmethod
+    def erode_twice(space, radius):
+        struct = np.ones([radius for _ in range(space.ndim)], dtype=bool)
+        space1 = ndimage.binary_erosion(space, structure=struct)
+        half = int(space.shape[-1] / 2)
+        space2 = ndimage.binary_erosion(np.concatenate([space[:, :, half:], space[:, :, :half]], axis=2), structure=struct)
+        space2 = np.concatenate([space2[:, :, half:], space2[:, :, :half]], axis=2)
+        return np.logical_or(space1, space2)
+
+    def test_erode_like_binary_erosion(self):
+        space = np.random.default_rng(3).random((16, 14, 12)) > 0.01
+        for radius in range(1, 6):
+            self.assertListEqual(conf_space.erode(space, radius).tolist(), self.erode_twice(space, radius).tolist())
+
+    def test_dilate_periodic_in_theta(self):
+        space = np.random.default_rng(4).random((10, 9, 8)) > 0.97
+        tiled = ndimage.binary_dilation(np.concatenate([space] * 3, axis=2), structure=np.ones((3, 3, 3), dtype=bool))
+        self.assertListEqual(conf_space.dilate(space, 3).tolist(), tiled[:, :, 8:16].tolist())
+
+
+class Box2DSpaceTest(unittest.TestCase):
+    """
+    The space has to be the same as the one of the cell by cell loop over Box2D bodies, that calculate_space used
+    before the collision checks were vectorized.
+    """
+    cs = copy(conf_space)
+    maze = Maze(size=cs.size, shape=cs.shape, solver=cs.solver, geometry=cs.geometry)
+    maze_bb = Maze(size=cs.size, shape=cs.shape, solver=cs.solver, geometry=cs.geometry, bb=True)
+
+    def box2d_possible(self, x: float, y: float, theta: float) -> bool:
+        maze_corners = np.array_split(self.maze.corners(), int(self.maze.corners().shape[0] / 4))
+        self.maze_bb.set_configuration([x, y], float(theta))
+        if possible_configuration(self.maze_bb.bodies[-1], maze_corners, (0, 0))[0]:
+            return True
+        self.maze.set_configuration([x, y], float(theta))
+        return possible_configuration(self.maze.bodies[-1], maze_corners, (0, 0))[0]
+
+    def test_slab_like_box2d(self):
+        nx, ny, ntheta = self.cs.space_shape()
+        ix = int(np.round((MazeGeometry(size=self.cs.size, shape=self.cs.shape, solver=self.cs.solver,
+                                        geometry=self.cs.geometry).slits[0] - self.cs.extent['x'][0])
+                          / self.cs.pos_resolution))
+        mask = np.zeros((4, ny, ntheta), dtype=bool)
+        mask[:, :, [0, ntheta // 8, ntheta // 4, ntheta // 2, ntheta - 1]] = True
+        slab = self.cs.calculate_space_slab(ix - 2, ix + 2, mask=mask)
+        for jx, iy, itheta in zip(*np.where(mask)):
+            x, y, theta = self.cs.indices_to_coords(ix - 2 + jx, iy, itheta)
+            self.assertEqual(slab[jx, iy, itheta], self.box2d_possible(x, y, theta), msg=str((ix - 2 + jx, iy, itheta)))
+
+    def test_touching_like_box2d(self):
+        # poses in which an edge of the load lies on a face of a wall (touching), and rotated by a quarter turn
+        # (tangent up to the single precision of Box2D)
+        load_corners, load_bb_corners, maze_corners = self.cs.collision_corners()
+        checker = CollisionChecker(load_corners, maze_corners)
+        bb_checker = CollisionChecker(load_bb_corners, maze_corners)
+        poses = []
+        for theta in [0, np.pi / 2, np.pi, 3 * np.pi / 2]:
+            rotated = transform_corners(load_corners, np.zeros((1, 2)), np.array([theta]))[0]
+            (x_min, y_min), (x_max, y_max) = rotated.reshape((-1, 2)).min(axis=0), rotated.reshape((-1, 2)).max(axis=0)
+            for wall in maze_corners[1:]:
+                (wall_x_min, wall_y_min), (wall_x_max, wall_y_max) = wall.min(axis=0), wall.max(axis=0)
+                wall_x, wall_y = (wall_x_min + wall_x_max) / 2, (wall_y_min + wall_y_max) / 2
+                poses += [(wall_x_min - x_max, wall_y, theta), (wall_x_max - x_min, wall_y, theta),
+                          (wall_x, wall_y_min - y_max, theta), (wall_x, wall_y_max - y_min, theta)]
+        poses = np.array(poses)
+
+        possible = bb_checker.possible_configurations(poses[:, :2], poses[:, 2])
+        possible[~possible] = checker.possible_configurations(poses[~possible, :2], poses[~possible, 2])
+        self.assertListEqual(possible.tolist(), [self.box2d_possible(*pose) for pose in poses])
+
+
+class GeometryTest(unittest.TestCase):
+    def test_like_box2d_maze(self):
+        geometry = ('MazeDimensions_human.xlsx', 'LoadDimensions_human.xlsx')
+        maze = Maze(size='Small Far', shape='SPT', solver='human', geometry=geometry)
+        maze_geometry = MazeGeometry(size='Small Far', shape='SPT', solver='human', geometry=geometry)
+
+        # Box2D may reorder the fixtures and their vertices
+        def rectangles(corners):
+            return sorted(sorted(map(tuple, np.round(rectangle, 4).tolist())) for rectangle in corners)
+
+        self.assertListEqual(rectangles(LoadGeometry(maze_geometry).corners),
+                             rectangles(load_corners_array(maze.bodies[-1])))
+        self.assertListEqual(maze_geometry.wall_corners().tolist(), maze.corners().reshape((-1, 4, 2)).tolist())
+
+    def test_find_contacts(self):
+        load_corners = np.array([[[-0.5, -0.5], [-0.5, 0.5], [0.5, 0.5], [0.5, -0.5]]])
+        maze_points = np.stack([np.full(11, 1.02), np.linspace(-0.5, 0.5, 11)], axis=1)
+        positions = np.array([[0.5, 0], [0, 0], [0.5, 3], [0.5, 0]])
+        angles = np.array([0, 0, 0, np.pi / 2])
+
+        contacts = find_contacts(load_corners, positions, angles, maze_points, chunk_size=3)
+        self.assertEqual(contacts.shape, (4, 11))
+        self.assertListEqual(np.diff(contacts.indptr).tolist(), [11, 0, 0, 11])
+        self.assertListEqual(contact_points(contacts, maze_points, 0).tolist(), maze_points.tolist())
+
+    def test_collision_checker_like_edge_crossings(self):
+        maze = MazeGeometry(size='Small Far', shape='SPT', solver='human',
+                            geometry=('MazeDimensions_human.xlsx', 'LoadDimensions_human.xlsx'))
+        load_corners, maze_corners = LoadGeometry(maze).corners, maze.wall_corners()
+        rng = np.random.default_rng(5)
+        positions = np.stack([rng.uniform(0, maze.slits[-1], 500), rng.uniform(0, maze.arena_height, 500)], axis=1)
+        angles = rng.choice(np.linspace(0, 2 * np.pi, 7), 500)
+
+        checker = CollisionChecker(load_corners, maze_corners)
+        for _ in range(2):
+            self.assertListEqual(checker.possible_configurations(positions, angles).tolist(),
+                                 possible_configurations(transform_corners(load_corners, positions, angles),
+                                                         maze_corners).tolist())
+
+    def test_collision_checker_touching(self):
+        # unit square load, a wall [1, 2] x [0, 1] and the arena [-5, 5] x [-5, 5]
+        load_corners = np.array([[[-0.5, -0.5], [0.5, -0.5], [0.5, 0.5], [-0.5, 0.5]]])
+        maze_corners = np.array([[[1, 0], [2, 0], [2, 1], [1, 1]], [[-5, -5], [5, -5], [5, 5], [-5, 5]]], dtype=float)
+        touching = np.array([[0.5, -0.5],  # corner on corner of the wall
+                             [0.5, 0.5],  # edge on edge of the wall
+                             [0.5, 1.],  # corner on the middle of an edge of the wall
+                             [1.5, 1.5],  # edge on top of the wall
+                             [4.5, 0.],  # edge on the arena
+                             [4.5, 4.5]])  # corner of the arena
+        checker = CollisionChecker(load_corners, maze_corners)
+        for angle in [0, np.pi / 2, np.pi, 3 * np.pi / 2]:
+            self.assertTrue(np.all(np.any(checker.collisions(touching, angle)[1], axis=(1, 2))))
+
+        rng = np.random.default_rng(3)
+        positions = np.concatenate([touching, rng.uniform(-5, 5, (300, 2))])
+        for angles in [np.zeros(len(positions)), rng.choice(np.linspace(0, 2 * np.pi, 9), len(positions))]:
+            self.assertListEqual(checker.possible_configurations(positions, angles).tolist(),
+                                 possible_configurations(transform_corners(load_corners, positions, angles),
+                                                         maze_corners).tolist())
@@ -0,0 +1,96 @@
+"""
+Binary morphology on spaces with a periodic axis (theta). The periodic axis is padded by wrapping it around, as far as
+the structuring element reaches. All other axes are treated as in scipy.ndimage (nodes beyond the border count as not
+in space for erosion). Padded arrays can be preallocated and passed as buffer and out, so that repeated calls do not
+allocate new arrays.
+"""
+import numpy as np
+from scipy import ndimage
+
+
+def pad_width(structure: np.array, axis: int = 2) -> int:
+    """
+    :return: how far the structuring element reaches along axis
+    """
+    return structure.shape[axis] // 2
+
+
+def padded_shape(shape: tuple, structure: np.array, axis: int = 2) -> tuple:
+    """
+    :return: shape of buffers for arrays of shape, padded for structure
+    """
+    return tuple(s + 2 * pad_width(structure, axis) if a == axis else s for a, s in enumerate(shape))
+
+
+def wrap_pad(space: np.array, width: int, axis: int = 2, out: np.array = None) -> np.array:
+    """
+    Pad the periodic axis by width on both sides, with the values from the other end of the axis.
+    :param space: array to pad
+    :param width: number of nodes added on every side
+    :param axis: periodic axis
+    :param out: buffer of the padded shape, that the padded array is written to
+    :return: padded array
+    """
+    length = space.shape[axis]
+    if out is None:
+        shape = list(space.shape)
+        shape[axis] += 2 * width
+        out = np.empty(shape, dtype=space.dtype)
+
+    def along_axis(start, stop):
+        return tuple(slice(start, stop) if a == axis else slice(None) for a in range(space.ndim))
+
+    out[along_axis(width, width + length)] = space
+    for start in range(0, width, length):  # the axis can be shorter than width
+        chunk = min(length, width - start)
+        out[along_axis(width - start - chunk, width - start)] = space[along_axis(length - chunk, length)]
+        out[along_axis(width + length + start, width + length + start + chunk)] = space[along_axis(0, chunk)]
+    return out
+
+
+def unpad(padded: np.array, width: int, axis: int = 2) -> np.array:
+    """
+    :return: view of padded without the padding
+    """
+    return padded[tuple(slice(width, padded.shape[axis] - width) if a == axis else slice(None)
+                        for a in range(padded.ndim))]
+
+
+def periodic_binary_erosion(space: np.array, structure: np.array, axis: int = 2, buffer: np.array = None,
+                            out: np.array = None) -> np.array:
+    """
+    Binary erosion, that is periodic along axis.
+    :param space: boolean array
+    :param structure: structuring element
+    :param axis: periodic axis
+    :param buffer: boolean array of shape padded_shape(space.shape, structure), used for the padded space
+    :param out: boolean array of shape padded_shape(space.shape, structure), the erosion is written to
+    :return: eroded space (view of out)
+    """
+    return _periodic(ndimage.binary_erosion, space, structure, axis, buffer, out)
+
+
+def periodic_binary_dilation(space: np.array, structure: np.array, axis: int = 2, buffer: np.array = None,
+                             out: np.array = None) -> np.array:
+    """
+    Binary dilation, that is periodic along axis.
+    :param space: boolean array
+    :param structure: structuring element
+    :param axis: periodic axis
+    :param buffer: boolean array of shape padded_shape(space.shape, structure), used for the padded space
+    :param out: boolean array of shape padded_shape(space.shape, structure), the dilation is written to
+    :return: dilated space (view of out)
+    """
+    return _periodic(ndimage.binary_dilation, space, structure, axis, buffer, out)
+
+
+def _periodic(operation, space: np.array, structure: np.array, axis: int, buffer: np.array, out: np.array) \
+        -> np.array:
+    width = pad_width(structure, axis)
+    if buffer is None:
+        buffer = np.empty(padded_shape(space.shape, structure, axis), dtype=bool)
+    if out is None:
+        out = np.empty(padded_shape(space.shape, structure, axis), dtype=bool)
+    wrap_pad(np.asarray(space, dtype=bool), width, axis=axis, out=buffer)
+    operation(buffer, structure=structure, output=out)
+    return unpad(out, width, axis=axis)
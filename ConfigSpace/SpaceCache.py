@@ -0,0 +1,162 @@
+import os
+import json
+import shutil
+from Directories import PhaseSpaceDirectory
+
+space_cache_directory = os.path.join(PhaseSpaceDirectory, 'cache')
+space_cache_budget = 50 * 1024 ** 3  # in bytes
+
+
+def link_or_copy(source: str, target: str) -> None:
+    """
+    Hard link source to target, or copy it, if linking is not possible. An existing target is replaced.
+    """
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class SpaceCache(object):
+    """
+    Cache of calculated configuration spaces, addressed by ConfigSpace_Maze.cache_key(), which is a hash of the maze
+    and load dimensions, the resolution and the solver. Every entry is written with ConfigSpace_Maze.write_space.
+    The modification time of the .json header of an entry is its last use. When the cache grows beyond its budget,
+    the least recently used entries are deleted. There is no shared index, so that processes which use the same cache
+    at the same time cannot overwrite each other's bookkeeping.
+    """
+
+    def __init__(self, directory: str = space_cache_directory, budget: int = space_cache_budget):
+        """
+        :param directory: where the cached spaces are saved
+        :param budget: maximal size of all cached spaces in bytes
+        """
+        self.directory = directory
+        self.budget = budget
+
+    def path(self, key: str) -> str:
+        """
+        :param key: cache key of a space
+        :return: .pkl path, as used by ConfigSpace_Maze.write_space and read_space
+        """
+        return os.path.join(self.directory, key + '.pkl')
+
+    def header_path(self, key: str) -> str:
+        return self.path(key)[:-4] + '.json'
+
+    def keys(self) -> list:
+        """
+        :return: keys of all entries in the cache
+        """
+        if not os.path.exists(self.directory):
+            return []
+        # arrays and their indices are called key_name..., only headers are called key.json
+        return [filename[:-5] for filename in os.listdir(self.directory)
+                if filename.endswith('.json') and '_' not in filename and filename.count('.') == 1]
+
+    def files(self, key: str) -> list:
+        """
+        :return: all files that belong to the entry with this key
+        """
+        if not os.path.exists(self.directory):
+            return []
+        return [os.path.join(self.directory, filename) for filename in os.listdir(self.directory)
+                if filename.startswith(key)]
+
+    def size(self, key: str) -> int:
+        """
+        :return: size of all files of the entry with this key in bytes
+        """
+        size = 0
+        for filename in self.files(key):
+            try:
+                size += os.path.getsize(filename)
+            except FileNotFoundError:  # removed by another process in the meantime
+                pass
+        return size
+
+    def get(self, key: str):
+        """
+        :param key: cache key of a space
+        :return: .pkl path of the cached space (to be read with ConfigSpace_Maze.read_space), None if not cached
+        """
+        try:
+            os.utime(self.header_path(key))  # remember the use
+        except FileNotFoundError:
+            return None
+        return self.path(key)
+
+    def put(self, conf_space, key: str, directory: str = None) -> None:
+        """
+        Save a calculated space in the cache, and delete old entries, if the cache is too large.
+        :param conf_space: ConfigSpace_Maze with space (and boundary)
+        :param key: conf_space.cache_key()
+        :param directory: .pkl path, where conf_space was just saved with write_space. Its files are linked into the
+        cache instead of being written a second time.
+        """
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        if directory is None:
+            conf_space.write_space(self.path(key))
+        else:
+            self.link(directory, key)
+        self.evict(keep=key)
+
+    def link(self, directory: str, key: str) -> None:
+        """
+        Add the files of a space saved with write_space to the cache under key. Files are hard linked if possible, and
+        copied otherwise (e.g. if the cache is on a different drive). The header is written last, so that only complete
+        entries are found.
+        :param directory: .pkl path of the saved space
+        :param key: cache key of the space
+        """
+        with open(directory[:-4] + '.json', 'r') as json_file:
+            header = json.load(json_file)
+        prefix = os.path.basename(directory)[:-4]
+        for group in ['arrays', 'pyramid']:
+            for name, filename in header.get(group, {}).items():
+                cached_filename = key + filename[len(prefix):]
+                source = os.path.join(os.path.dirname(directory), filename)
+                target = os.path.join(self.directory, cached_filename)
+                link_or_copy(source, target)
+                if os.path.exists(source + '.json'):  # index of a ChunkedArray
+                    link_or_copy(source + '.json', target + '.json')
+                header[group][name] = cached_filename
+
+        with open(self.header_path(key) + '.tmp', 'w') as json_file:
+            json.dump(header, json_file, indent=4)
+        os.replace(self.header_path(key) + '.tmp', self.header_path(key))
+
+    def last_used(self, key: str) -> float:
+        """
+        :return: time of the last use of the entry with this key (0 if it was removed in the meantime)
+        """
+        try:
+            return os.path.getmtime(self.header_path(key))
+        except FileNotFoundError:
+            return 0
+
+    def evict(self, keep: str = None) -> None:
+        """
+        Delete least recently used entries, until the cache fits into its budget.
+        :param keep: key that must not be deleted
+        """
+        keys = self.keys()
+        sizes = {key: self.size(key) for key in keys}
+        total = sum(sizes.values())
+        for key in sorted(keys, key=self.last_used):
+            if total <= self.budget:
+                break
+            if key == keep:
+                continue
+            print('Removing ' + key + ' from space cache')
+            # the header goes first, so that get() does not find the entry while its arrays are removed
+            header = self.header_path(key)
+            for filename in [header] + [f for f in self.files(key) if f != header]:
+                try:
+                    os.remove(filename)
+                except FileNotFoundError:  # removed by another process in the meantime
+                    pass
+            total -= sizes[key]
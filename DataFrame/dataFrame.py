@@ -127,13 +127,13 @@ class DataFrame(pd.DataFrame):
         #     if exp['filename'] in participant_count_dict.keys():
         #         self.at[i, 'average Carrier Number'] = participant_count_dict[exp['filename']]
 
-        self['time [s]'] = self['filename'].progress_apply(lambda x: get(x).timer())
+        self['time [s]'] = self['filename'].progress_apply(lambda x: get(x, lazy=True).timer())
         # self['maze dimensions'], self['load dimensions'] = self['filename'].progress_apply(lambda x: get(x).geometry())
 
     def fill_column(self):
         for i, row in tqdm(self.iterrows()):
             if row['maze dimensions'] is None:
-                geometry = get(row.filename).geometry()
+                geometry = get(row.filename, lazy=True).geometry()
                 self.at[i, 'maze dimensions'] = geometry[0]
                 self.at[i, 'load dimensions'] = geometry[1]
 
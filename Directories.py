@@ -21,6 +21,8 @@ mini_SaverDirectories = {'ant': path.join(mini_work_dir, 'Ant_Trajectories'),
                          'gillespie': path.join(mini_work_dir, 'Gillespie_Trajectories'),
                          'ps_simulation': path.join(mini_work_dir, 'PS_simulation_Trajectories')}
 
+columnar_work_dir = path.join(data_home, 'columnar_Trajectories')
+
 # TODO: Rotation student: Change data_home to fit where you saved your space
 PhaseSpaceDirectory = path.join(data_home, 'Configuration_Spaces')
 
@@ -29,6 +31,9 @@ contacts_dir = path.join(data_home, 'Contacts', 'ant')
 df_dir = path.join(data_home, 'DataFrame', 'data_frame.json')
 network_dir = path.join(home, 'Analysis', 'PathPy')
 maze_dimension_directory = path.join(home, 'Setup')
+# files, that can be recalculated any time (e.g. parsed dimension spreadsheets), outside of the source tree
+cache_directory = path.join(path.expanduser('~'), '.cache', 'AntsShapes')
+trajectory_index_address = path.join(cache_directory, 'trajectory_index.json')
 
 video_directory = path.join(home, 'Videos')
 if not path.exists(video_directory):
@@ -2,7 +2,6 @@ from copy import copy
 import os
 import numpy as np
 from typing import Union
-import networkx as nx
 from trajectory_inheritance.trajectory_ps_simulation import Trajectory_ps_simulation
 from Setup.Maze import start, end
 from PS_Search_Algorithms.Path_planning_in_CS import Path_planning_in_CS, Node3D, Node2D, Node_constructors
@@ -11,7 +10,6 @@ import pandas as pd
 from Directories import home
 from matplotlib import pyplot as plt
 from ConfigSpace.ConfigSpace_Maze import ConfigSpace_Maze
-from itertools import product
 import pickle
 from Directories import PhaseSpaceDirectory
 import time
@@ -23,7 +21,7 @@ class Binned_ConfigSpace(ConfigSpace):
         self.dim = high_resolution_space.space.ndim
         self.resolution = resolution
         super().__init__(space=self.decimate_space())
-        self.dual_space = self.calc_dual_space(periodic=[False, False, True])
+        self.dual_space = self.calc_dual_space(periodic=[False, False, True][:self.dim])
         # self.draw_dual_space()
         self.node_constructor = Node_constructors[self.dim]
 
@@ -37,21 +35,12 @@ class Binned_ConfigSpace(ConfigSpace):
         # self.conf_space.visualize_space(space=mask, colormap='Oranges')
 
     def decimate_space(self):
-        # if os.path.exists(self.directory()):
-        #     decimated_space = pickle.load(open(self.directory(), 'rb'))
-        #     return decimated_space
-
-        bin_size = self.resolution
-        space = self.high_resolution_space.space
-
-        decimated_shape = [int(s / bin_size) for s in space.shape]
-        decimated_space = np.empty(decimated_shape)
-
-        for i, j, k in product(*[range(s) for s in decimated_shape]):
-            bin_sum = np.sum(self.bin([(i, j, k), (i, j, k)]))
-            decimated_space[i, j, k] = bin_sum / bin_size ** self.dim
-        # self.save(decimated_space)
-        return decimated_space
+        """
+        Fraction of allowed nodes in every bin of self.high_resolution_space. Taken from the resolution pyramid of the
+        high resolution space, so that it is calculated only once. The level is copied, so that changes of the binned
+        space do not reach the pyramid.
+        """
+        return np.array(self.high_resolution_space.level(self.resolution))
 
     def save(self, decimated_space):
         pickle.dump(decimated_space, open(self.directory(), 'wb'))
@@ -203,10 +192,8 @@ class Path_Planning_Rotation_students(Path_planning_in_CS):
         :return: greedy node with indices from self.conf_space.space
         """
 
-        path = nx.dijkstra_path(self.planning_space.dual_space,
-                                self.planning_space.space_ind_to_bin_ind(self._current.ind()),
-                                self.planning_space.space_ind_to_bin_ind(self.end.ind()),
-                                weight="weight")
+        path = self.planning_space.shortest_path(self.planning_space.space_ind_to_bin_ind(self._current.ind()),
+                                                 self.planning_space.space_ind_to_bin_ind(self.end.ind()))
 
         if len(path) < 2:
             return self.node_constructor(*self.end.ind(), self.conf_space)
@@ -280,12 +267,11 @@ class Path_Planning_Rotation_students(Path_planning_in_CS):
 
         # self.draw_dual_lattice(); plt.show()
         print('Recalculating...')
-        start_bin_ind = self.planning_space.space_ind_to_bin_ind(self._current.ind())
-        end_bin_ind = self.planning_space.space_ind_to_bin_ind(greedy_bin.ind())
+        start_bin = self.planning_space.node_number(self.planning_space.space_ind_to_bin_ind(self._current.ind()))
+        end_bin = self.planning_space.node_number(self.planning_space.space_ind_to_bin_ind(greedy_bin.ind()))
 
-        edge = (start_bin_ind, end_bin_ind)
-        weight = self.planning_space.dual_space.edges[edge]["weight"]
-        nx.set_edge_attributes(self.planning_space.dual_space, {edge: {"weight": 2 * weight}})
+        self.planning_space.scale_edge(start_bin, end_bin, 2)
+        self.planning_space.scale_edge(end_bin, start_bin, 2)
 
         # self.planning_space.draw_dual_space(); plt.show()
 
@@ -25,7 +25,10 @@ class Path_planning_dilated(Path_planning_in_Maze):
     def warp_conf_space(self) -> np.array:
         planning_space = copy(self.conf_space)
         if self.dilation_radius > 0:
-            planning_space = planning_space.dilate(space=self.conf_space.space, radius=self.dilation_radius)
+            planning_space.space = planning_space.dilate(space=self.conf_space.space, radius=self.dilation_radius)
+        else:
+            # add_knowledge changes planning_space.space in place
+            planning_space.space = np.array(self.conf_space.space)
         return planning_space
 
     def add_knowledge(self, central_node: Node3D) -> None:
@@ -34,24 +37,17 @@ class Path_planning_dilated(Path_planning_in_Maze):
         the central node, which is the point of interception
         :param central_node: point of impact, which is the center of where the maze will be updated
         """
-        # roll the array
-        rolling_indices = [- max(central_node.xi - self.sensing_radius, 0),
-                           - max(central_node.yi - self.sensing_radius, 0),
-                           - (central_node.thetai - self.sensing_radius)]
-
-        conf_space_rolled = np.roll(self.conf_space.space, rolling_indices, axis=(0, 1, 2))
-        planning_space_rolled = np.roll(self.planning_space.space, rolling_indices, axis=(0, 1, 2))
-
-        # only the connected component which we sense
+        # cube of side length 2 * sensing_radius around the central node (theta is periodic)
         sr = self.sensing_radius
-        labeled, _ = label(conf_space_rolled[:2 * sr, :2 * sr, :2 * sr], structure)
-        planning_space_rolled[:2 * sr, :2 * sr, :2 * sr] = \
-            np.logical_or(
-                np.array(planning_space_rolled[:2 * sr, :2 * sr, :2 * sr], dtype=bool),
-                np.array(labeled == labeled[sr, sr, sr])).astype(int)
+        starts = [max(central_node.xi - sr, 0), max(central_node.yi - sr, 0), central_node.thetai - sr]
+        cube = np.ix_(*[(start + np.arange(min(2 * sr, length))) % length
+                        for start, length in zip(starts, self.conf_space.space.shape)])
 
-        # update_screen planning_space by using planning_space_rolled and rolling back
-        self.planning_space.space = np.roll(planning_space_rolled, [-r for r in rolling_indices], axis=(0, 1, 2))
+        # only the connected component which we sense
+        labeled, _ = label(self.conf_space.space[cube], structure)
+        self.planning_space.space[cube] = np.logical_or(np.array(self.planning_space.space[cube], dtype=bool),
+                                                         labeled == labeled[sr, sr, sr])
+        self.planning_space.invalidate_pyramid()
 
 
 def run_dilated(shape: str, size: str, solver: str, filename: str = None, show_animation: bool = False,
@@ -1,6 +1,6 @@
 from ConfigSpace.ConfigSpace_Maze import ConfigSpace_Maze
 from trajectory_inheritance.trajectory_ps_simulation import Trajectory_ps_simulation
-from Setup.Maze import start, end, Maze
+from Setup.Maze import start, end, MazeGeometry
 from PS_Search_Algorithms.classes.Node import Node3D, Node2D, Node_constructors
 from copy import copy
 from mayavi import mlab
@@ -222,7 +222,7 @@ class Path_planning_in_Maze(Path_planning_in_CS):
         conf_space.load_space()
         conf_space.visualize_space()
 
-        self.average_radius = Maze(x).average_radius()
+        self.average_radius = MazeGeometry(x).average_radius()
         super().__init__(starting_node, ending_node, max_iter, conf_space=conf_space)
         self.start, self.end = self.check_starting_and_ending(x, initial_cond=initial_cond)
         self._current = self.start
@@ -1,4 +1,6 @@
 from scipy.spatial import cKDTree
+from scipy import sparse
+from tqdm import tqdm
 from Setup.MazeFunctions import BoxIt
 import numpy as np
 from Setup.Load import loops
@@ -42,6 +44,207 @@ def possible_configuration(load, maze_corners, former_found) -> tuple:
     # return np.any([f.TestPoint(load.position) for f in maze.body.fixtures])
 
 
+def load_corners_array(load) -> np.array:
+    """
+    Corners of all the rectangles (fixtures) of a Box2D body.
+    :param load: Box2D body
+    :return: np.array of shape (number of rectangles, 4, 2)
+    """
+    return np.array(flatten(loops(load)), dtype=float).reshape((-1, 4, 2))
+
+
+def transform_corners(corners: np.array, positions: np.array, angles: np.array) -> np.array:
+    """
+    Move corners given in the load frame to world coordinates for many configurations at once.
+    Box2D saves positions and rotations in single precision, so we transform in single precision as well, in order to
+    find the same intersections as possible_configuration.
+    :param corners: np.array of shape (number of rectangles, 4, 2) in the load frame (position (0, 0), angle 0)
+    :param positions: np.array of shape (N, 2)
+    :param angles: np.array of shape (N,)
+    :return: np.array of shape (N, number of rectangles, 4, 2) in world coordinates
+    """
+    corners = np.asarray(corners, dtype=np.float32)
+    positions = np.asarray(positions, dtype=np.float32).reshape((-1, 2))
+    angles = np.asarray(angles, dtype=np.float32).reshape(-1)
+    cos, sin = np.cos(angles)[:, None, None], np.sin(angles)[:, None, None]
+    x = (cos * corners[..., 0] - sin * corners[..., 1]) + positions[:, 0, None, None]
+    y = (sin * corners[..., 0] + cos * corners[..., 1]) + positions[:, 1, None, None]
+    return np.stack([x, y], axis=-1).astype(float)
+
+
+def ccw_array(A, B, C) -> np.array:
+    """
+    ccw for arrays of points. The last axis carries (x, y).
+    """
+    return (C[..., 1] - A[..., 1]) * (B[..., 0] - A[..., 0]) > (B[..., 1] - A[..., 1]) * (C[..., 0] - A[..., 0])
+
+
+def intersect_array(A, B, C, D) -> np.array:
+    """
+    intersect for arrays of line segments AB and CD. The last axis carries (x, y), all other axes are broadcast.
+    """
+    return np.logical_and(ccw_array(A, C, D) != ccw_array(B, C, D), ccw_array(A, B, C) != ccw_array(A, B, D))
+
+
+def possible_configurations(load_corners: np.array, maze_corners: np.array) -> np.array:
+    """
+    Vectorized version of possible_configuration: every edge of every load rectangle is tested against every edge of
+    every maze rectangle.
+    :param load_corners: corners of the load in world coordinates, np.array of shape (N, number of rectangles, 4, 2)
+    :param maze_corners: corners of the maze, np.array of shape (number of rectangles, 4, 2)
+    :return: np.array of shape (N,), True, if the configuration does not intersect the maze
+    """
+    load_corners = np.asarray(load_corners, dtype=float)
+    maze_corners = np.asarray(maze_corners, dtype=float)
+
+    # edges as (start, end) pairs, flattened over the rectangles
+    A = load_corners.reshape((load_corners.shape[0], -1, 2))[:, :, None, :]
+    B = np.roll(load_corners, -1, axis=-2).reshape((load_corners.shape[0], -1, 2))[:, :, None, :]
+    C = maze_corners.reshape((-1, 2))[None, None, :, :]
+    D = np.roll(maze_corners, -1, axis=-2).reshape((-1, 2))[None, None, :, :]
+    return ~np.any(intersect_array(A, B, C, D), axis=(1, 2))
+
+
+def edge_normals(corners: np.array) -> np.array:
+    """
+    :param corners: corners of convex quadrilaterals, np.array of shape (..., 4, 2)
+    :return: normals of the edges from corner i to corner i + 1 (not normalized), np.array of shape (..., 4, 2)
+    """
+    edges = np.roll(corners, -1, axis=-2) - corners
+    return np.stack([-edges[..., 1], edges[..., 0]], axis=-1)
+
+
+def projection_intervals(corners: np.array, axes: np.array, subscripts: str) -> tuple:
+    """
+    :return: minimum and maximum of the projections of the corners onto the axes, reduced over the corners (last
+    output axis of subscripts)
+    """
+    projections = np.einsum(subscripts, corners, axes)
+    return projections.min(axis=-1), projections.max(axis=-1)
+
+
+class CollisionChecker(object):
+    """
+    Separating axis test of the load rectangles against the maze rectangles, for many configurations at once. The
+    results are the same as those of possible_configurations: A configuration is only impossible if edges of the load
+    and of the maze cross. A pair of convex quadrilaterals has crossing edges, if no edge normal of either one
+    separates them and neither one contains the other (this way the load inside the arena rectangle is not a
+    collision). Configurations in which a pair of rectangles is closer than self.tolerance to a tie of this test (edges
+    that touch, or nearly touch within the single precision of transform_corners) are not decided here, but handed to
+    possible_configurations itself.
+    All projections that do not depend on the position of the load are calculated once per angle, so every
+    configuration costs only one dot product per axis and the interval comparisons.
+    The pair of load and maze rectangles that collided most often in the last call is tested first, and only the
+    configurations, that it does not decide, are tested against all pairs. Every worker has its own CollisionChecker,
+    and therefore its own last colliding pair.
+    On the SPT ant XL maze (see __main__): about 26k voxels/s with edge crossings, 130-190k voxels/s with separating
+    axes, 0 of 4096 results differ.
+    """
+
+    def __init__(self, load_corners: np.array, maze_corners: np.array, tolerance: float = None):
+        """
+        :param load_corners: corners of the load in the load frame, np.array of shape (number of rectangles, 4, 2)
+        :param maze_corners: corners of the maze, np.array of shape (number of rectangles, 4, 2)
+        :param tolerance: distance to a tie of the test, below which possible_configurations decides (by default
+        1e-5 of the size of the maze)
+        """
+        self.load_corners = np.asarray(load_corners, dtype=float)
+        self.maze_corners = np.asarray(maze_corners, dtype=float)
+        self.tolerance = 1e-5 * np.max(np.abs(self.maze_corners)) if tolerance is None else tolerance
+        # unit normals, so that all projections are lengths
+        self.load_axes = edge_normals(self.load_corners)
+        self.load_axes /= np.linalg.norm(self.load_axes, axis=-1, keepdims=True)
+        self.maze_axes = edge_normals(self.maze_corners)
+        self.maze_axes /= np.linalg.norm(self.maze_axes, axis=-1, keepdims=True)
+
+        # load on its own axes (in the load frame, the rotation does not change these) and maze on its own axes
+        self.load_own = projection_intervals(self.load_corners, self.load_axes, 'rvd,rad->rav')
+        self.maze_own = projection_intervals(self.maze_corners, self.maze_axes, 'kvd,kad->kav')
+
+        self.last_pair = (0, 0)
+        self.angle = None
+        self.rotated = None
+
+    def rotate(self, angle: float) -> tuple:
+        """
+        Projections of the rotated load, that do not depend on the position.
+        :return: load axes in world coordinates (R, 4, 2), intervals of the maze on the load axes (R, K, 4) and of the
+        load (at position (0, 0)) on the maze axes (R, K, 4)
+        """
+        if self.angle != angle:
+            rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+            load_axes = self.load_axes @ rotation.T
+            self.rotated = (load_axes,
+                            projection_intervals(self.maze_corners, load_axes, 'kvd,rad->rkav'),
+                            projection_intervals(self.load_corners @ rotation.T, self.maze_axes, 'rvd,kad->rkav'))
+            self.angle = angle
+        return self.rotated
+
+    def collisions(self, positions: np.array, angle: float, r=slice(None), k=slice(None)) -> tuple:
+        """
+        :param positions: positions of the load, np.array of shape (N, 2)
+        :param angle: angle of the load in all configurations
+        :param r: load rectangles to test (list or slice)
+        :param k: maze rectangles to test (list or slice)
+        :return: two boolean np.arrays of shape (N, number of load rectangles, number of maze rectangles): True if the
+        edges of the rectangles cross, and True if the pair is closer than self.tolerance to a tie (then the first
+        array is False)
+        """
+        load_axes, maze_on_load, load_on_maze = self.rotate(angle)
+        load_shift = np.einsum('nd,rad->nra', positions, load_axes[r])[:, :, None, :]
+        maze_shift = np.einsum('nd,kad->nka', positions, self.maze_axes[k])[:, None, :, :]
+
+        # on the load axes (gap > 0: separated, maze_in_load >= 0: the maze rectangle lies inside the load)
+        load_lo, load_hi = [bound[r][None, :, None, :] + load_shift for bound in self.load_own]
+        maze_lo, maze_hi = [bound[r][:, k][None] for bound in maze_on_load]
+        gap = np.max(np.maximum(maze_lo - load_hi, load_lo - maze_hi), axis=-1)
+        maze_in_load = np.min(np.minimum(maze_lo - load_lo, load_hi - maze_hi), axis=-1)
+
+        # on the maze axes
+        load_lo, load_hi = [bound[r][:, k][None] + maze_shift for bound in load_on_maze]
+        maze_lo, maze_hi = [bound[k][None, None] for bound in self.maze_own]
+        gap = np.maximum(gap, np.max(np.maximum(maze_lo - load_hi, load_lo - maze_hi), axis=-1))
+        load_in_maze = np.min(np.minimum(load_lo - maze_lo, maze_hi - load_hi), axis=-1)
+
+        # edges cross, if the margin is negative
+        margin = np.maximum(gap, np.maximum(maze_in_load, load_in_maze))
+        return margin < -self.tolerance, np.abs(margin) <= self.tolerance
+
+    def possible_configurations(self, positions: np.array, angles: np.array) -> np.array:
+        """
+        Same as possible_configurations(transform_corners(load_corners, positions, angles), maze_corners).
+        :param positions: positions of the load, np.array of shape (N, 2)
+        :param angles: angles of the load, np.array of shape (N,)
+        :return: np.array of shape (N,), True, if the configuration does not intersect the maze
+        """
+        positions = np.asarray(positions, dtype=float).reshape((-1, 2))
+        unique_angles, inverse = np.unique(np.asarray(angles, dtype=float).reshape(-1), return_inverse=True)
+        possible = np.ones(positions.shape[0], dtype=bool)
+
+        for i, angle in enumerate(unique_angles):
+            configurations = np.where(inverse.reshape(-1) == i)[0]
+            r, k = self.last_pair
+            collide = self.collisions(positions[configurations], angle, r=[r], k=[k])[0][:, 0, 0]
+            possible[configurations[collide]] = False
+            undecided = configurations[~collide]
+            if undecided.size == 0:
+                continue
+
+            collisions, ties = self.collisions(positions[undecided], angle)
+            impossible = np.any(collisions, axis=(1, 2))
+            possible[undecided] = ~impossible
+            if np.any(collisions):
+                self.last_pair = np.unravel_index(np.argmax(np.sum(collisions, axis=0)), collisions.shape[1:])
+
+            # touching edges: let the edge crossings decide
+            ties = undecided[~impossible & np.any(ties, axis=(1, 2))]
+            if ties.size > 0:
+                possible[ties] = possible_configurations(
+                    transform_corners(self.load_corners, positions[ties], np.full(ties.size, angle)),
+                    self.maze_corners)
+        return possible
+
+
 def contact_loop_experiment(load, maze) -> list:
     """
     :return: list of all the points in world coordinates where the load is closer to the maze than distance_upper_bound.
@@ -59,3 +262,108 @@ def contact_loop_experiment(load, maze) -> list:
     if np.any(in_contact):
         contact = contact + maze.slitTree.data[np.where(in_contact)].tolist()
     return contact
+
+
+def load_edge_points(load_corners: np.array, step: float = distance_upper_bound) -> np.array:
+    """
+    Points on the edges of the load rectangles, sampled like in contact_loop_experiment.
+    :param load_corners: corners of the load in the load frame, np.array of shape (number of rectangles, 4, 2)
+    :param step: distance between points on the edges
+    :return: np.array of shape (number of points, 2) in the load frame
+    """
+    return np.vstack([BoxIt(rectangle, step) for rectangle in np.asarray(load_corners, dtype=float)])
+
+
+def find_contacts(load_corners: np.array, positions: np.array, angles: np.array, maze_points: np.array,
+                  chunk_size: int = 500) -> sparse.csr_matrix:
+    """
+    Batch version of contact_loop_experiment for a whole trajectory. The maze tree is built once, the edge points of
+    the load are moved to every frame with array math, and all frames are queried in chunks.
+    :param load_corners: corners of the load in the load frame, np.array of shape (number of rectangles, 4, 2)
+    :param positions: positions of the load, np.array of shape (number of frames, 2)
+    :param angles: angles of the load, np.array of shape (number of frames,)
+    :param maze_points: points on the maze walls (MazeDimensions.slit_tree_points()), np.array of shape (M, 2)
+    :param chunk_size: how many frames are queried at the same time
+    :return: boolean sparse matrix of shape (number of frames, M). Entry (frame, i) is True, if maze_points[i] is
+    closer to the load than distance_upper_bound in this frame. Use contact_points to get the coordinates.
+    """
+    edge_points = load_edge_points(load_corners)
+    positions = np.asarray(positions, dtype=float).reshape((-1, 2))
+    angles = np.asarray(angles, dtype=float).reshape(-1)
+    maze_tree = cKDTree(maze_points)
+
+    frames, indices = [], []
+    for start in tqdm(range(0, positions.shape[0], chunk_size)):
+        stop = min(start + chunk_size, positions.shape[0])
+        cos, sin = np.cos(angles[start:stop])[:, None], np.sin(angles[start:stop])[:, None]
+        x = cos * edge_points[:, 0] - sin * edge_points[:, 1] + positions[start:stop, 0, None]
+        y = sin * edge_points[:, 0] + cos * edge_points[:, 1] + positions[start:stop, 1, None]
+        points = np.stack([x, y], axis=-1).reshape((-1, 2))
+        # frames with NaN positions have no contacts
+        valid = np.where(np.all(np.isfinite(points), axis=1))[0]
+
+        pairs = cKDTree(points[valid]).sparse_distance_matrix(maze_tree, distance_upper_bound, output_type='ndarray')
+        frames.append(start + valid[pairs['i']] // edge_points.shape[0])
+        indices.append(pairs['j'])
+
+    frames, indices = np.concatenate(frames).astype(int), np.concatenate(indices).astype(int)
+    contacts = sparse.coo_matrix((np.ones(frames.shape[0], dtype=bool), (frames, indices)),
+                                 shape=(positions.shape[0], maze_tree.n)).tocsr()
+    contacts.sum_duplicates()
+    return contacts
+
+
+def contact_points(contacts: sparse.csr_matrix, maze_points: np.array, frame: int) -> np.array:
+    """
+    :param contacts: result of find_contacts
+    :param maze_points: the maze points, that were passed to find_contacts
+    :param frame: index of the frame
+    :return: points of the maze in contact with the load in this frame, np.array of shape (number of contacts, 2)
+    """
+    return np.asarray(maze_points)[contacts.indices[contacts.indptr[frame]:contacts.indptr[frame + 1]]]
+
+
+def points_in_polygons(points: np.array, corners: np.array, tolerance: float = 0) -> np.array:
+    """
+    Check, which points lie inside any of the given convex polygons.
+    :param points: np.array of shape (..., 2)
+    :param corners: corners of convex polygons, np.array of shape (number of polygons, number of corners, 2)
+    :param tolerance: points that are closer than tolerance to the outside of a polygon still count as inside.
+    Negative tolerance shrinks the polygons.
+    :return: boolean np.array of shape points.shape[:-1]
+    """
+    corners = np.asarray(corners, dtype=float)
+    points = np.asarray(points, dtype=float)[..., None, None, :]
+    edges = np.roll(corners, -1, axis=-2) - corners
+    # +1 for counter clockwise, -1 for clockwise polygons
+    orientation = np.sign(np.sum(corners[..., 0] * np.roll(corners[..., 1], -1, axis=-1)
+                                 - np.roll(corners[..., 0], -1, axis=-1) * corners[..., 1], axis=-1))[:, None]
+    cross = edges[..., 0] * (points[..., 1] - corners[..., 1]) - edges[..., 1] * (points[..., 0] - corners[..., 0])
+    signed_distance = orientation * cross / np.linalg.norm(edges, axis=-1)
+    return np.any(np.all(signed_distance >= -tolerance, axis=-1), axis=-1)
+
+
+if __name__ == '__main__':
+    import time
+    from Setup.Maze import MazeGeometry, LoadGeometry
+
+    # collision checks per second (voxels per second) on the SPT ant XL maze, before and after the separating axis test
+    maze = MazeGeometry(size='XL', shape='SPT', solver='ant',
+                        geometry=('MazeDimensions_new2021_SPT_ant.xlsx', 'LoadDimensions_new2021_SPT_ant.xlsx'))
+    load_corners, maze_corners = LoadGeometry(maze).corners, maze.wall_corners()
+    rng = np.random.default_rng(0)
+    number = 4096
+    positions = np.stack([rng.uniform(0, maze.slits[-1] + 5, number), rng.uniform(0, maze.arena_height, number)],
+                         axis=1)
+    angles = np.full(number, rng.uniform(0, 2 * np.pi))  # like a theta slice of the space
+
+    start = time.perf_counter()
+    before = possible_configurations(transform_corners(load_corners, positions, angles), maze_corners)
+    print('edge crossings: %d voxels/s' % (number / (time.perf_counter() - start)))
+
+    checker = CollisionChecker(load_corners, maze_corners)
+    for _ in range(2):  # the second run profits from the last colliding pair
+        start = time.perf_counter()
+        after = checker.possible_configurations(positions, angles)
+        print('separating axes: %d voxels/s' % (number / (time.perf_counter() - start)))
+    print('different results: %d of %d' % (np.sum(before != after), number))
@@ -3,10 +3,12 @@ from Box2D import b2BodyDef, b2_staticBody, b2World, b2_dynamicBody, b2FixtureDe
 from Setup.MazeFunctions import BoxIt
 from scipy.spatial import cKDTree
 from pandas import read_excel
-from Directories import maze_dimension_directory
+from Directories import maze_dimension_directory, cache_directory
 from PhysicsEngine.drawables import Polygon, Point, Circle, colors
 from copy import copy
 from os import path
+import os
+import pickle
 from trajectory_inheritance.exp_types import is_exp_valid
 
 ant_dimensions = ['ant', 'ps_simulation', 'sim', 'gillespie']  # also in Maze.py
@@ -41,10 +43,64 @@ ResizeFactors = {'ant': {'XL': 1, 'SL': 0.75, 'L': 0.5, 'M': 0.25, 'S': 0.125, '
 ResizeFactors['ps_simulation'] = dict(ResizeFactors['ant'], **ResizeFactors['human'])
 
 
+dimension_cache_directory = path.join(cache_directory, 'dimensions')
+_dimension_memo = {}  # name of the .xlsx file: (modification time of the file, parsed table)
+
+
+def read_dimensions(excel_file: str):
+    """
+    Read a spreadsheet with maze or load dimensions. Every spreadsheet is parsed only once: the parsed table is kept in
+    memory, and saved in dimension_cache_directory for other processes. Both are renewed, when the spreadsheet is
+    modified. A saved table that cannot be read or written is treated like a missing one.
+    :param excel_file: name of the .xlsx file in maze_dimension_directory
+    :return: pandas.DataFrame
+    """
+    address = path.join(maze_dimension_directory, excel_file)
+    modified = path.getmtime(address)
+    if excel_file in _dimension_memo and _dimension_memo[excel_file][0] == modified:
+        return _dimension_memo[excel_file][1]
+
+    compiled = path.join(dimension_cache_directory, excel_file + '.pkl')
+    df = None
+    if path.exists(compiled):
+        try:
+            with open(compiled, 'rb') as f:
+                compiled_modified, df = pickle.load(f)
+            if compiled_modified != modified:
+                df = None
+        except Exception:
+            # broken or written by an incompatible version of pandas
+            df = None
+
+    if df is None:
+        df = read_excel(address, engine='openpyxl')
+        try:
+            os.makedirs(dimension_cache_directory, exist_ok=True)
+            with open(compiled + '.tmp', 'wb') as f:
+                pickle.dump((modified, df), f)
+            os.replace(compiled + '.tmp', compiled)
+        except OSError as error:
+            print('Could not save dimensions in ' + compiled + ': ' + str(error))
+
+    _dimension_memo[excel_file] = (modified, df)
+    return df
+
+
+def is_trajectory(x) -> bool:
+    """
+    :param x: first positional argument of a maze
+    :return: whether x is a Trajectory (of any solver) or a LazyTrajectory, that stands in for one
+    """
+    # imported here, because trajectory_inheritance.trajectory imports this module
+    from trajectory_inheritance.trajectory import Trajectory
+    from trajectory_inheritance.LazyTrajectory import LazyTrajectory
+    return isinstance(x, (Trajectory, LazyTrajectory))
+
+
 def start(x, initial_cond: str):
     if initial_cond not in ['back', 'front']:
         raise ValueError('You initial_cond is not valid.')
-    maze = Maze(x)
+    maze = MazeGeometry(x)
     if x.shape == 'SPT':
         if initial_cond == 'back':
             # return [(maze.slits[0] - maze.slits[-1]) / 2 + maze.slits[-1] - 0.5, maze.arena_height / 2, 0]
@@ -60,99 +116,82 @@ def end(x):
     :param x: Trajectory object
     :return: list with coordinates of end of SPT
     """
-    maze = Maze(x)
+    maze = MazeGeometry(x)
     return [maze.slits[-1] * 1.26, maze.arena_height / 2, 0]
 
 
-class Maze_parent(b2World):
-    def __init__(self, position=None, angle=0, point_particle=False, bb: bool = False):
-        super().__init__(gravity=(0, 0), doSleep=True)
-
-        if not hasattr(self, 'size'):
-            self.size = 'XL'
-        if not hasattr(self, 'shape'):
-            self.shape = 'SPT'
-        if not hasattr(self, 'solver'):
-            self.solver = 'ant'
-        if not hasattr(self, 'arena_height'):
-            self.arena_height = 10
-        if not hasattr(self, 'arena_length'):
-            self.arena_length = 'XL'
-        if not hasattr(self, 'excel_file_load'):
-            self.excel_file_load = 'LoadDimensions_new2021_SPT_ant.xlsx'
-
-        self.maze = self.create_Maze()
-        self.create_Load(position=position, angle=angle, point_particle=point_particle, bb=bb)
+class MazeDimensions(object):
+    """
+    Dimensions of maze and load, read from the spreadsheets in geometry. Maze builds Box2D bodies from these,
+    MazeGeometry and LoadGeometry use them without Box2D.
+    """
 
-    def create_Maze(self):
-        pass
+    def getLoadDim(self):
+        df = read_dimensions(self.excel_file_load)
 
-    def set_configuration(self, position, angle):
-        self.bodies[-1].position.x, self.bodies[-1].position.y, self.bodies[-1].angle = position[0], position[1], angle
+        if self.shape != 'SPT' and self.solver in ant_dimensions:
+            d = df.loc[df['Name'] == self.shape]
+            shape_sizes = [d['height'].values[0], d['width'].values[0], d['thickness'].values[0]]
+            resize_factor = ResizeFactors[self.solver][self.size]
+            dimensions = [i * resize_factor for i in shape_sizes]
 
-    def create_Load(self, position=None, angle=0, point_particle=False, bb: bool = False):
+            if (resize_factor == 1) and self.shape[1:] == 'ASH':  # for XL ASH
+                dimensions = [le * resize_factor for le in [8.14, 5.6, 1.2]]
+            elif (resize_factor == 0.75) and self.shape[1:] == 'ASH':  # for XL ASH
+                dimensions = [le * resize_factor for le in [9, 6.2, 1.2]]
+            return dimensions
 
-        if position is None:
-            position = [0, 0]
-        self.CreateBody(b2BodyDef(position=(float(position[0]), float(position[1])),
-                                  angle=float(angle),
-                                  type=b2_dynamicBody,
-                                  fixedRotation=False,
-                                  linearDamping=0,
-                                  angularDamping=0,
-                                  userData='load'),
-                        restitution=0,
-                        friction=0,
-                        )
+        if self.excel_file_load in ['LoadDimensions_ant.xlsx', 'LoadDimensions_ant_L_I_425.xlsx',
+                                    'LoadDimensions_new2021_SPT_ant.xlsx']:
+            d = df.loc[df['Name'] == self.size + '_' + self.shape]
 
-        self.addLoadFixtures(point_particle=point_particle, bb=bb)
+        elif self.excel_file_load in ['LoadDimensions_human.xlsx']:
+            d = df.loc[df['Name'] == self.size[0]]
 
-    def addLoadFixtures(self, point_particle=False, bb: bool = False):
-        if point_particle:
-            return
+        elif self.excel_file_load in ['LoadDimensions_humanhand.xlsx']:
+            d = df.loc[0]
+        else:
+            raise ValueError('Unclear Load dimensions')
 
-        my_load = self.bodies[-1]
-        if self.shape == 'circle':
-            from trajectory_inheritance.gillespie import radius
-            my_load.CreateFixture(b2FixtureDef(shape=b2CircleShape(pos=(0, 0), radius=radius)),
-                                  density=1, friction=0, restitution=0,
-                                  )
+        dimensions = [d['long edge'].values[0], d['length'].values[0], d['width'].values[0],
+                      d['short edge'].values[0]]
+        return dimensions
 
+    def load_vertices(self, bb: bool = False) -> list:
+        """
+        Vertices of the rectangles, that the load consists of, in the load frame (the load is at position (0, 0) with
+        angle 0). These are the fixtures of the load in Maze.
+        :param bb: only the bounding box of the load (only for SPT)
+        :return: list of lists of 4 vertices
+        """
+        polygons = []
         if self.shape == 'H':
             [shape_height, shape_width, shape_thickness] = self.getLoadDim()
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (shape_width / 2, shape_thickness / 2),
                 (shape_width / 2, -shape_thickness / 2),
                 (-shape_width / 2, -shape_thickness / 2),
-                (-shape_width / 2, shape_thickness / 2)],
-                density=1, friction=0, restitution=0,
-            )
+                (-shape_width / 2, shape_thickness / 2)])
 
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (shape_width / 2, -shape_height / 2),
                 (shape_width / 2, shape_height / 2),
                 (shape_width / 2 - shape_thickness, shape_height / 2),
-                (shape_width / 2 - shape_thickness, -shape_height / 2)],
-                density=1, friction=0, restitution=0,
-            )
+                (shape_width / 2 - shape_thickness, -shape_height / 2)])
 
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (-shape_width / 2, -shape_height / 2),
                 (-shape_width / 2, shape_height / 2),
                 (-shape_width / 2 + shape_thickness, shape_height / 2),
-                (-shape_width / 2 + shape_thickness, -shape_height / 2)],
-                density=1, friction=0, restitution=0,
-            )
+                (-shape_width / 2 + shape_thickness, -shape_height / 2)])
 
         if self.shape == 'I':
             [shape_height, _, shape_thickness] = self.getLoadDim()
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (shape_height / 2, -shape_thickness / 2),
                 (shape_height / 2, shape_thickness / 2),
                 (-shape_height / 2, shape_thickness / 2),
-                (-shape_height / 2, -shape_thickness / 2)],
-                density=1, friction=0, restitution=0,
-            )
+                (-shape_height / 2, -shape_thickness / 2)])
 
         if self.shape == 'T':
             [shape_height, shape_width, shape_thickness] = self.getLoadDim()
@@ -161,156 +200,317 @@ class Maze_parent(b2World):
             # the T.
 
             #  Top horizontal T force_vector
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 ((-shape_height + shape_thickness) / 2 + h, -shape_width / 2),
                 ((-shape_height - shape_thickness) / 2 + h, -shape_width / 2),
                 ((-shape_height - shape_thickness) / 2 + h, shape_width / 2),
-                ((-shape_height + shape_thickness) / 2 + h, shape_width / 2)],
-                density=1, friction=0, restitution=0,
-            )
+                ((-shape_height + shape_thickness) / 2 + h, shape_width / 2)])
 
             #  Bottom vertical T force_vector
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 ((-shape_height + shape_thickness) / 2 + h, -shape_thickness / 2),
                 ((shape_height - shape_thickness) / 2 + h, -shape_thickness / 2),
                 ((shape_height - shape_thickness) / 2 + h, shape_thickness / 2),
-                ((-shape_height + shape_thickness) / 2 + h, shape_thickness / 2)], density=1, friction=0, restitution=0)
+                ((-shape_height + shape_thickness) / 2 + h, shape_thickness / 2)])
 
         if self.shape == 'SPT':  # This is the Special T
             [shape_height, shape_width, shape_thickness, short_edge] = self.getLoadDim()
             h = centerOfMass_shift * shape_width  # distance of the centroid away from the center of the long middle
             if bb:
-                my_load.CreatePolygonFixture(vertices=[
+                polygons.append([
                     (shape_width / 2 - h, shape_height / 2),
                     (shape_width / 2 - h, -shape_height / 2),
                     (-shape_width / 2 - h, -shape_height / 2),
-                    (-shape_width / 2 - h, shape_height / 2)],
-                    density=1, friction=0, restitution=0,
-                )
-                return
+                    (-shape_width / 2 - h, shape_height / 2)])
+                return polygons
 
             # This is the connecting middle piece
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (shape_width / 2 - h, shape_thickness / 2),
                 (shape_width / 2 - h, -shape_thickness / 2),
                 (-shape_width / 2 - h, -shape_thickness / 2),
-                (-shape_width / 2 - h, shape_thickness / 2)],
-                density=1, friction=0, restitution=0,
-            )
+                (-shape_width / 2 - h, shape_thickness / 2)])
 
             # This is the short side
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (shape_width / 2 - h, -short_edge / 2),
                 # This addition is because the special T looks like an H where one vertical side is shorter by a factor
                 # SPT_ratio
                 (shape_width / 2 - h, short_edge / 2),
                 (shape_width / 2 - shape_thickness - h, short_edge / 2),
-                (shape_width / 2 - shape_thickness - h, -short_edge / 2)],
-                density=1, friction=0, restitution=0,
-            )
+                (shape_width / 2 - shape_thickness - h, -short_edge / 2)])
 
             # This is the long side
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (-shape_width / 2 - h, -shape_height / 2),
                 (-shape_width / 2 - h, shape_height / 2),
                 (-shape_width / 2 + shape_thickness - h, shape_height / 2),
-                (-shape_width / 2 + shape_thickness - h, -shape_height / 2)],
-                density=1, friction=0, restitution=0,
-            )
+                (-shape_width / 2 + shape_thickness - h, -shape_height / 2)])
 
         if self.shape == 'RASH':  # This is the ASymmetrical H
             [shape_height, shape_width, shape_thickness] = self.getLoadDim()
             assymetric_h_shift = ASSYMETRIC_H_SHIFT * ResizeFactors[self.solver][self.size]
             # I multiply all these values with 2, because I got them in L, but want to state
             # them in XL.
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (shape_width / 2, shape_thickness / 2,),
                 (shape_width / 2, -shape_thickness / 2,),
                 (-shape_width / 2, -shape_thickness / 2,),
-                (-shape_width / 2, shape_thickness / 2,)],
-                density=1, friction=0, restitution=0,
-            )
+                (-shape_width / 2, shape_thickness / 2,)])
 
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (shape_width / 2, -shape_height / 2 + assymetric_h_shift,),
                 # This addition is because the special T looks like an H where one vertical side is shorter by a factor
                 # SPT_ratio
                 (shape_width / 2, shape_height / 2,),
                 (shape_width / 2 - shape_thickness, shape_height / 2,),
-                (shape_width / 2 - shape_thickness, -shape_height / 2 + assymetric_h_shift,)],
-                density=1, friction=0, restitution=0,
-            )
+                (shape_width / 2 - shape_thickness, -shape_height / 2 + assymetric_h_shift,)])
 
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (-shape_width / 2, -shape_height / 2,),
                 (-shape_width / 2, shape_height / 2 - assymetric_h_shift,),
                 (-shape_width / 2 + shape_thickness, shape_height / 2 - assymetric_h_shift,),
-                (-shape_width / 2 + shape_thickness, -shape_height / 2,)],
-                density=1, friction=0, restitution=0,
-            )
+                (-shape_width / 2 + shape_thickness, -shape_height / 2,)])
 
         if self.shape == 'LASH':  # This is the ASymmetrical H
             [shape_height, shape_width, shape_thickness] = self.getLoadDim()
             assymetric_h_shift = ASSYMETRIC_H_SHIFT * ResizeFactors[self.solver][self.size]
             # I multiply all these values with 2, because I got them in L, but want to state
             # them in XL.
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (shape_width / 2, shape_thickness / 2,),
                 (shape_width / 2, -shape_thickness / 2,),
                 (-shape_width / 2, -shape_thickness / 2,),
-                (-shape_width / 2, shape_thickness / 2,)],
-                density=1, friction=0, restitution=0,
-            )
+                (-shape_width / 2, shape_thickness / 2,)])
 
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (shape_width / 2, -shape_height / 2,),
                 # This addition is because the special T looks like an H where one vertical side is shorter by a factor
                 # SPT_ratio
                 (shape_width / 2, shape_height / 2 - assymetric_h_shift,),
                 (shape_width / 2 - shape_thickness, shape_height / 2 - assymetric_h_shift,),
-                (shape_width / 2 - shape_thickness, -shape_height / 2,)],
-                density=1, friction=0, restitution=0,
-            )
+                (shape_width / 2 - shape_thickness, -shape_height / 2,)])
 
-            my_load.CreatePolygonFixture(vertices=[
+            polygons.append([
                 (-shape_width / 2, -shape_height / 2 + assymetric_h_shift,),
                 (-shape_width / 2, shape_height / 2,),
                 (-shape_width / 2 + shape_thickness, shape_height / 2,),
-                (-shape_width / 2 + shape_thickness, -shape_height / 2 + assymetric_h_shift,)],
-                density=1, friction=0, restitution=0,
-            )
-        return my_load
+                (-shape_width / 2 + shape_thickness, -shape_height / 2 + assymetric_h_shift,)])
+        return polygons
 
-    def getLoadDim(self):
-        df = read_excel(path.join(maze_dimension_directory, self.excel_file_load), engine='openpyxl')
+    def average_radius(self):
+        r = ResizeFactors[self.solver][self.size]
+        radii = {'H': 2.9939 * r,
+                 'I': 2.3292 * r,
+                 'T': 2.9547 * r,
+                 'SPT': 0.76791 * self.getLoadDim()[1],
+                 'RASH': 2 * 1.6671 * r,
+                 'LASH': 2 * 1.6671 * r}
+        return radii[self.shape]
 
-        if self.shape != 'SPT' and self.solver in ant_dimensions:
-            d = df.loc[df['Name'] == self.shape]
-            shape_sizes = [d['height'].values[0], d['width'].values[0], d['thickness'].values[0]]
-            resize_factor = ResizeFactors[self.solver][self.size]
-            dimensions = [i * resize_factor for i in shape_sizes]
+    def circumference(self):
+        if self.shape == 'SPT':
+            shape_height, shape_width, shape_thickness, shape_height_short_edge = self.getLoadDim()
+        else:
+            shape_height, shape_width, shape_thickness = self.getLoadDim()
+            shape_height_short_edge = np.NaN
 
-            if (resize_factor == 1) and self.shape[1:] == 'ASH':  # for XL ASH
-                dimensions = [le * resize_factor for le in [8.14, 5.6, 1.2]]
-            elif (resize_factor == 0.75) and self.shape[1:] == 'ASH':  # for XL ASH
-                dimensions = [le * resize_factor for le in [9, 6.2, 1.2]]
-            return dimensions
+        shift = ASSYMETRIC_H_SHIFT * ResizeFactors[self.solver][self.size]
 
-        if self.excel_file_load in ['LoadDimensions_ant.xlsx', 'LoadDimensions_ant_L_I_425.xlsx',
-                                    'LoadDimensions_new2021_SPT_ant.xlsx']:
+        cir = {'H': 4 * shape_height - 2 * shape_thickness + 2 * shape_width,
+               'I': 2 * shape_height + 2 * shape_width,
+               'T': 2 * shape_height + 2 * shape_width,
+               'SPT': 2 * shape_height_short_edge + 2 * shape_height - 2 * shape_thickness + 2 * shape_width,
+               'RASH': 2 * shape_width + 4 * shape_height - 4 * shift - 2 * shape_thickness,
+               'LASH': 2 * shape_width + 4 * shape_height - 4 * shift - 2 * shape_thickness
+               }
+
+        if self.shape.endswith('ASH'):
+            raise ValueError('I do not know circumference of ASH!!!')
+
+        return cir[self.shape]
+
+    def getMazeDim(self):
+        df = read_dimensions(self.excel_file_maze)
+
+        if self.excel_file_maze in ['MazeDimensions_ant.xlsx', 'MazeDimensions_ant_L_I_425.xlsx',
+                                    'MazeDimensions_new2021_SPT_ant.xlsx']:  # all measurements in cm
             d = df.loc[df['Name'] == self.size + '_' + self.shape]
+            self.arena_length = d['arena_length'].values[0]
+            self.arena_height = d['arena_height'].values[0]
+            self.exit_size = d['exit_size'].values[0]
+            self.wallthick = d['wallthick'].values[0]
+            if type(d['slits'].values[0]) == str:
+                self.slits = [[float(s) for s in d['slits'].values[0].split(', ')][0],
+                              [float(s) for s in d['slits'].values[0].split(', ')][1]]
+            else:
+                self.slits = [d['slits'].values[0]]
 
-        elif self.excel_file_load in ['LoadDimensions_human.xlsx']:
-            d = df.loc[df['Name'] == self.size[0]]
+        elif self.excel_file_maze in ['MazeDimensions_humanhand.xlsx']:  # only SPT
+            d = df.loc[df['Name'] == self.solver]
+            self.arena_length = d['arena_length'].values[0]
+            self.arena_height = d['arena_height'].values[0]
+            self.exit_size = d['exit_size'].values[0]
+            self.wallthick = d['wallthick'].values[0]
+            self.slits = [float(s) for s in d['slits'].values[0].split(', ')]
 
-        elif self.excel_file_load in ['LoadDimensions_humanhand.xlsx']:
-            d = df.loc[0]
+        elif self.excel_file_maze in ['MazeDimensions_human.xlsx']:  # all measurements in meters
+            # StartedScripts: measure the slits again...
+            # these coordinate values are given inspired from the drawing in \\phys-guru-cs\ants\Tabea\Human
+            # Experiments\ExperimentalSetup
+            d = df.loc[df['Name'] == self.size]
+            A = [float(s) for s in d['A'].values[0].split(',')]
+            # B = [float(s) for s in d['B'].values[0].split(',')]
+            C = [float(s) for s in d['C'].values[0].split(',')]
+            D = [float(s) for s in d['D'].values[0].split(',')]
+            E = [float(s) for s in d['E'].values[0].split(',')]
+
+            self.arena_length, self.exit_size = A[0], D[1] - C[1]
+            self.wallthick = 0.1
+            self.arena_height = 2 * C[1] + self.exit_size
+            self.slits = [(E[0] + self.wallthick / 2),
+                          (C[0] + self.wallthick / 2)]  # These are the x positions at which the slits are positions
+
+        self.slitpoints = np.empty((len(self.slits) * 2, 4, 2), float)
+
+    def slit_points(self) -> np.array:
+        """
+        :return: corners of the walls of the slits, np.array of shape (number of walls, 4, 2)
+        """
+        # # The x and y position describe the point, where the middle (in x direction) of the top edge (y direction)
+        # of the lower wall of the slit is...
+        if self.shape == 'LongT':
+            # TODO
+            pass
+
+        # We need a special case for L_SPT because in the manufacturing the slits were not vertically glued
+        if self.size == 'L' and self.shape == 'SPT' and self.excel_file_maze == 'MazeDimensions_ant_old.xlsx':
+            slitLength = 4.1
+            slitpoints = np.empty((len(self.slits) * 2, 4, 2), float)
+            # this is the left (inside), bottom Slit
+            slitpoints[0] = np.array([[self.slits[0], 0],
+                                      [self.slits[0], slitLength],
+                                      [self.slits[0] + self.wallthick, slitLength],
+                                      [self.slits[0] + self.wallthick, 0]]
+                                     )
+            # this is the left (inside), upper Slit
+            slitpoints[1] = np.array([[self.slits[0] - 0.05, slitLength + self.exit_size],
+                                      [self.slits[0] + 0.1, self.arena_height],
+                                      [self.slits[0] + self.wallthick + 0.1, self.arena_height],
+                                      [self.slits[0] + self.wallthick - 0.05, slitLength + self.exit_size]]
+                                     )
+
+            # this is the right (outside), lower Slit
+            slitpoints[2] = np.array([[self.slits[1], 0],
+                                      [self.slits[1] + 0.1, slitLength],
+                                      [self.slits[1] + self.wallthick + 0.1, slitLength],
+                                      [self.slits[1] + self.wallthick, 0]]
+                                     )
+            # this is the right (outside), upper Slit
+            slitpoints[3] = np.array([[self.slits[1] + 0.2, slitLength + self.exit_size],
+                                      [self.slits[1] + 0.2, self.arena_height],
+                                      [self.slits[1] + self.wallthick + 0.2, self.arena_height],
+                                      [self.slits[1] + self.wallthick + 0.2, slitLength + self.exit_size]]
+                                     )
         else:
-            raise ValueError('Unclear Load dimensions')
+            slitpoints = np.empty((len(self.slits) * 2, 4, 2), float)
+            for i, slit in enumerate(self.slits):
+                # this is the lower Slit
+                slitpoints[2 * i] = np.array([[slit, 0],
+                                              [slit, (self.arena_height - self.exit_size) / 2],
+                                              [slit + self.wallthick, (self.arena_height - self.exit_size) / 2],
+                                              [slit + self.wallthick, 0]]
+                                             )
 
-        dimensions = [d['long edge'].values[0], d['length'].values[0], d['width'].values[0],
-                      d['short edge'].values[0]]
-        return dimensions
+                # this is the upper Slit
+                slitpoints[2 * i + 1] = np.array([[slit, (self.arena_height + self.exit_size) / 2],
+                                                  [slit, self.arena_height],
+                                                  [slit + self.wallthick, self.arena_height],
+                                                  [slit + self.wallthick,
+                                                   (self.arena_height + self.exit_size) / 2]]
+                                                 )
+        return slitpoints
+
+    def slit_tree_points(self) -> np.array:
+        """
+        Points on the walls of the arena and of the slits, that contacts of the load are searched for.
+        :return: np.array of shape (number of points, 2)
+        """
+        # I dont want to have the vertical line at the first exit
+        points = [BoxIt(np.array([[0, 0],
+                                  [0, self.arena_height],
+                                  [self.slits[-1], self.arena_height],
+                                  [self.slits[-1], 0]]),
+                        0.1, without='right')]
+        points += [BoxIt(slit_points, 0.01) for slit_points in self.slitpoints]
+        return np.vstack(points)
+
+    def corners(self):
+        corners = [[0, 0],
+                   [0, self.arena_height],
+                   [self.slits[-1] + 20, self.arena_height],
+                   [self.slits[-1] + 20, 0],
+                   ]
+        return np.array(corners + list(np.resize(self.slitpoints, (16, 2))))
+
+
+class Maze_parent(b2World, MazeDimensions):
+    def __init__(self, position=None, angle=0, point_particle=False, bb: bool = False):
+        super().__init__(gravity=(0, 0), doSleep=True)
+
+        if not hasattr(self, 'size'):
+            self.size = 'XL'
+        if not hasattr(self, 'shape'):
+            self.shape = 'SPT'
+        if not hasattr(self, 'solver'):
+            self.solver = 'ant'
+        if not hasattr(self, 'arena_height'):
+            self.arena_height = 10
+        if not hasattr(self, 'arena_length'):
+            self.arena_length = 'XL'
+        if not hasattr(self, 'excel_file_load'):
+            self.excel_file_load = 'LoadDimensions_new2021_SPT_ant.xlsx'
+
+        self.maze = self.create_Maze()
+        self.create_Load(position=position, angle=angle, point_particle=point_particle, bb=bb)
+
+    def create_Maze(self):
+        pass
+
+    def set_configuration(self, position, angle):
+        self.bodies[-1].position.x, self.bodies[-1].position.y, self.bodies[-1].angle = position[0], position[1], angle
+
+    def create_Load(self, position=None, angle=0, point_particle=False, bb: bool = False):
+
+        if position is None:
+            position = [0, 0]
+        self.CreateBody(b2BodyDef(position=(float(position[0]), float(position[1])),
+                                  angle=float(angle),
+                                  type=b2_dynamicBody,
+                                  fixedRotation=False,
+                                  linearDamping=0,
+                                  angularDamping=0,
+                                  userData='load'),
+                        restitution=0,
+                        friction=0,
+                        )
+
+        self.addLoadFixtures(point_particle=point_particle, bb=bb)
+
+    def addLoadFixtures(self, point_particle=False, bb: bool = False):
+        if point_particle:
+            return
+
+        my_load = self.bodies[-1]
+        if self.shape == 'circle':
+            from trajectory_inheritance.gillespie import radius
+            my_load.CreateFixture(b2FixtureDef(shape=b2CircleShape(pos=(0, 0), radius=radius)),
+                                  density=1, friction=0, restitution=0,
+                                  )
+
+        for vertices in self.load_vertices(bb=bb):
+            my_load.CreatePolygonFixture(vertices=vertices, density=1, friction=0, restitution=0)
+        return my_load
 
     def force_attachment_positions_in_trajectory(self, x, reference_frame='maze'):
         """
@@ -429,39 +629,6 @@ class Maze_parent(b2World):
         if display is None:
             d.display()
 
-    def average_radius(self):
-        r = ResizeFactors[self.solver][self.size]
-        radii = {'H': 2.9939 * r,
-                 'I': 2.3292 * r,
-                 'T': 2.9547 * r,
-                 'SPT': 0.76791 * self.getLoadDim()[1],
-                 'RASH': 2 * 1.6671 * r,
-                 'LASH': 2 * 1.6671 * r}
-        return radii[self.shape]
-
-    def circumference(self):
-        if self.shape == 'SPT':
-            shape_height, shape_width, shape_thickness, shape_height_short_edge = self.getLoadDim()
-        else:
-            shape_height, shape_width, shape_thickness = self.getLoadDim()
-            shape_height_short_edge = np.NaN
-
-        shift = ASSYMETRIC_H_SHIFT * ResizeFactors[self.solver][self.size]
-
-        cir = {'H': 4 * shape_height - 2 * shape_thickness + 2 * shape_width,
-               'I': 2 * shape_height + 2 * shape_width,
-               'T': 2 * shape_height + 2 * shape_width,
-               'SPT': 2 * shape_height_short_edge + 2 * shape_height - 2 * shape_thickness + 2 * shape_width,
-               'RASH': 2 * shape_width + 4 * shape_height - 4 * shift - 2 * shape_thickness,
-               'LASH': 2 * shape_width + 4 * shape_height - 4 * shift - 2 * shape_thickness
-               }
-
-        if self.shape.endswith('ASH'):
-            raise ValueError('I do not know circumference of ASH!!!')
-
-        return cir[self.shape]
-
-
 class Maze(Maze_parent):
     def __init__(self, *args, size='XL', shape='SPT', solver='ant', position=None, angle=0, point_particle=False,
                  geometry: tuple = None, i=0, bb: bool = False):
@@ -473,9 +640,7 @@ class Maze(Maze_parent):
         self.slitpoints = np.array([])
         self.slitTree = list()
 
-        if len(args) > 0 and type(args[0]).__name__ in ['Trajectory_human', 'Trajectory_ps_simulation',
-                                                        'Trajectory_ant', 'Trajectory_gillespie', 'Trajectory',
-                                                        'Trajectory_part']:
+        if len(args) > 0 and is_trajectory(args[0]):
             x = args[0]
             self.excel_file_maze, self.excel_file_load = x.geometry()
             self.shape = x.shape
@@ -494,125 +659,17 @@ class Maze(Maze_parent):
         super().__init__(position=position, angle=angle, point_particle=point_particle, bb=bb)
         self.CreateSlitObject()
 
-    def corners(self):
-        corners = [[0, 0],
-                   [0, self.arena_height],
-                   [self.slits[-1] + 20, self.arena_height],
-                   [self.slits[-1] + 20, 0],
-                   ]
-        return np.array(corners + list(np.resize(self.slitpoints, (16, 2))))
-
-    def getMazeDim(self):
-        df = read_excel(path.join(maze_dimension_directory, self.excel_file_maze), engine='openpyxl')
-
-        if self.excel_file_maze in ['MazeDimensions_ant.xlsx', 'MazeDimensions_ant_L_I_425.xlsx',
-                                    'MazeDimensions_new2021_SPT_ant.xlsx']:  # all measurements in cm
-            d = df.loc[df['Name'] == self.size + '_' + self.shape]
-            self.arena_length = d['arena_length'].values[0]
-            self.arena_height = d['arena_height'].values[0]
-            self.exit_size = d['exit_size'].values[0]
-            self.wallthick = d['wallthick'].values[0]
-            if type(d['slits'].values[0]) == str:
-                self.slits = [[float(s) for s in d['slits'].values[0].split(', ')][0],
-                              [float(s) for s in d['slits'].values[0].split(', ')][1]]
-            else:
-                self.slits = [d['slits'].values[0]]
-
-        elif self.excel_file_maze in ['MazeDimensions_humanhand.xlsx']:  # only SPT
-            d = df.loc[df['Name'] == self.solver]
-            self.arena_length = d['arena_length'].values[0]
-            self.arena_height = d['arena_height'].values[0]
-            self.exit_size = d['exit_size'].values[0]
-            self.wallthick = d['wallthick'].values[0]
-            self.slits = [float(s) for s in d['slits'].values[0].split(', ')]
-
-        elif self.excel_file_maze in ['MazeDimensions_human.xlsx']:  # all measurements in meters
-            # StartedScripts: measure the slits again...
-            # these coordinate values are given inspired from the drawing in \\phys-guru-cs\ants\Tabea\Human
-            # Experiments\ExperimentalSetup
-            d = df.loc[df['Name'] == self.size]
-            A = [float(s) for s in d['A'].values[0].split(',')]
-            # B = [float(s) for s in d['B'].values[0].split(',')]
-            C = [float(s) for s in d['C'].values[0].split(',')]
-            D = [float(s) for s in d['D'].values[0].split(',')]
-            E = [float(s) for s in d['E'].values[0].split(',')]
-
-            self.arena_length, self.exit_size = A[0], D[1] - C[1]
-            self.wallthick = 0.1
-            self.arena_height = 2 * C[1] + self.exit_size
-            self.slits = [(E[0] + self.wallthick / 2),
-                          (C[0] + self.wallthick / 2)]  # These are the x positions at which the slits are positions
-
-        self.slitpoints = np.empty((len(self.slits) * 2, 4, 2), float)
-
     def CreateSlitObject(self):
-        # # The x and y position describe the point, where the middle (in x direction) of the top edge (y direction)
-        # of the lower wall of the slit is...
-        if self.shape == 'LongT':
-            # TODO
-            pass
+        self.slitpoints = self.slit_points()
 
         # We need a special case for L_SPT because in the manufacturing the slits were not vertically glued
         if self.size == 'L' and self.shape == 'SPT' and self.excel_file_maze == 'MazeDimensions_ant_old.xlsx':
-            slitLength = 4.1
-            # this is the left (inside), bottom Slit
-            self.slitpoints[0] = np.array([[self.slits[0], 0],
-                                           [self.slits[0], slitLength],
-                                           [self.slits[0] + self.wallthick, slitLength],
-                                           [self.slits[0] + self.wallthick, 0]]
-                                          )
-            # this is the left (inside), upper Slit
-            self.slitpoints[1] = np.array([[self.slits[0] - 0.05, slitLength + self.exit_size],
-                                           [self.slits[0] + 0.1, self.arena_height],
-                                           [self.slits[0] + self.wallthick + 0.1, self.arena_height],
-                                           [self.slits[0] + self.wallthick - 0.05, slitLength + self.exit_size]]
-                                          )
-
-            # this is the right (outside), lower Slit
-            self.slitpoints[2] = np.array([[self.slits[1], 0],
-                                           [self.slits[1] + 0.1, slitLength],
-                                           [self.slits[1] + self.wallthick + 0.1, slitLength],
-                                           [self.slits[1] + self.wallthick, 0]]
-                                          )
-            # this is the right (outside), upper Slit
-            self.slitpoints[3] = np.array([[self.slits[1] + 0.2, slitLength + self.exit_size],
-                                           [self.slits[1] + 0.2, self.arena_height],
-                                           [self.slits[1] + self.wallthick + 0.2, self.arena_height],
-                                           [self.slits[1] + self.wallthick + 0.2, slitLength + self.exit_size]]
-                                          )
-        else:
-            self.slitpoints = np.empty((len(self.slits) * 2, 4, 2), float)
-            for i, slit in enumerate(self.slits):
-                # this is the lower Slit
-                self.slitpoints[2 * i] = np.array([[slit, 0],
-                                                   [slit, (self.arena_height - self.exit_size) / 2],
-                                                   [slit + self.wallthick, (self.arena_height - self.exit_size) / 2],
-                                                   [slit + self.wallthick, 0]]
-                                                  )
-
-                self.maze.CreatePolygonFixture(vertices=self.slitpoints[2 * i].tolist())
-
-                # this is the upper Slit
-                self.slitpoints[2 * i + 1] = np.array([[slit, (self.arena_height + self.exit_size) / 2],
-                                                       [slit, self.arena_height],
-                                                       [slit + self.wallthick, self.arena_height],
-                                                       [slit + self.wallthick,
-                                                        (self.arena_height + self.exit_size) / 2]]
-                                                      )
-
-                self.maze.CreatePolygonFixture(vertices=self.slitpoints[2 * i + 1].tolist())
-
-            # I dont want to have the vertical line at the first exit
-            self.slitTree = BoxIt(np.array([[0, 0],
-                                            [0, self.arena_height],
-                                            [self.slits[-1], self.arena_height],
-                                            [self.slits[-1], 0]]),
-                                  0.1, without='right')
+            return
 
-            for slit_points in self.slitpoints:
-                self.slitTree = np.vstack((self.slitTree, BoxIt(slit_points, 0.01)))
+        for slit_points in self.slitpoints:
+            self.maze.CreatePolygonFixture(vertices=slit_points.tolist())
 
-            self.slitTree = cKDTree(self.slitTree)
+        self.slitTree = cKDTree(self.slit_tree_points())
 
     # def get_zone(self):
     #     if self.shape == 'SPT':
@@ -670,9 +727,7 @@ class Maze(Maze_parent):
 class Maze_free_space(Maze_parent):
     def __init__(self, *args, size='XL', shape='SPT', solver='ant', position=None, angle=0, point_particle=False,
                  geometry: tuple = None, i=0, bb: bool = False):
-        if len(args) > 0 and type(args[0]).__name__ in ['Trajectory_human', 'Trajectory_ps_simulation',
-                                                        'Trajectory_ant', 'Trajectory_gillespie', 'Trajectory',
-                                                        'Trajectory_part']:
+        if len(args) > 0 and is_trajectory(args[0]):
             x = args[0]
             self.arena_height = np.max(x.position[:, 1])
             self.arena_length = np.max(x.position[:, 0])
@@ -698,3 +753,55 @@ class Maze_free_space(Maze_parent):
             vertices=[(0, 0), (0, self.arena_height), (self.arena_length, self.arena_height),
                       (self.arena_length, 0)])
         return my_maze
+
+
+class MazeGeometry(MazeDimensions):
+    """
+    Maze with the same dimensions as Maze, but without building a Box2D world. Use this, whenever only the geometry
+    is needed, e.g. to find the corners of the load for many configurations at once (see LoadGeometry).
+    """
+
+    def __init__(self, *args, size='XL', shape='SPT', solver='ant', geometry: tuple = None):
+        if len(args) > 0 and is_trajectory(args[0]):
+            x = args[0]
+            self.excel_file_maze, self.excel_file_load = x.geometry()
+            self.shape = x.shape
+            self.size = x.size
+            self.solver = x.solver
+        else:
+            self.excel_file_maze, self.excel_file_load = geometry
+            self.shape = shape
+            self.size = size
+            self.solver = solver
+
+        self.getMazeDim()
+        self.slitpoints = self.slit_points()
+
+    def wall_corners(self) -> np.array:
+        """
+        :return: corners of the arena and of the walls of the slits, np.array of shape (number of rectangles, 4, 2)
+        """
+        return self.corners().reshape((-1, 4, 2))
+
+
+class LoadGeometry(object):
+    """
+    Rectangles of the load (the fixtures of the load in Maze), without Box2D.
+    """
+
+    def __init__(self, maze: MazeDimensions, bb: bool = False):
+        """
+        :param maze: Maze or MazeGeometry with the dimensions of the load
+        :param bb: only the bounding box of the load (only for SPT)
+        """
+        self.corners = np.array(maze.load_vertices(bb=bb), dtype=float).reshape((-1, 4, 2))
+
+    def corners_at(self, poses: np.array) -> np.array:
+        """
+        Corners of the load for many configurations at once.
+        :param poses: np.array of shape (N, 3) with x, y and angle of the load
+        :return: np.array of shape (N, number of rectangles, 4, 2) in world coordinates
+        """
+        from PhysicsEngine.Contact import transform_corners
+        poses = np.asarray(poses, dtype=float).reshape((-1, 3))
+        return transform_corners(self.corners, poses[:, :2], poses[:, 2])
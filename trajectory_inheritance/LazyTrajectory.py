@@ -0,0 +1,99 @@
+import pickle
+from os import path
+from Directories import mini_SaverDirectories
+from trajectory_inheritance.TrajectoryStore import TrajectoryStore
+
+
+def mini_record(filename: str) -> tuple:
+    """
+    :param filename: filename of the trajectory
+    :return: minimal record written by Trajectory.save: (shape, size, solver, filename, fps, position, angle, frames,
+    winner)
+    """
+    for directory in mini_SaverDirectories.values():
+        if path.exists(path.join(directory, filename)):
+            with open(path.join(directory, filename), 'rb') as f:
+                return pickle.load(f)
+    raise ValueError('I cannot find a minimal record of ' + filename)
+
+
+class LazyTrajectory(object):
+    """
+    Stands in for a Trajectory, without unpickling it. size, shape, solver, filename, fps, winner and geometry() come
+    from the metadata in the TrajectoryStore, position, angle and frames are memory-mapped from the store when they
+    are first touched. Trajectories that are not in the store yet are read from their minimal record
+    (mini_SaverDirectories), which includes the arrays but not the geometry, when the first of its attributes is
+    touched.
+    Everything else (e.g. x.velocity(...) or x.play()) loads the full trajectory with get().
+    """
+    record = ['shape', 'size', 'solver', 'fps', 'winner'] + TrajectoryStore.arrays
+
+    def __init__(self, filename: str, store: TrajectoryStore = None):
+        """
+        :param filename: filename of the trajectory
+        :param store: TrajectoryStore to read from
+        """
+        if store is None:
+            store = TrajectoryStore()
+        self.filename = filename
+        self._arrays = {}
+        self._trajectory = None
+
+        if filename in store:
+            self._store = store
+            metadata = store.metadata(filename)
+            self.shape, self.size, self.solver = metadata['shape'], metadata['size'], metadata['solver']
+            self.fps, self.winner = metadata['fps'], metadata['winner']
+            self._geometry = tuple(metadata['geometry']) if metadata['geometry'] is not None else None
+            self._length = metadata['length']
+        else:
+            self._store = None
+            self._geometry = None
+            self._length = None
+
+    def read_mini_record(self) -> None:
+        """
+        Read the minimal record of a trajectory, that is not in the store. Only happens, when one of its attributes is
+        first touched.
+        """
+        self.shape, self.size, self.solver, _, self.fps, position, angle, frames, self.winner = \
+            mini_record(self.filename)
+        self._arrays = {'position': position, 'angle': angle, 'frames': frames}
+        self._length = len(frames)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._store is None and self._length is None and name in self.record:
+            self.read_mini_record()
+            return getattr(self, name)
+        if name in TrajectoryStore.arrays:
+            if name not in self._arrays:
+                self._arrays[name] = self._store.array(self.filename, name)
+            return self._arrays[name]
+        return getattr(self.trajectory(), name)
+
+    def __str__(self):
+        return 'LazyTrajectory ' + self.filename
+
+    def trajectory(self):
+        """
+        :return: the full trajectory (loaded only once)
+        """
+        if self._trajectory is None:
+            from trajectory_inheritance.trajectory import get
+            self._trajectory = get(self.filename)
+        return self._trajectory
+
+    def geometry(self) -> tuple:
+        if self._geometry is None:
+            return self.trajectory().geometry()
+        return self._geometry
+
+    def timer(self) -> float:
+        """
+        :return: time in seconds
+        """
+        if self._length is None:
+            self.read_mini_record()
+        return (self._length - 1) / self.fps
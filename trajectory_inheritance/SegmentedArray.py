@@ -0,0 +1,160 @@
+import numpy as np
+from numpy.lib.mixins import NDArrayOperatorsMixin
+
+
+class SegmentedArray(NDArrayOperatorsMixin):
+    """
+    Read-only array, that consists of segments along the first axis, e.g. the positions of the parts of a VideoChain.
+    Joining and slicing along the first axis copy nothing: slices are (SegmentedArrays of) read-only views of the
+    segments.
+    Every segment can carry a constant offset, which is added when it is read (used for the angles of joined
+    trajectories).
+    Everything else (arithmetic, numpy functions, other indexing) works on the concatenated array, which is built only
+    once.
+    """
+
+    def __init__(self, segments: list, offsets: list = None):
+        """
+        :param segments: np.arrays, that agree in all but the first axis
+        :param offsets: constant added to every segment (default 0)
+        """
+        self.segments = list(segments)
+        self.offsets = list(offsets) if offsets is not None else [0 for _ in self.segments]
+        self._array = None
+
+    @staticmethod
+    def concatenate(arrays: list, offsets: list = None) -> 'SegmentedArray':
+        """
+        Join arrays along the first axis without copying them.
+        :param arrays: np.arrays or SegmentedArrays
+        :param offsets: constant added to every array (default 0)
+        :return: SegmentedArray with the segments of all arrays
+        """
+        if offsets is None:
+            offsets = [0 for _ in arrays]
+        segments, segment_offsets = [], []
+        for array, offset in zip(arrays, offsets):
+            if isinstance(array, SegmentedArray):
+                segments += array.segments
+                segment_offsets += [o + offset for o in array.offsets]
+            else:
+                segments.append(np.asarray(array))
+                segment_offsets.append(offset)
+        return SegmentedArray(segments, segment_offsets)
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments)
+
+    @property
+    def shape(self) -> tuple:
+        return (len(self),) + self.segments[0].shape[1:]
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.result_type(*[segment.dtype for segment in self.segments], *self.offsets)
+
+    def starts(self) -> list:
+        """
+        :return: index of the first element of every segment
+        """
+        return np.cumsum([0] + [len(segment) for segment in self.segments[:-1]]).tolist()
+
+    def read(self, i: int, key) -> np.array:
+        """
+        :return: segment i indexed with key, with its offset (read-only)
+        """
+        part = self.segments[i][key]
+        if self.offsets[i] != 0:
+            part = part + self.offsets[i]
+        if isinstance(part, np.ndarray):
+            part = part.view()
+            part.flags.writeable = False
+        return part
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        first, rest = key[0], key[1:]
+
+        if isinstance(first, (int, np.integer)):
+            index = int(first) + len(self) if first < 0 else int(first)
+            if not 0 <= index < len(self):
+                raise IndexError('index ' + str(first) + ' is out of bounds for SegmentedArray of length '
+                                 + str(len(self)))
+            i = int(np.searchsorted(self.starts(), index, side='right')) - 1
+            return self.read(i, (index - self.starts()[i],) + rest)
+
+        if isinstance(first, slice):
+            start, stop, step = first.indices(len(self))
+            if step > 0:
+                return self._slice(start, stop, step, rest)
+
+        return np.asarray(self)[key]
+
+    def _slice(self, start: int, stop: int, step: int, rest: tuple):
+        """
+        Slice with positive step along the first axis, rest is applied to every segment.
+        """
+        segments, offsets = [], []
+        for segment, offset, segment_start in zip(self.segments, self.offsets, self.starts()):
+            # first index in this segment, that is hit by the slice
+            first = start + max(0, -(-(segment_start - start) // step)) * step
+            last = min(stop, segment_start + len(segment))
+            if first < last:
+                part = segment[(slice(first - segment_start, last - segment_start, step),) + rest].view()
+                part.flags.writeable = False
+                segments.append(part)
+                offsets.append(offset)
+
+        if len(segments) == 0:
+            return np.asarray(self)[(slice(start, stop, step),) + rest]
+        if len(segments) == 1 and offsets[0] == 0:
+            return segments[0]
+        return SegmentedArray(segments, offsets)
+
+    def __setitem__(self, key, value):
+        raise TypeError('SegmentedArray is read-only, copy it first.')
+
+    def __iter__(self):
+        for i, segment in enumerate(self.segments):
+            for index in range(len(segment)):
+                yield self.read(i, index)
+
+    def __array__(self, dtype=None, copy=None) -> np.array:
+        """
+        :return: the concatenated array (read-only), or a writable copy of it if copy is True
+        """
+        if self._array is None:
+            self._array = np.concatenate([self.read(i, slice(None)) for i in range(len(self.segments))])
+            self._array.flags.writeable = False
+        if copy:
+            return np.array(self._array, dtype=dtype)
+        if dtype is not None and np.dtype(dtype) != self._array.dtype:
+            if copy is False:
+                raise ValueError('SegmentedArray cannot be converted to ' + str(dtype) + ' without a copy.')
+            return self._array.astype(dtype)
+        return self._array
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        inputs = [np.asarray(i) if isinstance(i, SegmentedArray) else i for i in inputs]
+        return getattr(ufunc, method)(*inputs, **kwargs)
+
+    def __getattr__(self, name):
+        # everything else, that np.arrays have (e.g. T, tolist, mean), on the concatenated array
+        if name.startswith('_') or name in ['segments', 'offsets']:
+            raise AttributeError(name)
+        return getattr(np.asarray(self), name)
+
+    def copy(self) -> np.array:
+        """
+        :return: writable np.array with the content of the SegmentedArray
+        """
+        return np.array(np.asarray(self))
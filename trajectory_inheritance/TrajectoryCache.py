@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from copy import copy
+import numpy as np
+
+trajectory_cache_budget = 2 * 1024 ** 3  # in bytes
+
+
+def array_attributes(x) -> list:
+    """
+    :return: names of the attributes of x, that are np.arrays
+    """
+    return [name for name, value in vars(x).items() if isinstance(value, np.ndarray)]
+
+
+def trajectory_bytes(x) -> int:
+    """
+    :return: bytes of all arrays of the trajectory (and of its participants)
+    """
+    objects = [x] + ([x.participants] if hasattr(x, 'participants') and hasattr(x.participants, '__dict__') else [])
+    return sum(getattr(o, name).nbytes for o in objects for name in array_attributes(o))
+
+
+def read_only(x):
+    """
+    :return: shallow copy of x, whose arrays are read-only views of the arrays of x
+    """
+    view = copy(x)
+    for name in array_attributes(x):
+        array = getattr(x, name).view()
+        array.flags.writeable = False
+        setattr(view, name, array)
+    return view
+
+
+class TrajectoryCache(object):
+    """
+    Cache of loaded trajectories, that are kept in memory for the whole process. The size of the cache is the size of
+    the arrays of the trajectories. When it grows beyond its budget, the least recently used trajectories are removed.
+    Callers get shallow copies with read-only arrays, so that they cannot change the cached trajectory. Who wants to
+    change the arrays of a trajectory in place has to copy them first (or load with get(filename, cache=False)).
+    """
+
+    def __init__(self, budget: int = trajectory_cache_budget):
+        """
+        :param budget: maximal size of all cached arrays in bytes
+        """
+        self.budget = budget
+        self.trajectories = OrderedDict()
+        self.sizes = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.trajectories)
+
+    def size(self) -> int:
+        return sum(self.sizes.values())
+
+    def get(self, filename: str):
+        """
+        :param filename: filename of the trajectory
+        :return: read-only copy of the cached trajectory, None if it is not cached
+        """
+        if filename not in self.trajectories:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.trajectories.move_to_end(filename)
+        return read_only(self.trajectories[filename])
+
+    def put(self, filename: str, x):
+        """
+        Add a trajectory and remove the least recently used ones, if the cache is too large. Trajectories that are
+        larger than the budget are not cached.
+        :param filename: filename of the trajectory
+        :param x: loaded trajectory (the cache takes ownership, x must not be changed afterwards)
+        :return: read-only copy of x, if x was cached, x otherwise
+        """
+        size = trajectory_bytes(x)
+        if size > self.budget:
+            return x
+        self.trajectories[filename] = x
+        self.trajectories.move_to_end(filename)
+        self.sizes[filename] = size
+        while self.size() > self.budget:
+            removed, _ = self.trajectories.popitem(last=False)
+            self.sizes.pop(removed)
+        return read_only(x)
+
+    def remove(self, filename: str) -> None:
+        """
+        Forget a trajectory, e.g. because it was saved again.
+        :param filename: filename of the trajectory
+        """
+        self.trajectories.pop(filename, None)
+        self.sizes.pop(filename, None)
+
+    def clear(self) -> None:
+        self.trajectories.clear()
+        self.sizes.clear()
+
+    def info(self) -> dict:
+        """
+        :return: hits, misses, number of cached trajectories and their size in bytes
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'trajectories': len(self), 'bytes': self.size()}
+
+
+trajectory_cache = TrajectoryCache()
@@ -0,0 +1,121 @@
+import os
+import json
+from os import path
+from Directories import work_dir, trajectory_index_address
+
+
+class TrajectoryIndex(object):
+    """
+    Index from the filename of a pickled trajectory to the directory in work_dir it is saved in. The index is saved as
+    json together with the modification time of every directory. An update only lists the directories whose
+    modification time changed (i.e. files or subdirectories were added, removed or renamed), all others are only
+    stat'ed. Filenames that were not found are remembered, until a directory in the index is modified.
+    """
+
+    def __init__(self, root: str = work_dir, address: str = trajectory_index_address):
+        """
+        :param root: directory that is indexed (with all its subdirectories)
+        :param address: where the index is saved
+        """
+        self.root = root
+        self.address = address
+        self.directories = self.load()
+        self.locations = self.find_locations()
+        self.missing = set()  # filenames, that were not found since the last change of a directory
+
+    def load(self) -> dict:
+        if not path.exists(self.address):
+            return {}
+        try:
+            with open(self.address, 'r') as json_file:
+                return json.load(json_file)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        try:
+            os.makedirs(path.dirname(self.address), exist_ok=True)
+            with open(self.address + '.tmp', 'w') as json_file:
+                json.dump(self.directories, json_file)
+            os.replace(self.address + '.tmp', self.address)
+        except OSError as error:
+            print('Could not save trajectory index in ' + self.address + ': ' + str(error))
+
+    def changed(self) -> bool:
+        """
+        :return: whether root or a directory in the index was modified since the last update
+        """
+        if self.root not in self.directories:
+            return True
+        for directory, entry in self.directories.items():
+            try:
+                if os.stat(directory).st_mtime != entry['mtime']:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def find_locations(self) -> dict:
+        """
+        :return: dictionary from filename to directory. If a filename exists in more than one directory, the
+        directory that is visited first (like in os.walk) is used.
+        """
+        locations = {}
+        for directory, entry in self.directories.items():
+            for filename in entry['files']:
+                locations.setdefault(filename, directory)
+        return locations
+
+    def update(self) -> None:
+        """
+        Walk through root and list all directories, that changed since the last update.
+        """
+        directories = {}
+        to_visit = [self.root]
+        while len(to_visit) > 0:
+            directory = to_visit.pop()
+            try:
+                mtime = os.stat(directory).st_mtime
+            except OSError:
+                continue
+            entry = self.directories.get(directory)
+            if entry is None or entry['mtime'] != mtime:
+                entry = {'mtime': mtime, 'files': [], 'subdirectories': []}
+                for dir_entry in os.scandir(directory):
+                    entry['subdirectories' if dir_entry.is_dir() else 'files'].append(dir_entry.name)
+            directories[directory] = entry
+            to_visit += [path.join(directory, subdirectory) for subdirectory in reversed(entry['subdirectories'])]
+
+        self.missing = set()
+        if directories == self.directories:
+            return
+        self.directories = directories
+        self.locations = self.find_locations()
+        self.save()
+
+    def locate(self, filename: str):
+        """
+        :param filename: name of the pickled trajectory
+        :return: address of the trajectory, None if it does not exist in root
+        """
+        if filename in self.missing and not self.changed():
+            return None
+        if filename not in self.locations or not path.exists(path.join(self.locations[filename], filename)):
+            self.update()
+        if filename not in self.locations:
+            self.missing.add(filename)
+            return None
+        return path.join(self.locations[filename], filename)
+
+
+_trajectory_index = None
+
+
+def trajectory_index() -> TrajectoryIndex:
+    """
+    :return: the index of work_dir, loaded only once per process
+    """
+    global _trajectory_index
+    if _trajectory_index is None:
+        _trajectory_index = TrajectoryIndex()
+    return _trajectory_index
@@ -0,0 +1,84 @@
+import os
+import json
+from os import path
+import numpy as np
+from tqdm import tqdm
+from Directories import columnar_work_dir
+
+
+class TrajectoryStore(object):
+    """
+    Columnar store of trajectories. Every trajectory is a directory that contains one .npy file per array (position,
+    angle, frames), which can be memory-mapped, and metadata.json with the attributes of the minimal record (shape,
+    size, solver, filename, fps, winner), the geometry and the name of the class. The metadata can be read without
+    reading any array.
+    """
+    arrays = ['position', 'angle', 'frames']
+
+    def __init__(self, directory: str = columnar_work_dir):
+        """
+        :param directory: where the trajectories are saved
+        """
+        self.directory = directory
+
+    def path(self, filename: str, name: str = 'metadata') -> str:
+        """
+        :param filename: filename of the trajectory
+        :param name: 'metadata' or one of the arrays
+        :return: address of the file
+        """
+        return path.join(self.directory, filename, name + ('.json' if name == 'metadata' else '.npy'))
+
+    def __contains__(self, filename: str) -> bool:
+        return path.exists(self.path(filename))
+
+    def put(self, x) -> None:
+        """
+        Save the arrays and the metadata of a trajectory. The metadata is written last, so that only complete
+        trajectories are found in the store.
+        :param x: Trajectory
+        """
+        if not path.exists(path.join(self.directory, x.filename)):
+            os.makedirs(path.join(self.directory, x.filename))
+
+        for name in self.arrays:
+            with open(self.path(x.filename, name) + '.tmp', 'wb') as file:
+                np.save(file, np.asarray(getattr(x, name)))
+            os.replace(self.path(x.filename, name) + '.tmp', self.path(x.filename, name))
+
+        geometry = x.geometry()
+        metadata = {'shape': x.shape, 'size': x.size, 'solver': x.solver, 'filename': x.filename,
+                    'fps': np.asarray(x.fps).item(), 'winner': None if x.winner is None else bool(x.winner),
+                    'geometry': list(geometry) if geometry is not None else None,
+                    'class': type(x).__name__,
+                    'length': len(x.frames)}
+        with open(self.path(x.filename) + '.tmp', 'w') as json_file:
+            json.dump(metadata, json_file, indent=4)
+        os.replace(self.path(x.filename) + '.tmp', self.path(x.filename))
+
+    def metadata(self, filename: str) -> dict:
+        """
+        :param filename: filename of the trajectory
+        :return: metadata of the trajectory (no arrays are read)
+        """
+        with open(self.path(filename), 'r') as json_file:
+            return json.load(json_file)
+
+    def array(self, filename: str, name: str, mmap_mode: str = 'r') -> np.array:
+        """
+        :param filename: filename of the trajectory
+        :param name: one of TrajectoryStore.arrays
+        :param mmap_mode: passed to np.load, None reads the array into memory
+        :return: the array (memory-mapped, read-only by default)
+        """
+        return np.load(self.path(filename, name), mmap_mode=mmap_mode)
+
+    def fill(self, filenames: list) -> None:
+        """
+        Add pickled trajectories that are not in the store yet.
+        :param filenames: filenames of the trajectories (e.g. myDataFrame['filename'])
+        """
+        from trajectory_inheritance.trajectory import get
+        for filename in tqdm(filenames):
+            if filename not in self:
+                self.put(get(filename))
@@ -8,14 +8,18 @@ import numpy as np
 from os import path
 import os
 import pickle
-from Directories import SaverDirectories, work_dir, mini_SaverDirectories, home
-from copy import deepcopy
-from Setup.Maze import Maze
+from Directories import SaverDirectories, mini_SaverDirectories, columnar_work_dir, home
+from Setup.Maze import Maze, MazeGeometry
 from Setup.Load import periodicity
 from PhysicsEngine.Display import Display
 from scipy.signal import savgol_filter
 from Analysis.Velocity import velocity
 from trajectory_inheritance.exp_types import is_exp_valid
+from trajectory_inheritance.TrajectoryIndex import trajectory_index
+from trajectory_inheritance.TrajectoryStore import TrajectoryStore
+from trajectory_inheritance.TrajectoryCache import trajectory_cache
+from trajectory_inheritance.LazyTrajectory import LazyTrajectory
+from trajectory_inheritance.SegmentedArray import SegmentedArray
 from copy import copy
 
 """ Making Directory Structure """
@@ -69,7 +73,7 @@ class Trajectory:
         #         print('does not belong together')
         #         # breakpoint()
 
-        file12 = deepcopy(self)
+        file12 = copy(self)
         # if not hasattr(file2, 'x_error'):  # if for example this is from simulations.
         #     file2.x_error = 0
         #     file2.y_error = 0
@@ -79,12 +83,13 @@ class Trajectory:
         # file12.y_error = [self.y_error, file2.y_error]  # these are lists that we want to join together
         # file12.angle_error = [self.angle_error, file2.angle_error]  # these are lists that we want to join together
 
-        file12.position = np.vstack((self.position, file2.position))
+        # the arrays are not copied, the joined trajectory keeps them as segments
+        file12.position = SegmentedArray.concatenate([self.position, file2.position])
 
         per = 2 * np.pi / periodicity[file12.shape]
         a0 = np.floor(self.angle[-1] / per) * per + np.mod(file2.angle[1], per)
-        file12.angle = np.hstack((self.angle, file2.angle - file2.angle[1] + a0))
-        file12.frames = np.hstack((self.frames, file2.frames))
+        file12.angle = SegmentedArray.concatenate([self.angle, file2.angle], offsets=[0, a0 - file2.angle[1]])
+        file12.frames = SegmentedArray.concatenate([self.frames, file2.frames])
         file12.tracked_frames = file12.tracked_frames + file2.tracked_frames
 
         # if not self.free:
@@ -105,8 +110,8 @@ class Trajectory:
         my_maze.set_configuration(self.position[i], self.angle[i])
 
     def smooth(self):
-        self.position[:, 0] = savgol_filter(self.position[:, 0], self.fps + 1, 3)
-        self.position[:, 1] = savgol_filter(self.position[:, 1], self.fps + 1, 3)
+        self.position = np.stack([savgol_filter(self.position[:, 0], self.fps + 1, 3),
+                                  savgol_filter(self.position[:, 1], self.fps + 1, 3)], axis=1)
         self.angle = savgol_filter(np.unwrap(self.angle), self.fps + 1, 3) % (2 * np.pi)
 
     def interpolate_over_NaN(self):
@@ -168,17 +173,16 @@ class Trajectory:
             yield pos[0], pos[1], angle
 
     def find_contact(self):
-        from PhysicsEngine.Contact import contact_loop_experiment
-        my_maze = Maze(self)
-        my_load = my_maze.bodies[-1]
-        contact = []
-
-        i = 0
-        while i < len(self.frames):
-            self.step(my_maze, i)  # update_screen the position of the load (very simple function, take a look)
-            contact.append(contact_loop_experiment(my_load, my_maze))
-            i += 1
-        return contact
+        """
+        Find the frames, in which the load is in contact with the maze.
+        :return: boolean scipy.sparse matrix of shape (number of frames, number of maze points) (see
+        PhysicsEngine.Contact.find_contacts), and the maze points
+        """
+        from PhysicsEngine.Contact import find_contacts
+        from Setup.Maze import LoadGeometry
+        maze = MazeGeometry(self)
+        maze_points = maze.slit_tree_points()
+        return find_contacts(LoadGeometry(maze).corners, self.position, self.angle, maze_points), maze_points
 
     def has_forcemeter(self):
         return False
@@ -204,23 +208,22 @@ class Trajectory:
             * *indices_to_coords* (``[int, int]``) --
               starting and ending frame of trajectory_inheritance, which you would like to display
         """
-        x = deepcopy(self)
-
-        if x.frames.size == 0:
-            x.frames = np.array([fr for fr in range(x.angle.size)])
-
         if frames is None:
             f1, f2 = 0, -1
         else:
             f1, f2 = frames[0], frames[1]
-        x.position, x.angle = x.position[f1:f2:step, :], x.angle[f1:f2:step]
-        x.frames = x.frames[f1:f2:step]
+        x = self.view(f1, f2, step)
+
+        if self.frames.size == 0:
+            x.frames = np.arange(self.angle.size)[f1:f2:step]
 
         if hasattr(x, 'participants') and x.participants is not None:  # TODO: this is a bit ugly, why does Amirs
             # have participants?
+            x.participants = copy(x.participants)
             x.participants.positions = x.participants.positions[f1:f2:step, :]
             x.participants.angles = x.participants.angles[f1:f2:step]
             if hasattr(x.participants, 'forces'):
+                x.participants.forces = copy(x.participants.forces)
                 x.participants.forces.abs_values = x.participants.forces.abs_values[f1:f2:step, :]
                 x.participants.forces.angles = x.participants.forces.angles[f1:f2:step, :]
 
@@ -236,17 +239,28 @@ class Trajectory:
         if self.frames.shape != self.angle.shape:
             raise Exception('Your frame shape does not match your angle shape!')
 
+    def view(self, start: int = None, stop: int = None, step: int = None):
+        """
+        Shallow copy of the trajectory, whose frames, position and angle are views of the slice start:stop:step.
+        Nothing proportional to the length of the trajectory is copied.
+        :param start: first frame index (not the yellow numbers on top)
+        :param stop: last frame index (not included)
+        :param step: take only every step-th frame
+        :return: trajectory that shares its arrays with self
+        """
+        new = copy(self)
+        new.frames = self.frames[start:stop:step]
+        new.position = self.position[start:stop:step]
+        new.angle = self.angle[start:stop:step]
+        return new
+
     def cut_off(self, frames: list):
         """
 
         :param frames: frame indices (not the yellow numbers on top)
-        :return:
+        :return: view of the trajectory between the frame indices
         """
-        new = copy(self)
-        new.frames = self.frames[frames[0]:frames[1]]
-        new.position = self.position[frames[0]:frames[1]]
-        new.angle = self.angle[frames[0]:frames[1]]
-        return new
+        return self.view(frames[0], frames[1])
 
     def interpolate(self, frames_list: list):
         """
@@ -256,6 +270,7 @@ class Trajectory:
         """
         from Load_tracked_data.Load_Experiment import connector
         new = copy(self)
+        new.position, new.angle = self.position.copy(), self.angle.copy()
         for frames in frames_list:
             con = connector(new.cut_off([0, frames[0]]), new.cut_off([frames[1], -1]), frames[1] - frames[0],
                             filename=self.filename + '_interpolation_' + str(frames[0]) + '_' + str(frames[1]))
@@ -277,6 +292,7 @@ class Trajectory:
         :return:
         """
         new = copy(self)
+        new.position, new.angle = self.position.copy(), self.angle.copy()
         for frames in frames_list:
             new.position[frames[0]:frames[1]] = np.vstack(
                 [new.position[frames[0]] for _ in range(frames[1] - frames[0])])
@@ -298,9 +314,11 @@ class Trajectory:
 
         with open(address, 'wb') as f:
             try:
-                self_copy = deepcopy(self)
+                self_copy = copy(self)
                 if hasattr(self_copy, 'participants'):
                     delattr(self_copy, 'participants')
+                for name in ['position', 'angle', 'frames']:  # joined trajectories are saved as single arrays
+                    setattr(self_copy, name, np.asarray(getattr(self_copy, name)))
                 pickle.dump(self_copy, f)
                 print('Saving ' + self_copy.filename + ' in ' + address)
             except pickle.PicklingError as e:
@@ -308,9 +326,15 @@ class Trajectory:
 
         print('Saving minimal' + self.filename + ' in path: ' + mini_SaverDirectories[self.solver])
         pickle.dump((self.shape, self.size, self.solver, self.filename, self.fps,
-                     self.position, self.angle, self.frames, self.winner),
+                     np.asarray(self.position), np.asarray(self.angle), np.asarray(self.frames), self.winner),
                     open(mini_SaverDirectories[self.solver] + path.sep + self.filename, 'wb'))
 
+        print('Saving arrays of ' + self.filename + ' in path: ' + columnar_work_dir)
+        TrajectoryStore().put(self)
+
+        # the next get() has to read the new file
+        trajectory_cache.remove(self.filename)
+
     def stretch(self, frame_number: int) -> None:
         """
         I have to interpolate a trajectory. I know the frame number and a few points, that the shape should walk
@@ -365,7 +389,7 @@ class Trajectory:
         """
         if self.shape != 'SPT':
             return None
-        elif self.position[0, 0] < Maze(self).slits[0]:
+        elif self.position[0, 0] < MazeGeometry(self).slits[0]:
             return 'back'
         return 'front'
 
@@ -386,9 +410,8 @@ class Trajectory_part(Trajectory):
                          VideoChain=VideoChain)
         self.parent_traj = parent_traj
         self.frames_of_parent = frames
-        self.frames = parent_traj.frames[frames[0]:frames[-1]]
-        self.position = parent_traj.position[frames[0]:frames[-1]]
-        self.angle = parent_traj.angle[frames[0]:frames[-1]]
+        part = parent_traj.view(frames[0], frames[-1])
+        self.frames, self.position, self.angle = part.frames, part.position, part.angle
 
     def is_connector(self):
         return 'CONNECTOR' in self.VideoChain[-1]
@@ -397,10 +420,34 @@ class Trajectory_part(Trajectory):
         return self.parent_traj.geometry()
 
 
-def get(filename) -> Trajectory:
+def get(filename, cache: bool = True, lazy: bool = False) -> Trajectory:
     """
     Allows the loading of saved trajectory objects.
     :param filename: Name of the trajectory that is supposed to be unpickled
+    :param cache: whether to use the trajectory_cache. Cached trajectories have read-only arrays.
+    :param lazy: return a LazyTrajectory, that reads metadata first and arrays only when they are used (if the
+    trajectory is in the TrajectoryStore or has a minimal record)
+    :return: trajectory object
+    """
+    if lazy:
+        try:
+            return LazyTrajectory(filename)
+        except ValueError:
+            pass
+
+    if not cache:
+        return load_trajectory(filename)
+
+    x = trajectory_cache.get(filename)
+    if x is None:
+        x = trajectory_cache.put(filename, load_trajectory(filename))
+    return x
+
+
+def load_trajectory(filename) -> Trajectory:
+    """
+    Unpickle a trajectory, from the local copy if there is one, and otherwise from the labs network.
+    :param filename: Name of the trajectory that is supposed to be unpickled
     :return: trajectory object
     """
     # this is local on your computer
@@ -412,12 +459,9 @@ def get(filename) -> Trajectory:
         return x
 
     # this is on labs network
-    for root, dirs, files in os.walk(work_dir):
-        for dir in dirs:
-            if filename in os.listdir(path.join(root, dir)):
-                address = path.join(root, dir, filename)
-                with open(address, 'rb') as f:
-                    x = pickle.load(f)
-                return x
-    else:
+    address = trajectory_index().locate(filename)
+    if address is None:
         raise ValueError('I cannot find ' + filename)
+    with open(address, 'rb') as f:
+        x = pickle.load(f)
+    return x
@@ -4,7 +4,6 @@ from copy import deepcopy
 import numpy as np
 import scipy.io as sio
 from os import path
-from Setup.Load import periodicity
 from Setup.Maze import Maze, Maze_free_space
 from PhysicsEngine.Display import Display
 
@@ -65,23 +64,7 @@ class Trajectory_ant(Trajectory):
             print('does not belong together')
             # breakpoint()
 
-        file12 = deepcopy(self)
-        # if not hasattr(file2, 'x_error'):  # if for example this is from simulations.
-        #     file2.x_error = 0
-        #     file2.y_error = 0
-        #     file2.angle_error = 0
-        #
-        # file12.x_error = [self.x_error, file2.x_error]  # these are lists that we want to join together
-        # file12.y_error = [self.y_error, file2.y_error]  # these are lists that we want to join together
-        # file12.angle_error = [self.angle_error, file2.angle_error]  # these are lists that we want to join together
-
-        file12.position = np.vstack((self.position, file2.position))
-
-        per = 2 * np.pi / periodicity[file12.shape]
-        a0 = np.floor(self.angle[-1] / per) * per + np.mod(file2.angle[1], per)
-        file12.angle = np.hstack((self.angle, file2.angle - file2.angle[1] + a0))
-        file12.frames = np.hstack((self.frames, file2.frames))
-        file12.tracked_frames = file12.tracked_frames + file2.tracked_frames
+        file12 = super().__add__(file2)
 
         if not self.free:
             # file12.contact = self.contact + file2.contact  # We are combining two lists here...
@@ -89,11 +72,6 @@ class Trajectory_ant(Trajectory):
             file12.winner = file2.winner  # The success of the attempt is determined, by the fact that the last file
             # is either winner or looser.
 
-        file12.VideoChain = self.VideoChain + file2.VideoChain
-        print(file12.VideoChain, sep="\n")
-
-        file12.falseTracking = self.falseTracking + file2.falseTracking
-
         # Delete the load of filename
         return file12
 
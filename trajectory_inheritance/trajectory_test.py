@@ -0,0 +1,194 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+from trajectory_inheritance.trajectory import Trajectory
+from trajectory_inheritance.TrajectoryCache import TrajectoryCache, trajectory_bytes
+from trajectory_inheritance.TrajectoryIndex import TrajectoryIndex
+from trajectory_inheritance.SegmentedArray import SegmentedArray
+from trajectory_inheritance.TrajectoryStore import TrajectoryStore
+from trajectory_inheritance.LazyTrajectory import LazyTrajectory
+from trajectory_inheritance import LazyTrajectory as lazy_trajectory_module
+from Setup.Maze import MazeGeometry, is_trajectory
+
+
+def trajectory(filename: str, length: int = 10) -> Trajectory:
+    x = Trajectory(size='XL', shape='SPT', solver='ant', filename=filename, fps=50, winner=True)
+    x.position = np.stack([np.arange(length), np.arange(length) + 0.5], axis=1).astype(float)
+    x.angle = np.linspace(0, 1, length)
+    x.frames = np.arange(length)
+    return x
+
+
+class TrajectoryCacheTest(unittest.TestCase):
+    def test_least_recently_used_are_removed(self):
+        size = trajectory_bytes(trajectory('a'))
+        cache = TrajectoryCache(budget=2 * size)
+        cache.put('a', trajectory('a'))
+        cache.put('b', trajectory('b'))
+        cache.get('a')
+        cache.put('c', trajectory('c'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertLessEqual(cache.size(), cache.budget)
+        self.assertDictEqual(cache.info(), {'hits': 3, 'misses': 1, 'trajectories': 2, 'bytes': 2 * size})
+
+    def test_too_large_is_not_cached(self):
+        cache = TrajectoryCache(budget=trajectory_bytes(trajectory('a')) - 1)
+        x = trajectory('a')
+        self.assertIs(cache.put('a', x), x)
+        self.assertEqual(len(cache), 0)
+
+    def test_read_only_views(self):
+        cache = TrajectoryCache()
+        cache.put('a', trajectory('a'))
+        x = cache.get('a')
+        with self.assertRaises(ValueError):
+            x.position[0, 0] = 100
+        x.angle = np.zeros(10)  # replacing an array does not change the cached trajectory
+        self.assertListEqual(cache.get('a').angle.tolist(), np.linspace(0, 1, 10).tolist())
+
+    def test_remove(self):
+        cache = TrajectoryCache()
+        cache.put('a', trajectory('a'))
+        cache.remove('a')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size(), 0)
+
+
+class SegmentedArrayTest(unittest.TestCase):
+    segments = [np.arange(10, dtype=float).reshape(5, 2), np.arange(10, 16, dtype=float).reshape(3, 2),
+                np.arange(16, 24, dtype=float).reshape(4, 2)]
+    offsets = [0, 100, 0]
+    joined = np.vstack([segment + offset for segment, offset in zip(segments, offsets)])
+
+    def test_slicing(self):
+        x = SegmentedArray(self.segments, self.offsets)
+        self.assertTupleEqual(x.shape, self.joined.shape)
+        for key in [slice(None), slice(2, 10), slice(1, 12, 3), slice(6, 7), slice(-4, None), slice(4, 5),
+                    slice(9, 2, -2), slice(5, 5), (slice(3, 9), 1), 7, -1, (6, 0), [0, 11]]:
+            self.assertEqual(np.asarray(x[key]).tolist(), self.joined[key].tolist(), msg=str(key))
+        self.assertListEqual(list(map(list, x)), self.joined.tolist())
+        self.assertListEqual(np.asarray(x + 1).tolist(), (self.joined + 1).tolist())
+
+    def test_read_only(self):
+        x = SegmentedArray(self.segments, self.offsets)
+        for key in [slice(0, 3), slice(5, 8), slice(None), 0]:
+            with self.assertRaises(ValueError, msg=str(key)):
+                np.asarray(x[key])[0] = 1
+        with self.assertRaises(TypeError):
+            x[0] = 1
+        with self.assertRaises(ValueError):
+            np.asarray(x)[0] = 1
+        copied = np.array(x, copy=True)
+        copied[0] = -1
+        self.assertListEqual(np.asarray(x)[0].tolist(), self.joined[0].tolist())
+        self.assertEqual(self.segments[0][0, 0], 0)
+
+    def test_add_like_stack(self):
+        x, y = trajectory('x', length=6), trajectory('y', length=4)
+        for z in [x, y]:
+            z.tracked_frames, z.falseTracking = [], []
+        y.angle = y.angle + 7
+        joined = x + y
+        per = 2 * np.pi
+        a0 = np.floor(x.angle[-1] / per) * per + np.mod(y.angle[1], per)
+        self.assertTrue(np.allclose(joined.position, np.vstack((x.position, y.position))))
+        self.assertTrue(np.allclose(joined.angle, np.hstack((x.angle, y.angle - y.angle[1] + a0))))
+        self.assertListEqual(np.asarray(joined.frames).tolist(), np.hstack((x.frames, y.frames)).tolist())
+        self.assertTrue(np.allclose(joined.view(3, 8).angle, np.hstack((x.angle, y.angle - y.angle[1] + a0))[3:8]))
+
+
+class LazyTrajectoryTest(unittest.TestCase):
+    def test_metadata_and_arrays(self):
+        x = trajectory('a', length=6)
+        x.geometry = lambda: ('MazeDimensions_ant.xlsx', 'LoadDimensions_ant.xlsx')
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TrajectoryStore(directory=tmp)
+            store.put(x)
+            lazy = LazyTrajectory('a', store=store)
+            self.assertEqual(len(lazy._arrays), 0)  # nothing is read before it is used
+            self.assertTupleEqual((lazy.shape, lazy.size, lazy.solver, lazy.fps, lazy.winner),
+                                  (x.shape, x.size, x.solver, x.fps, x.winner))
+            self.assertTupleEqual(lazy.geometry(), x.geometry())
+            self.assertEqual(lazy.timer(), 5 / 50)
+            for name in TrajectoryStore.arrays:
+                self.assertListEqual(getattr(lazy, name).tolist(), getattr(x, name).tolist())
+            with self.assertRaises(ValueError):
+                lazy.position[0, 0] = 1
+            del lazy
+
+    def test_winner_none(self):
+        x = trajectory('a', length=6)
+        x.winner = None
+        x.geometry = lambda: None
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TrajectoryStore(directory=tmp)
+            store.put(x)
+            self.assertIsNone(LazyTrajectory('a', store=store).winner)
+
+    def test_mini_record_read_on_first_use(self):
+        x = trajectory('a', length=6)
+        directories = lazy_trajectory_module.mini_SaverDirectories
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'a'), 'wb') as f:
+                pickle.dump((x.shape, x.size, x.solver, x.filename, x.fps, x.position, x.angle, x.frames, None), f)
+            lazy_trajectory_module.mini_SaverDirectories = {'ant': tmp}
+            try:
+                lazy = LazyTrajectory('a', store=TrajectoryStore(directory=os.path.join(tmp, 'store')))
+                self.assertEqual(len(lazy._arrays), 0)  # nothing is read before it is used
+                self.assertEqual(lazy.shape, x.shape)
+                self.assertIsNone(lazy.winner)
+                self.assertEqual(lazy.timer(), 5 / 50)
+                self.assertListEqual(lazy.angle.tolist(), x.angle.tolist())
+            finally:
+                lazy_trajectory_module.mini_SaverDirectories = directories
+
+    def test_maze_geometry(self):
+        x = trajectory('a', length=6)
+        x.geometry = lambda: ('MazeDimensions_ant.xlsx', 'LoadDimensions_ant.xlsx')
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TrajectoryStore(directory=tmp)
+            store.put(x)
+            lazy = LazyTrajectory('a', store=store)
+            self.assertTrue(is_trajectory(lazy))
+            self.assertTrue(is_trajectory(x))
+            self.assertFalse(is_trajectory(x.position))
+            maze = MazeGeometry(lazy)
+            self.assertTupleEqual((maze.shape, maze.size, maze.solver), (x.shape, x.size, x.solver))
+            self.assertListEqual(maze.slits, MazeGeometry(x).slits)
+
+
+class TrajectoryIndexTest(unittest.TestCase):
+    def test_locate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = os.path.join(tmp, 'root')
+            os.makedirs(os.path.join(root, 'a', 'b'))
+            open(os.path.join(root, 'a', 'b', 'x'), 'w').close()
+            address = os.path.join(tmp, 'cache', 'index.json')
+            index = TrajectoryIndex(root=root, address=address)
+            self.assertEqual(index.locate('x'), os.path.join(root, 'a', 'b', 'x'))
+            self.assertTrue(os.path.exists(address))
+            self.assertEqual(TrajectoryIndex(root=root, address=address).locations['x'], os.path.join(root, 'a', 'b'))
+
+    def test_missing_until_directory_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = os.path.join(tmp, 'root')
+            os.makedirs(os.path.join(root, 'a'))
+            index = TrajectoryIndex(root=root, address=os.path.join(tmp, 'index.json'))
+            self.assertIsNone(index.locate('y'))
+            self.assertIn('y', index.missing)
+            self.assertFalse(index.changed())
+
+            open(os.path.join(root, 'a', 'y'), 'w').close()
+            os.utime(os.path.join(root, 'a'), (0, 0))  # make sure the modification time differs
+            self.assertTrue(index.changed())
+            self.assertEqual(index.locate('y'), os.path.join(root, 'a', 'y'))
+            self.assertNotIn('y', index.missing)
+
+
+if __name__ == '__main__':
+    unittest.main()